@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -87,6 +88,100 @@ REST_FRAMEWORK = {
     )
 }
 
+# Número máximo de mediciones aceptadas en una sola petición de ingesta por lotes
+MEASUREMENT_BATCH_MAX_SIZE = 5000
+
+# Caché en memoria de tokens de estación (ingesta IoT sin pasar por la tabla de usuarios)
+STATION_TOKEN_CACHE_MAX_ENTRIES = 1024
+STATION_TOKEN_CACHE_TTL_SECONDS = 300
+
+# Buffer de escritura diferida (write-behind) para la ingesta de mediciones.
+# Agrupa inserciones individuales en lotes cada MAX_ROWS filas o FLUSH_INTERVAL_MS.
+MEASUREMENT_WRITE_BUFFER = {
+    'ENABLED': os.environ.get('MEASUREMENT_WRITE_BUFFER', 'false').lower() == 'true',
+    'MAX_ROWS': 500,
+    'FLUSH_INTERVAL_MS': 1000,
+    'MAX_QUEUE_SIZE': 10000,
+    'PUT_TIMEOUT_SECONDS': 2.0,
+    # Intentos de un lote fallido antes de guardarlo en measurement_dead_letter
+    'MAX_RETRIES': 5,
+    # Archivo local para los lotes que tampoco pudieron guardarse en measurement_dead_letter
+    'SPILL_PATH': os.environ.get(
+        'MEASUREMENT_SPILL_PATH', os.path.join(MEDIA_ROOT, 'measurement-spill.jsonl')
+    ),
+}
+
+# Tabla compartida (mmap) con la última medición por estación y variable, leída
+# sin bloqueos por todos los procesos del servidor (endpoints latest y aqi/current).
+# PATH debe estar en un volumen común a todos los procesos que ingieren mediciones.
+LATEST_MATRIX = {
+    'ENABLED': os.environ.get('LATEST_MATRIX', 'false').lower() == 'true',
+    'PATH': os.environ.get(
+        'LATEST_MATRIX_PATH', os.path.join(tempfile.gettempdir(), 'vrisa-latest-matrix.bin')
+    ),
+    'MAX_STATIONS': 1024,
+    'MAX_VARIABLES': 128,
+    # Vigencia máxima del AQI en vivo en caché aunque no lleguen mediciones nuevas
+    'AQI_TTL_SECONDS': 60,
+}
+
+# Estado incremental del AQI en vivo (cubetas horarias por estación y contaminante,
+# ver src/measurements/aqi_state.py). Lo actualiza la ingesta y lo lee aqi/current.
+# REFRESH_SECONDS: cada cuánto se recarga completo desde la base de datos.
+AQI_STATE = {
+    'ENABLED': os.environ.get('AQI_STATE', 'false').lower() == 'true',
+    'PATH': os.environ.get(
+        'AQI_STATE_PATH', os.path.join(tempfile.gettempdir(), 'vrisa-aqi-state.bin')
+    ),
+    'MAX_STATIONS': 1024,
+    'REFRESH_SECONDS': 900,
+}
+
+# Últimas horas de cada serie (sensor, variable) en anillos en memoria compartida
+# (ver src/measurements/recent_series.py). Lo actualiza la ingesta y lo lee el
+# endpoint measurements/recent. CAPACITY: lecturas por serie (24 h cada 10 s).
+RECENT_SERIES = {
+    'ENABLED': os.environ.get('RECENT_SERIES', 'false').lower() == 'true',
+    'PATH': os.environ.get(
+        'RECENT_SERIES_PATH', os.path.join(tempfile.gettempdir(), 'vrisa-recent-series.bin')
+    ),
+    'MAX_SERIES': 1024,
+    'CAPACITY': 8640,
+    'WINDOW_HOURS': 24,
+}
+
+# Reportes PDF asíncronos (comando process_report_jobs). Un trabajo RUNNING por
+# más de STALE_MINUTES se considera abandonado y vuelve a la cola.
+REPORT_JOBS = {
+    'POLL_SECONDS': 5,
+    'STALE_MINUTES': 30,
+}
+
+# Caché en disco de reportes PDF (report_cache.py), por parámetros y estado de
+# los datos. Un periodo se considera cerrado CLOSED_AFTER_HOURS después de su
+# último día; sus reportes ya generados se sirven sin consultar la base.
+REPORT_CACHE = {
+    'ENABLED': os.environ.get('REPORT_CACHE', 'false').lower() == 'true',
+    'PATH': os.environ.get('REPORT_CACHE_PATH', os.path.join(MEDIA_ROOT, 'report-cache')),
+    'MAX_BYTES': 512 * 1024 * 1024,
+    'CLOSED_AFTER_HOURS': 24,
+}
+
+# Particionamiento mensual de la tabla measurement (comando manage_partitions).
+# RETENTION_MONTHS = None conserva todo el histórico.
+MEASUREMENT_PARTITION_MONTHS_AHEAD = 3
+MEASUREMENT_RETENTION_MONTHS = (
+    int(os.environ['MEASUREMENT_RETENTION_MONTHS'])
+    if os.environ.get('MEASUREMENT_RETENTION_MONTHS') else None
+)
+
+# Agregados por hora y día (tabla measurement_rollup): un rango de consulta mayor
+# al umbral se lee desde el nivel correspondiente en lugar de las mediciones crudas.
+MEASUREMENT_ROLLUP_TIERS = {
+    'hour': timedelta(days=2),
+    'day': timedelta(days=366),
+}
+
 
 # Configuración del token JWT
 SIMPLE_JWT = {
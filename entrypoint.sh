@@ -5,6 +5,9 @@ if [ "$RUN_MIGRATIONS" = "true" ]; then
     echo "Aplicando migraciones de base de datos..."
     python manage.py migrate
 
+    echo "Creando particiones mensuales de mediciones..."
+    python manage.py manage_partitions
+
     echo "Poblando la base de datos con datos semilla..."
     python manage.py seed_db
 
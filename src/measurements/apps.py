@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MeasurementsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'src.measurements'
+
+    def ready(self):
+        # Registra la invalidación de la tabla compartida de últimos valores
+        from src.measurements import signals  # noqa: F401
@@ -0,0 +1,60 @@
+import numpy as np
+from common.validation import AQI_BREAKPOINTS, AQI_CATEGORIES
+
+# Puntos de corte de cada contaminante como arreglos (c_low, c_high, i_low, i_high)
+BREAKPOINT_ARRAYS = {
+    code: tuple(np.array(column, dtype=np.float64) for column in zip(*breakpoints))
+    for code, breakpoints in AQI_BREAKPOINTS.items()
+}
+
+# Categorías en orden creciente de AQI; el índice de category_indices apunta aquí
+CATEGORIES = [AQI_CATEGORIES[key] for key in sorted(AQI_CATEGORIES)]
+_CATEGORY_LOWS = np.array([low for low, _ in sorted(AQI_CATEGORIES)], dtype=np.float64)
+
+
+def sub_indices(pollutant_code: str, concentrations) -> np.ndarray:
+    """
+    Versión vectorizada de AQICalculatorService.calculate_sub_index: aplica la
+    fórmula EPA a un arreglo de concentraciones de un mismo contaminante.
+
+    El tramo de cada valor se ubica con np.searchsorted sobre los límites
+    inferiores y la interpolación se calcula sobre todo el arreglo a la vez.
+    Mismas reglas que la versión escalar: negativos -> 0, valores entre dos
+    tramos -> 0 y valores sobre el último tramo se extrapolan con él.
+    Las concentraciones NaN (sin dato) producen NaN.
+
+    Args:
+        pollutant_code (str): Código del contaminante (ej: 'PM2.5').
+        concentrations (array-like): Concentraciones medidas.
+    Returns:
+        np.ndarray: Sub-índices redondeados a 2 decimales.
+    Raises:
+        ValueError: Si el contaminante no está soportado.
+    """
+    if pollutant_code not in BREAKPOINT_ARRAYS:
+        raise ValueError(f"Contaminante {pollutant_code} no soportado para cálculo de AQI")
+
+    c_low, c_high, i_low, i_high = BREAKPOINT_ARRAYS[pollutant_code]
+    values = np.asarray(concentrations, dtype=np.float64)
+
+    # Último tramo con c_low <= valor; los valores sobre el máximo usan el último tramo
+    segment = np.clip(np.searchsorted(c_low, values, side="right") - 1, 0, len(c_low) - 1)
+    above = values > c_high[-1]
+    inside = (values >= c_low[segment]) & (values <= c_high[segment])
+
+    slope = (i_high[segment] - i_low[segment]) / (c_high[segment] - c_low[segment])
+    result = np.round(slope * (values - c_low[segment]) + i_low[segment], 2)
+    result = np.where(inside | above, result, 0.0)
+    return np.where(np.isnan(values), np.nan, result)
+
+
+def category_indices(aqi_values) -> np.ndarray:
+    """
+    Versión vectorizada de AQICalculatorService.get_aqi_category. Un valor
+    entre dos rangos (ej: 50.5, que la fórmula EPA no produce) toma la
+    categoría inferior.
+    Returns:
+        np.ndarray: Índice en CATEGORIES de cada valor (los mayores a 500 son Hazardous).
+    """
+    values = np.asarray(aqi_values, dtype=np.float64)
+    return np.clip(np.searchsorted(_CATEGORY_LOWS, values, side="right") - 1, 0, len(CATEGORIES) - 1)
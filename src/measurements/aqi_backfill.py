@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from django.db.models import Count, Sum
+from src.sensors.models import Sensor
+from .aqi_arrays import sub_indices
+from .models import Measurement, MeasurementRollup
+from .rollups import HOUR, floor_hour, rollups_enabled
+
+# Ventana del promedio móvil (igual que el AQI en vivo)
+AQI_WINDOW = timedelta(hours=24)
+
+# Fechas por consulta al leer las mediciones exactas de cada instante de la grilla
+GRID_QUERY_CHUNK = 5000
+
+# Filas leídas por vuelta del cursor de servidor
+FETCH_CHUNK_SIZE = 10000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_HOUR_US = 3600 * 1000000
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def aqi_grid(start_date: datetime, end_date: datetime, interval_hours=1) -> list:
+    """
+    Instantes en los que se calcula el AQI histórico: start_date + k * intervalo <= end_date.
+    """
+    step = timedelta(hours=interval_hours)
+    grid = []
+    current = start_date
+    while current <= end_date:
+        grid.append(current)
+        current += step
+    return grid
+
+
+def window_means(station_id: int, pollutant_codes, grid: list) -> dict:
+    """
+    Promedio de cada contaminante en la ventana [t - 24h, t] para todos los
+    instantes t de la grilla, leyendo el rango una sola vez (más 24 h previas).
+
+    Los promedios móviles se calculan con sumas acumuladas en NumPy: la suma y
+    la cantidad de una ventana son la diferencia de dos posiciones del
+    acumulado. Con una grilla alineada a la hora se usan los agregados
+    horarios más las mediciones exactas de cada instante t; en otro caso, las
+    mediciones crudas. En ambos casos el resultado es el mismo que calcular
+    cada ventana por separado (solo sensores activos).
+
+    Returns:
+        dict: {codigo: np.ndarray con un promedio por instante (NaN sin datos)}.
+    """
+    grid_us = np.array([_micros(t) for t in grid], dtype=np.int64)
+    aligned = rollups_enabled() and all(t == floor_hour(t) for t in grid)
+    if aligned:
+        totals = _rollup_window_totals(station_id, pollutant_codes, grid, grid_us)
+    else:
+        totals = _raw_window_totals(station_id, pollutant_codes, grid, grid_us)
+
+    means = {}
+    for code in pollutant_codes:
+        total, count = totals.get(code, (np.zeros(len(grid)), np.zeros(len(grid))))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[code] = np.where(count > 0, total / count, np.nan)
+    return means
+
+
+def _active(queryset, station_field: str, station_id: int):
+    return queryset.filter(**{station_field: station_id, "sensor__status": Sensor.Status.ACTIVE})
+
+
+def _rollup_window_totals(station_id, pollutant_codes, grid, grid_us):
+    # Cuerpo de la ventana: horas completas [t - 24h, t) desde los agregados horarios
+    first_hour = grid_us[0] - AQI_WINDOW // _MICROSECOND
+    n_hours = int((grid_us[-1] - first_hour) // _HOUR_US) + 1
+    rows = (
+        _active(MeasurementRollup.objects, "station_id", station_id)
+        .filter(
+            variable__code__in=pollutant_codes,
+            granularity=HOUR,
+            bucket_start__gte=grid[0] - AQI_WINDOW,
+            bucket_start__lt=grid[-1],
+        )
+        .values_list("variable__code", "bucket_start")
+        .annotate(count=Sum("count"), total=Sum("sum"))
+        .order_by()
+    )
+
+    hourly = {}
+    for code, bucket_start, count, total in rows.iterator(chunk_size=FETCH_CHUNK_SIZE):
+        sums, counts = hourly.setdefault(code, (np.zeros(n_hours), np.zeros(n_hours)))
+        index = (_micros(bucket_start) - first_hour) // _HOUR_US
+        sums[index] += total
+        counts[index] += count
+
+    window_hours = AQI_WINDOW // timedelta(hours=1)
+    end_index = (grid_us - first_hour) // _HOUR_US
+    totals = {}
+    for code, (sums, counts) in hourly.items():
+        sum_acc = np.concatenate(([0.0], np.cumsum(sums)))
+        count_acc = np.concatenate(([0.0], np.cumsum(counts)))
+        totals[code] = (
+            sum_acc[end_index] - sum_acc[end_index - window_hours],
+            count_acc[end_index] - count_acc[end_index - window_hours],
+        )
+
+    # Borde final de la ventana: mediciones exactamente en t (inclusivo)
+    position = {t: i for i, t in enumerate(grid_us.tolist())}
+    for offset in range(0, len(grid), GRID_QUERY_CHUNK):
+        edges = (
+            _active(Measurement.objects, "sensor__station_id", station_id)
+            .filter(
+                variable__code__in=pollutant_codes,
+                measure_date__in=grid[offset:offset + GRID_QUERY_CHUNK],
+            )
+            .values_list("variable__code", "measure_date")
+            .annotate(count=Count("value"), total=Sum("value"))
+            .order_by()
+        )
+        for code, measure_date, count, total in edges:
+            total_array, count_array = totals.setdefault(
+                code, (np.zeros(len(grid)), np.zeros(len(grid)))
+            )
+            index = position[_micros(measure_date)]
+            total_array[index] += total
+            count_array[index] += count
+
+    return totals
+
+
+def _raw_window_totals(station_id, pollutant_codes, grid, grid_us):
+    rows = (
+        _active(Measurement.objects, "sensor__station_id", station_id)
+        .filter(
+            variable__code__in=pollutant_codes,
+            measure_date__gte=grid[0] - AQI_WINDOW,
+            measure_date__lte=grid[-1],
+        )
+        .order_by("variable__code", "measure_date")
+        .values_list("variable__code", "measure_date", "value")
+    )
+
+    series = {}
+    for code, measure_date, value in rows.iterator(chunk_size=FETCH_CHUNK_SIZE):
+        dates, values = series.setdefault(code, ([], []))
+        dates.append(_micros(measure_date))
+        values.append(value)
+
+    window_us = AQI_WINDOW // _MICROSECOND
+    totals = {}
+    for code, (dates, values) in series.items():
+        dates = np.array(dates, dtype=np.int64)
+        value_acc = np.concatenate(([0.0], np.cumsum(values)))
+        hi = np.searchsorted(dates, grid_us, side="right")
+        lo = np.searchsorted(dates, grid_us - window_us, side="left")
+        totals[code] = (value_acc[hi] - value_acc[lo], (hi - lo).astype(np.float64))
+    return totals
+
+
+def historical_aqi(station_id: int, pollutant_codes, grid: list):
+    """
+    AQI (máximo de los sub-índices EPA) en cada instante de la grilla.
+    Returns:
+        np.ndarray: AQI por instante; NaN donde no hay ningún contaminante con datos.
+    """
+    means = window_means(station_id, pollutant_codes, grid)
+    stacked = np.vstack([sub_indices(code, means[code]) for code in pollutant_codes])
+    has_data = ~np.isnan(stacked).all(axis=0)
+    aqi = np.where(np.isnan(stacked), -np.inf, stacked).max(axis=0)
+    return np.where(has_data, aqi, np.nan)
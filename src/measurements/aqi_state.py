@@ -0,0 +1,275 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from math import ceil
+from time import time
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+from src.sensors.models import Sensor
+from .models import Measurement, MeasurementRollup
+from .rollups import HOUR, floor_hour, rollups_enabled
+from .shared_memory import SharedArrayFile, per_process
+
+# Periodo de promedio EPA de cada contaminante, en horas. PM2.5 y PM10 usan
+# NowCast sobre las últimas 12 horas en lugar del promedio de 24 horas.
+AVERAGING_HOURS = {"PM2.5": 12, "PM10": 12, "O3": 8, "CO": 8, "NO2": 1, "SO2": 1}
+NOWCAST_POLLUTANTS = ("PM2.5", "PM10")
+POLLUTANTS = tuple(AVERAGING_HOURS)
+
+# Fracción mínima de horas con datos para que un promedio sea válido (EPA: 75%)
+MIN_COVERAGE = 0.75
+
+# Peso mínimo de NowCast para material particulado
+NOWCAST_MIN_WEIGHT = 0.5
+
+# Horas que guarda el anillo de cada serie
+RING_HOURS = 24
+
+# Fila reservada para el agregado de toda la red
+CITY_SLOT = 0
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _hour_of(value: datetime) -> int:
+    return (value - _EPOCH) // timedelta(hours=1)
+
+
+def nowcast(hourly_means):
+    """
+    NowCast EPA para material particulado.
+    Args:
+        hourly_means (array-like): Promedios horarios, el más reciente primero
+            (NaN = hora sin datos).
+    Returns:
+        float | None: Concentración NowCast, o None si faltan datos en 2 de las
+            3 horas más recientes.
+    """
+    values = np.asarray(hourly_means, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if valid[:3].sum() < 2:
+        return None
+    low, high = values[valid].min(), values[valid].max()
+    weight = max(low / high if high > 0 else 1.0, NOWCAST_MIN_WEIGHT)
+    weights = np.where(valid, weight ** np.arange(len(values)), 0.0)
+    return float(np.nansum(weights * values) / weights.sum())
+
+
+def period_mean(hourly_means):
+    """
+    Promedio de los promedios horarios del periodo si al menos MIN_COVERAGE de
+    las horas tienen datos; None en otro caso.
+    """
+    values = np.asarray(hourly_means, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if valid.sum() < ceil(MIN_COVERAGE * len(values)):
+        return None
+    return float(values[valid].mean())
+
+
+class AQIState(SharedArrayFile):
+    """
+    Estado incremental del AQI en vivo: para cada estación y contaminante, un
+    anillo de RING_HOURS cubetas horarias (hora, suma, cantidad) en un archivo
+    mapeado en memoria compartido por todos los procesos (ver shared_memory.py).
+    La fila 0 (CITY_SLOT) acumula las lecturas de toda la red.
+
+    Cada lectura ingerida suma en la cubeta de su hora en O(1); si la cubeta
+    guarda una hora anterior se reinicia. Al consultar, los promedios de cada
+    periodo EPA se arman con las cubetas del anillo sin leer la base de datos.
+
+    Las lecturas repetidas (upsert en la ingesta) se suman dos veces; la carga
+    completa se repite cada AQI_STATE['REFRESH_SECONDS'] para acotar esa deriva.
+    """
+
+    def __init__(self, path: str, max_stations: int):
+        self.max_stations = max_stations
+        super().__init__(path)
+
+    def layout(self) -> list:
+        shape = (self.max_stations + 1, len(POLLUTANTS), RING_HOURS)
+        return [
+            ("seq", np.uint64, (self.max_stations + 1,)),
+            ("hours", np.int64, shape),
+            ("sums", np.float64, shape),
+            ("counts", np.float64, shape),
+        ]
+
+    def ensure_warm(self, refresh_seconds: int) -> None:
+        """
+        Carga las últimas RING_HOURS horas desde la base de datos si el estado
+        está frío o su última carga tiene más de refresh_seconds. Solo un
+        proceso hace la carga; el resto espera.
+        """
+        if self.is_warm and time() - self.loaded_at < refresh_seconds:
+            return
+        with self.locked():
+            if self.is_warm and time() - self.loaded_at < refresh_seconds:
+                return
+            now = datetime.now(dt_timezone.utc)
+            self._load(hourly_rows(floor_hour(now) - timedelta(hours=RING_HOURS - 1)))
+
+    def load(self, rows) -> None:
+        """
+        Reemplaza el contenido y lo marca como cargado.
+        Args:
+            rows (iterable): Tuplas (station_id, code, inicio_de_hora, cantidad,
+                suma), ver hourly_rows.
+        """
+        with self.locked():
+            self._load(rows)
+
+    def _load(self, rows):
+        with self.writing(range(self.max_stations + 1)):
+            self._hours[:] = 0
+            self._sums[:] = 0
+            self._counts[:] = 0
+            for station_id, code, bucket_start, count, total in rows:
+                hour = _hour_of(bucket_start)
+                for slot in self._slots(station_id):
+                    self._add(slot, POLLUTANTS.index(code), hour, count, total)
+        self.mark_warm(int(time()))
+
+    def _slots(self, station_id):
+        if station_id and station_id <= self.max_stations:
+            return (CITY_SLOT, station_id)
+        return (CITY_SLOT,)
+
+    def _add(self, slot, pollutant, hour, count, total):
+        ring = hour % RING_HOURS
+        stored = self._hours[slot, pollutant, ring]
+        if stored > hour:
+            # La cubeta ya pertenece a una hora más reciente: lectura fuera del anillo
+            return
+        if stored < hour:
+            self._hours[slot, pollutant, ring] = hour
+            self._sums[slot, pollutant, ring] = 0
+            self._counts[slot, pollutant, ring] = 0
+        self._sums[slot, pollutant, ring] += total
+        self._counts[slot, pollutant, ring] += count
+
+    def update(self, entries) -> None:
+        """
+        Suma lecturas ya confirmadas en la base de datos a sus cubetas horarias.
+        Si el estado está frío no hace nada: la próxima carga las leerá de la base.
+        Args:
+            entries (iterable): Tuplas (station_id, code, value, measure_date);
+                se ignoran los códigos que no son contaminantes del AQI.
+        """
+        by_slot = {}
+        for station_id, code, value, measure_date in entries:
+            if code not in AVERAGING_HOURS:
+                continue
+            reading = (POLLUTANTS.index(code), _hour_of(measure_date), value)
+            for slot in self._slots(station_id):
+                by_slot.setdefault(slot, []).append(reading)
+
+        if not by_slot or not self.is_warm:
+            return
+
+        with self.locked():
+            if not self.is_warm:
+                return
+            with self.writing(by_slot):
+                for slot, readings in by_slot.items():
+                    for pollutant, hour, value in readings:
+                        self._add(slot, pollutant, hour, 1, value)
+
+    def concentrations(self, station_id=None, now=None):
+        """
+        Concentración de cada contaminante para su periodo de promedio EPA:
+        NowCast (PM2.5, PM10), 8 horas (O3, CO) o 1 hora (NO2, SO2). Los
+        periodos terminan en la hora actual si ya tiene datos del contaminante,
+        o en la anterior si aún no.
+        Returns:
+            dict | None: {codigo: concentración o None sin datos suficientes};
+                None si el estado está frío o la estación excede la capacidad.
+        """
+        slot = int(station_id) if station_id else CITY_SLOT
+        if not self.is_warm or slot > self.max_stations:
+            return None
+        snapshot = self.snapshot(slot, self._hours, self._sums, self._counts)
+        if snapshot is None:
+            return None
+        hours, sums, counts = snapshot
+
+        current = _hour_of(now or datetime.now(dt_timezone.utc))
+        result = {}
+        for pollutant, code in enumerate(POLLUTANTS):
+            means = self._hourly_means(hours[pollutant], sums[pollutant], counts[pollutant], current, 1)
+            end = current if not np.isnan(means[0]) else current - 1
+            means = self._hourly_means(
+                hours[pollutant], sums[pollutant], counts[pollutant], end, AVERAGING_HOURS[code]
+            )
+            result[code] = nowcast(means) if code in NOWCAST_POLLUTANTS else period_mean(means)
+        return result
+
+    @staticmethod
+    def _hourly_means(hours, sums, counts, end, n_hours):
+        # Promedio de las n_hours horas que terminan en `end`, la más reciente primero
+        wanted = end - np.arange(n_hours)
+        ring = wanted % RING_HOURS
+        valid = (hours[ring] == wanted) & (counts[ring] > 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(valid, sums[ring] / counts[ring], np.nan)
+
+
+def hourly_rows(start: datetime):
+    """
+    Cantidad y suma por estación, contaminante y hora desde `start`, de
+    sensores activos, con una sola consulta agrupada (agregados horarios si
+    están disponibles).
+    Returns:
+        QuerySet: Tuplas (station_id, code, inicio_de_hora, cantidad, suma).
+    """
+    if rollups_enabled():
+        return (
+            MeasurementRollup.objects.filter(
+                granularity=HOUR,
+                bucket_start__gte=start,
+                sensor__status=Sensor.Status.ACTIVE,
+                variable__code__in=POLLUTANTS,
+            )
+            .values_list("station_id", "variable__code", "bucket_start")
+            .annotate(count=Sum("count"), total=Sum("sum"))
+            .order_by()
+        )
+    return (
+        Measurement.objects.filter(
+            measure_date__gte=start,
+            sensor__status=Sensor.Status.ACTIVE,
+            variable__code__in=POLLUTANTS,
+        )
+        .annotate(hour=TruncHour("measure_date", tzinfo=dt_timezone.utc))
+        .values_list("sensor__station_id", "variable__code", "hour")
+        .annotate(count=Count("value"), total=Sum("value"))
+        .order_by()
+    )
+
+
+def _open_state():
+    config = settings.AQI_STATE
+    return AQIState(config["PATH"], config["MAX_STATIONS"])
+
+
+_process_state = per_process(_open_state)
+
+
+def get_aqi_state():
+    """
+    Estado compartido del proceso actual, cargado y al día, o None si
+    settings.AQI_STATE está deshabilitado.
+    """
+    config = settings.AQI_STATE
+    if not config["ENABLED"]:
+        return None
+    state = _process_state()
+    state.ensure_warm(config["REFRESH_SECONDS"])
+    return state
+
+
+def current_state():
+    """Estado compartido sin forzar su carga (escritura desde la ingesta)."""
+    if not settings.AQI_STATE["ENABLED"]:
+        return None
+    return _process_state()
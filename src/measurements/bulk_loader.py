@@ -0,0 +1,170 @@
+import csv
+import tempfile
+from itertools import islice
+from django.db import connection, transaction
+from django.utils import timezone
+from .live_state import invalidate_live_state
+from .models import Measurement
+from .rollups import bucket_keys, refresh_rollups
+
+# Columnas escritas por COPY, en el orden de las tuplas de entrada (+ created_at, updated_at)
+COPY_COLUMNS = ("sensor_id", "variable_id", "value", "measure_date", "created_at", "updated_at")
+
+# Llave natural de una medición (ver Measurement.Meta.constraints)
+NATURAL_KEY_FIELDS = ("sensor", "variable", "measure_date")
+NATURAL_KEY_COLUMNS = ("sensor_id", "variable_id", "measure_date")
+
+# Tamaño en memoria a partir del cual el buffer intermedio pasa a disco
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Modos de resolución de conflictos sobre la llave natural
+ON_CONFLICT_IGNORE = "ignore"
+ON_CONFLICT_UPDATE = "update"
+
+
+def copy_measurements(
+    rows, chunk_size: int = 50000, on_conflict: str = None, update_rollups: bool = True
+) -> int:
+    """
+    Carga masiva de mediciones en la tabla 'measurement' usando COPY de PostgreSQL.
+
+    Evita construir instancias del ORM y el binding de parámetros de bulk_create:
+    las tuplas se serializan a CSV en un archivo temporal "spooled" (en memoria
+    hasta SPOOL_MAX_BYTES, luego en disco) y se envían con `copy_expert` por
+    bloques de `chunk_size` filas, todo dentro de una única transacción.
+    No aplica las validaciones de negocio: es para importadores y comandos
+    que generan datos ya confiables (seed, backfill de AQI).
+
+    Con `on_conflict` el bloque se copia a una tabla temporal y se inserta con
+    INSERT ... SELECT ... ON CONFLICT sobre la llave natural, de modo que una
+    carga puede re-ejecutarse sin duplicar filas.
+
+    Args:
+        rows (iterable): Tuplas (sensor_id, variable_id, value, measure_date).
+            Puede ser un generador; se consume de forma incremental.
+        chunk_size (int): Filas por cada sentencia COPY.
+        on_conflict (str, optional): None (COPY directo, un duplicado aborta la
+            carga), "ignore" (conserva la fila existente) o "update"
+            (sobrescribe el valor existente).
+        update_rollups (bool): Actualiza los agregados por hora y día de cada
+            bloque. Las cargas muy grandes pueden desactivarlo y ejecutar
+            `rebuild_rollups` al final.
+    Returns:
+        int: Cantidad de filas insertadas o actualizadas.
+    """
+    if on_conflict not in (None, ON_CONFLICT_IGNORE, ON_CONFLICT_UPDATE):
+        raise ValueError(f"Modo on_conflict no soportado: {on_conflict}")
+
+    if connection.vendor != "postgresql":
+        return _bulk_create_fallback(rows, chunk_size, on_conflict)
+
+    table = Measurement._meta.db_table
+    columns = ", ".join(COPY_COLUMNS)
+    created_at = timezone.now().isoformat()
+
+    if on_conflict:
+        copy_sql = (
+            f"COPY measurement_staging ({columns}) FROM STDIN WITH (FORMAT csv)"
+        )
+        key = ", ".join(NATURAL_KEY_COLUMNS)
+        action = (
+            "DO NOTHING"
+            if on_conflict == ON_CONFLICT_IGNORE
+            else "DO UPDATE SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at"
+        )
+        # DISTINCT ON: si el bloque repite una llave, gana la última fila recibida
+        merge_sql = (
+            f"INSERT INTO {table} ({columns}) "
+            f"SELECT DISTINCT ON ({key}) {columns} FROM measurement_staging "
+            f"ORDER BY {key}, row_number DESC "
+            f"ON CONFLICT ({key}) {action}"
+        )
+    else:
+        copy_sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    rows = iter(rows)
+    loaded = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        # El estado compartido en memoria se recarga desde la base al confirmar
+        transaction.on_commit(invalidate_live_state)
+        if on_conflict:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE IF NOT EXISTS measurement_staging ("
+                " row_number bigserial,"
+                " sensor_id integer NOT NULL,"
+                " variable_id integer NOT NULL,"
+                " value double precision NOT NULL,"
+                " measure_date timestamp with time zone NOT NULL,"
+                " created_at timestamp with time zone NOT NULL,"
+                " updated_at timestamp with time zone NOT NULL"
+                ") ON COMMIT DROP"
+            )
+            cursor.execute("TRUNCATE measurement_staging")
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            with tempfile.SpooledTemporaryFile(
+                max_size=SPOOL_MAX_BYTES, mode="w+", newline=""
+            ) as spool:
+                writer = csv.writer(spool)
+                for sensor_id, variable_id, value, measure_date in chunk:
+                    writer.writerow(
+                        (sensor_id, variable_id, value, measure_date.isoformat(), created_at, created_at)
+                    )
+                spool.seek(0)
+                cursor.copy_expert(copy_sql, spool)
+
+            if on_conflict:
+                cursor.execute(merge_sql)
+                loaded += cursor.rowcount
+                cursor.execute("TRUNCATE measurement_staging")
+            else:
+                loaded += len(chunk)
+
+            if update_rollups:
+                refresh_rollups(
+                    bucket_keys((sensor_id, variable_id, measure_date)
+                                for sensor_id, variable_id, _, measure_date in chunk)
+                )
+
+    return loaded
+
+
+def _bulk_create_fallback(rows, chunk_size: int, on_conflict: str = None) -> int:
+    """
+    Alternativa para motores sin COPY (p. ej. SQLite en pruebas locales).
+    """
+    options = {}
+    if on_conflict == ON_CONFLICT_IGNORE:
+        options = {"ignore_conflicts": True}
+    elif on_conflict == ON_CONFLICT_UPDATE:
+        options = {
+            "update_conflicts": True,
+            "unique_fields": NATURAL_KEY_FIELDS,
+            "update_fields": ["value", "updated_at"],
+        }
+
+    rows = iter(rows)
+    loaded = 0
+    with transaction.atomic():
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            Measurement.objects.bulk_create(
+                [
+                    Measurement(
+                        sensor_id=sensor_id,
+                        variable_id=variable_id,
+                        value=value,
+                        measure_date=measure_date,
+                    )
+                    for sensor_id, variable_id, value, measure_date in chunk
+                ],
+                **options,
+            )
+            loaded += len(chunk)
+    return loaded
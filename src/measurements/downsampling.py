@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+import numpy as np
+
+# Métodos de reducción soportados por el parámetro `downsample` del endpoint history
+METHOD_LTTB = "lttb"
+METHOD_MINMAX = "minmax"
+METHODS = (METHOD_LTTB, METHOD_MINMAX)
+
+# Filas leídas de la base de datos por bloque
+FETCH_CHUNK_SIZE = 10000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: elige `threshold` puntos que conservan la
+    forma visual de la serie. Se mantienen el primer y el último punto; del
+    resto, en cada bucket se elige el que forma el triángulo de mayor área con
+    el punto elegido anteriormente y el promedio del bucket siguiente.
+
+    Returns:
+        np.ndarray: Índices seleccionados, en orden creciente.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Relativo al primer punto para no perder precisión al pasar a float
+    x = (x - x[0]).astype(np.float64)
+    bounds = 1 + (np.arange(threshold - 1) * (n - 2)) // (threshold - 2)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+
+    for i in range(threshold - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        if i + 2 < len(bounds):
+            next_x = x[hi:bounds[i + 2]].mean()
+            next_y = y[hi:bounds[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        area = np.abs(
+            (x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Envolvente mínimo/máximo: divide la serie en max_points // 2 buckets y
+    conserva el mínimo y el máximo de cada uno, de modo que ningún pico ni
+    valle desaparece de la gráfica.
+
+    Returns:
+        np.ndarray: Índices seleccionados, en orden creciente.
+    """
+    n = len(y)
+    buckets = max_points // 2
+    if n <= max_points or buckets < 1:
+        return np.arange(n)
+
+    bounds = (np.arange(buckets + 1) * n) // buckets
+    selected = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        segment = y[lo:hi]
+        selected.append(lo + int(np.argmin(segment)))
+        selected.append(lo + int(np.argmax(segment)))
+    return np.unique(selected)
+
+
+def downsample(points, max_points: int, method: str = METHOD_LTTB) -> list:
+    """
+    Reduce una serie de tiempo a lo sumo `max_points` puntos.
+
+    La serie se consume por bloques y se acumula en arreglos NumPy (fecha en
+    microsegundos + valor), sin materializar un diccionario por fila.
+
+    Args:
+        points (iterable): Tuplas (measure_date, value) ordenadas por fecha.
+            Puede ser un iterador de servidor (QuerySet.iterator()).
+        max_points (int): Cantidad máxima de puntos en la respuesta.
+        method (str): 'lttb' o 'minmax'.
+    Returns:
+        list: Diccionarios {"measure_date", "value"} ordenados por fecha.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método de reducción no soportado: {method}")
+
+    x, y = _collect(points)
+    if method == METHOD_MINMAX:
+        indices = minmax_indices(y, max_points)
+    else:
+        indices = lttb_indices(x, y, max_points)
+
+    return [
+        {"measure_date": _EPOCH + timedelta(microseconds=micros), "value": value}
+        for micros, value in zip(x[indices].tolist(), y[indices].tolist())
+    ]
+
+
+def _collect(points):
+    points = iter(points)
+    xs, ys = [], []
+    while True:
+        chunk = list(islice(points, FETCH_CHUNK_SIZE))
+        if not chunk:
+            break
+        xs.append(
+            np.fromiter(
+                ((measure_date - _EPOCH) // _MICROSECOND for measure_date, _ in chunk),
+                dtype=np.int64,
+                count=len(chunk),
+            )
+        )
+        ys.append(
+            np.fromiter((value for _, value in chunk), dtype=np.float64, count=len(chunk))
+        )
+    if not xs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    return np.concatenate(xs), np.concatenate(ys)
@@ -0,0 +1,221 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+# Formatos de exportación soportados (parámetro export_format)
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+FORMAT_ARROW = "arrow"
+FORMAT_PARQUET = "parquet"
+FORMATS = {
+    FORMAT_CSV: "text/csv",
+    FORMAT_NDJSON: "application/x-ndjson",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+    FORMAT_PARQUET: "application/vnd.apache.parquet",
+}
+
+# Formatos de texto (admiten gzip); los columnares ya viajan en binario compacto
+TEXT_FORMATS = (FORMAT_CSV, FORMAT_NDJSON)
+
+# Filas leídas por vuelta del cursor de servidor
+EXPORT_CHUNK_SIZE = 5000
+
+# Filas serializadas antes de entregar un bloque a la respuesta
+ROWS_PER_WRITE = 1000
+
+EXPORT_FIELDS = (
+    "measurement_id",
+    "measure_date",
+    "sensor_id",
+    "sensor__serial_number",
+    "sensor__station_id",
+    "variable__code",
+    "variable__unit",
+    "value",
+)
+
+# Nombres de columna en el archivo exportado
+EXPORT_COLUMNS = (
+    "measurement_id",
+    "measure_date",
+    "sensor_id",
+    "sensor_serial",
+    "station_id",
+    "variable_code",
+    "variable_unit",
+    "value",
+)
+
+
+def export_rows(queryset):
+    """
+    Recorre las mediciones con un cursor de servidor (QuerySet.iterator), sin
+    cargar el resultado completo en memoria.
+    Returns:
+        iterator: Tuplas con los valores de EXPORT_COLUMNS.
+    """
+    return (
+        queryset.order_by("measure_date", "measurement_id")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def csv_stream(rows):
+    """
+    Serializa las filas a CSV (con encabezado) en bloques de ROWS_PER_WRITE.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in rows:
+        measure_date = row[1]
+        writer.writerow(row[:1] + (measure_date.isoformat(),) + row[2:])
+        pending += 1
+        if pending >= ROWS_PER_WRITE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def ndjson_stream(rows):
+    """
+    Serializa las filas como JSON delimitado por saltos de línea (un objeto por medición).
+    """
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record["measure_date"] = record["measure_date"].isoformat()
+        lines.append(json.dumps(record))
+        if len(lines) >= ROWS_PER_WRITE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def gzip_stream(chunks):
+    """
+    Comprime un flujo de texto en formato gzip de forma incremental.
+    """
+    compressor = zlib.compressobj(wbits=31)  # 16 + MAX_WBITS: cabecera gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def arrow_schema():
+    """
+    Esquema columnar de la exportación (mismas columnas que EXPORT_COLUMNS).
+    """
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("measurement_id", pa.int64()),
+            ("measure_date", pa.timestamp("us", tz="UTC")),
+            ("sensor_id", pa.int64()),
+            ("sensor_serial", pa.string()),
+            ("station_id", pa.int64()),
+            ("variable_code", pa.string()),
+            ("variable_unit", pa.string()),
+            ("value", pa.float64()),
+        ]
+    )
+
+
+def record_batches(rows, schema):
+    """
+    Agrupa las filas del cursor en RecordBatch de EXPORT_CHUNK_SIZE filas,
+    construidos columna por columna.
+    """
+    import pyarrow as pa
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            break
+        columns = zip(*chunk)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema,
+        )
+
+
+class _ChunkSink:
+    """
+    Destino de escritura para pyarrow que acumula los bytes escritos hasta que
+    el generador los entrega a la respuesta.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def columnar_stream(rows, export_format: str = FORMAT_ARROW):
+    """
+    Serializa las filas en formato columnar, un lote por bloque del cursor:
+    - arrow: Arrow IPC stream (se lee con pyarrow.ipc.open_stream(...).read_pandas()).
+    - parquet: un row group por lote, comprimido con zstd.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    if export_format == FORMAT_PARQUET:
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    for batch in record_batches(rows, schema):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def export_stream(queryset, export_format: str = FORMAT_CSV, compress: bool = False):
+    """
+    Flujo completo de exportación: cursor de servidor -> CSV/NDJSON (gzip
+    opcional) o Arrow/Parquet.
+    Returns:
+        iterator: Bloques (str o bytes) para un StreamingHttpResponse.
+    """
+    rows = export_rows(queryset)
+    if export_format not in TEXT_FORMATS:
+        return columnar_stream(rows, export_format)
+    if export_format == FORMAT_NDJSON:
+        stream = ndjson_stream(rows)
+    else:
+        stream = csv_stream(rows)
+    return gzip_stream(stream) if compress else stream
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from itertools import groupby
+from django.db.models import Avg
+from .downsampling import FETCH_CHUNK_SIZE, METHOD_LTTB, downsample
+from .models import Measurement
+from .rollups import (
+    parse_bound,
+    rollup_bucketed_series,
+    rollup_group_fields,
+    rollup_series,
+    select_tier,
+    whole_hour_offsets,
+)
+from .timeseries import (
+    AGG_AVG,
+    RESOLUTIONS,
+    bucketed_series,
+    raw_aggregate,
+    rollup_aggregate,
+)
+
+
+def history_series(
+    variable_codes,
+    start_date,
+    end_date,
+    station_ids=None,
+    resolution=None,
+    agg=AGG_AVG,
+    tzinfo=None,
+    max_points=None,
+    method=METHOD_LTTB,
+) -> dict:
+    """
+    Construye las series de tiempo del endpoint history para varias variables
+    y estaciones con una sola consulta agrupada.
+
+    Sin station_ids se calcula el promedio de la red (Ciudad) por variable.
+    El origen de los datos se elige igual para todas las series:
+    1. resolution: agrupación por periodos en la base de datos (desde los
+       agregados horarios si el rango, la función y la zona horaria lo permiten).
+    2. Rango largo: agregados por hora o día (settings.MEASUREMENT_ROLLUP_TIERS).
+    3. En otro caso: mediciones crudas.
+    Con max_points cada serie se reduce en el servidor (ver downsampling.py).
+
+    Args:
+        variable_codes (list): Códigos de variable (ej: ['PM2.5', 'PM10']).
+        start_date (str): Fecha de inicio.
+        end_date (str): Fecha de fin.
+        station_ids (list, optional): IDs de estación; None para la red completa.
+    Returns:
+        dict: {(variable_code, station_id): [{"measure_date", "value"}, ...]}
+            con una entrada por cada combinación solicitada, en orden;
+            station_id es None para el promedio de la red.
+    """
+    start, end = parse_bound(start_date), parse_bound(end_date)
+    tier = select_tier(start, end)
+
+    raw = Measurement.objects.filter(
+        variable__code__in=variable_codes,
+        measure_date__range=[start_date, end_date],
+    )
+    raw_group = ("variable__code",)
+    if station_ids:
+        raw = raw.filter(sensor__station_id__in=station_ids)
+        raw_group = ("variable__code", "sensor__station_id")
+
+    rollup_agg = rollup_aggregate(agg) if resolution else None
+    if (
+        resolution
+        and tier
+        and rollup_agg is not None
+        and RESOLUTIONS[resolution] >= timedelta(hours=1)
+        and whole_hour_offsets(tzinfo, start, end)
+    ):
+        group, date_key = rollup_group_fields(station_ids), "bucket"
+        rows = rollup_bucketed_series(
+            variable_codes, start, end, resolution, rollup_agg, tzinfo, station_ids
+        )
+    elif resolution:
+        group, date_key = raw_group, "bucket"
+        rows = bucketed_series(
+            raw, "measure_date", resolution, raw_aggregate(agg), tzinfo, group_by=raw_group
+        )
+    elif tier:
+        group, date_key = rollup_group_fields(station_ids), "measure_date"
+        rows = rollup_series(variable_codes, start, end, tier, station_ids)
+    elif station_ids:
+        # Estaciones específicas -> Datos crudos
+        group, date_key = raw_group, "measure_date"
+        rows = raw.values(*raw_group, "measure_date", "value").order_by(*raw_group, "measure_date")
+    else:
+        # Todas las estaciones -> Promedio de ciudad
+        group, date_key = raw_group, "measure_date"
+        rows = (
+            raw.values(*raw_group, "measure_date")
+            .annotate(value=Avg("value"))
+            .order_by(*raw_group, "measure_date")
+        )
+
+    series = {
+        (code, int(station_id) if station_id else None): []
+        for code in variable_codes
+        for station_id in (station_ids or [None])
+    }
+
+    # Lectura por bloques (cursor de servidor); las filas llegan ordenadas por serie
+    def series_key(row):
+        return tuple(row[field] for field in group)
+
+    for key, group_rows in groupby(rows.iterator(chunk_size=FETCH_CHUNK_SIZE), key=series_key):
+        key = key if station_ids else (key[0], None)
+        points = ((row[date_key], row["value"]) for row in group_rows)
+        if max_points:
+            series[key] = downsample(points, max_points, method)
+        else:
+            series[key] = [
+                {"measure_date": measure_date, "value": value}
+                for measure_date, value in points
+            ]
+
+    return series
@@ -0,0 +1,256 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from src.sensors.models import Sensor
+from .models import Measurement, VariableCatalog
+from .shared_memory import SharedArrayFile, per_process
+
+# Fila reservada para la última medición de toda la red (sin filtro de estación)
+CITY_SLOT = 0
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class LatestMatrix(SharedArrayFile):
+    """
+    Tabla (estación x variable) con el último valor y su fecha, en un archivo
+    mapeado en memoria (mmap) compartido por todos los procesos del servidor.
+
+    La fila de una estación es su station_id y la columna de una variable su
+    variable_id; la fila 0 (CITY_SLOT) guarda la última medición de la red.
+    Las filas se protegen con el seqlock de SharedArrayFile: las lecturas no
+    toman ningún bloqueo.
+
+    El contador de secuencia también sirve como marca de agua: cambia cada vez
+    que llega una medición nueva a la fila. La versión del encabezado es la
+    versión del catálogo de variables.
+    """
+
+    def __init__(self, path: str, max_stations: int, max_variables: int):
+        self.max_stations = max_stations
+        self.max_variables = max_variables
+        super().__init__(path)
+
+    def layout(self) -> list:
+        rows, cols = self.max_stations + 1, self.max_variables + 1
+        return [
+            ("seq", np.uint64, (rows,)),
+            ("values", np.float64, (rows, cols)),
+            ("dates", np.int64, (rows, cols)),
+        ]
+
+    @property
+    def catalog_version(self) -> int:
+        return self.version
+
+    def ensure_warm(self) -> None:
+        """
+        Carga la última medición de cada estación y de la red desde la base de
+        datos si la tabla está fría. Solo un proceso hace la carga; el resto espera.
+        """
+        if self.is_warm:
+            return
+        with self.locked():
+            if self.is_warm:
+                return
+            self._load(latest_rows(per_station=True), latest_rows())
+
+    def load(self, per_station, city) -> None:
+        """
+        Reemplaza el contenido de la tabla y la marca como cargada.
+        Args:
+            per_station (iterable): Filas de latest_rows(per_station=True).
+            city (iterable): Filas de latest_rows() (última medición de la red).
+        """
+        with self.locked():
+            self._load(per_station, city)
+
+    def _load(self, per_station, city):
+        self._seq += 1
+        self._values[:] = 0
+        self._dates[:] = 0
+        for row in per_station:
+            self._set_cell(row["sensor__station_id"], row)
+        for row in city:
+            self._set_cell(CITY_SLOT, row)
+        self._seq += 1
+        self.mark_warm()
+
+    def _set_cell(self, slot, row):
+        if slot is None or slot > self.max_stations or row["variable_id"] > self.max_variables:
+            return
+        self._values[slot, row["variable_id"]] = row["value"]
+        self._dates[slot, row["variable_id"]] = (row["measure_date"] - _EPOCH) // _MICROSECOND
+
+    def bump_catalog(self) -> None:
+        """Avisa a todos los procesos que el catálogo de variables cambió."""
+        self.bump_version()
+
+    def publish(self, entries) -> None:
+        """
+        Registra mediciones ya confirmadas en la base de datos. Una celda solo se
+        reemplaza por una medición igual o más reciente, por lo que cargas
+        históricas no pisan el último valor.
+        Si la tabla está fría no hace nada: la próxima carga las leerá de la base.
+        Args:
+            entries (iterable): Tuplas (station_id, variable_id, value, measure_date).
+        """
+        by_slot = {}
+        for station_id, variable_id, value, measure_date in entries:
+            if variable_id > self.max_variables:
+                continue
+            micros = (measure_date - _EPOCH) // _MICROSECOND
+            slots = (CITY_SLOT, station_id) if station_id else (CITY_SLOT,)
+            for slot in slots:
+                if slot <= self.max_stations:
+                    by_slot.setdefault(slot, []).append((variable_id, value, micros))
+
+        if not by_slot or not self.is_warm:
+            return
+
+        with self.locked():
+            if not self.is_warm:
+                return
+            with self.writing(by_slot):
+                for slot, cells in by_slot.items():
+                    for variable_id, value, micros in cells:
+                        if micros >= self._dates[slot, variable_id]:
+                            self._values[slot, variable_id] = value
+                            self._dates[slot, variable_id] = micros
+
+    def read(self, station_ids=None, variable_ids=()):
+        """
+        Lectura sin bloqueos de la última medición por variable.
+        Args:
+            station_ids (list, optional): IDs de estación; None para la red.
+            variable_ids (iterable): IDs del catálogo que debe cubrir la tabla.
+        Returns:
+            list | None: Filas {"sensor__station_id", "variable_id", "value",
+                "measure_date"} (mismo formato que latest_rows), o None si la
+                tabla está fría o no cubre las estaciones/variables pedidas.
+        """
+        if not self.is_warm or any(v > self.max_variables for v in variable_ids):
+            return None
+        slots = [int(station_id) for station_id in station_ids] if station_ids else [CITY_SLOT]
+        if any(slot > self.max_stations for slot in slots):
+            return None
+
+        rows = []
+        for slot in slots:
+            snapshot = self.snapshot(slot, self._values, self._dates)
+            if snapshot is None:
+                return None
+            values, dates = snapshot
+            for variable_id in np.flatnonzero(dates).tolist():
+                rows.append(
+                    {
+                        "sensor__station_id": slot if station_ids else None,
+                        "variable_id": variable_id,
+                        "value": float(values[variable_id]),
+                        "measure_date": _EPOCH + timedelta(microseconds=int(dates[variable_id])),
+                    }
+                )
+        return rows
+
+    def watermark(self, station_id=None):
+        """
+        Contador de actualizaciones de la fila (estación o red), o None si la
+        tabla está fría o la estación excede la capacidad.
+        """
+        slot = int(station_id) if station_id else CITY_SLOT
+        if not self.is_warm or slot > self.max_stations:
+            return None
+        return int(self._seq[slot])
+
+def latest_rows(station_ids=None, per_station=False):
+    """
+    Última medición de sensores activos por variable, en una sola consulta.
+
+    Para cada par (sensor activo, variable del catálogo) un LATERAL con
+    ORDER BY measure_date DESC LIMIT 1 lee una sola entrada del índice de la
+    llave natural (sensor, variable, measure_date), recorriendo las
+    particiones de la más reciente hacia atrás; luego DISTINCT ON elige la
+    más reciente por variable (o por estación y variable) entre esas pocas
+    filas. El costo depende de la cantidad de sensores y variables, no del
+    tamaño de la tabla.
+
+    Args:
+        station_ids (list, optional): Restringe a esas estaciones (una fila por
+            estación y variable).
+        per_station (bool): Sin station_ids, una fila por cada estación y variable.
+    Returns:
+        list: Diccionarios {"sensor__station_id", "variable_id", "value", "measure_date"}.
+    """
+    distinct = "latest.variable_id"
+    filters = ["s.status = %s"]
+    params = [Sensor.Status.ACTIVE]
+    if station_ids:
+        filters.append("s.station_id = ANY(%s)")
+        params.append([int(station_id) for station_id in station_ids])
+    if station_ids or per_station:
+        filters.append("s.station_id IS NOT NULL")
+        distinct = "s.station_id, latest.variable_id"
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT ON ({distinct}) "
+            "s.station_id, latest.variable_id, latest.value, latest.measure_date "
+            f"FROM {Sensor._meta.db_table} s "
+            f"CROSS JOIN {VariableCatalog._meta.db_table} v "
+            "CROSS JOIN LATERAL ("
+            "SELECT m.variable_id, m.value, m.measure_date, m.measurement_id "
+            f"FROM {Measurement._meta.db_table} m "
+            "WHERE m.sensor_id = s.sensor_id AND m.variable_id = v.variable_id "
+            "ORDER BY m.measure_date DESC LIMIT 1"
+            ") latest "
+            f"WHERE {' AND '.join(filters)} "
+            f"ORDER BY {distinct}, latest.measure_date DESC, latest.measurement_id DESC",
+            params,
+        )
+        return [
+            {
+                "sensor__station_id": station_id,
+                "variable_id": variable_id,
+                "value": value,
+                "measure_date": measure_date,
+            }
+            for station_id, variable_id, value, measure_date in cursor.fetchall()
+        ]
+
+
+_catalog = {"version": None, "rows": None}
+
+
+def _open_matrix():
+    config = settings.LATEST_MATRIX
+    return LatestMatrix(config["PATH"], config["MAX_STATIONS"], config["MAX_VARIABLES"])
+
+
+_process_matrix = per_process(_open_matrix)
+
+
+def get_latest_matrix():
+    """
+    Tabla compartida del proceso actual, o None si settings.LATEST_MATRIX está
+    deshabilitada. Se reabre después de un fork (cada worker mapea el archivo).
+    """
+    if not settings.LATEST_MATRIX["ENABLED"]:
+        return None
+    return _process_matrix()
+
+
+def variable_catalog() -> list:
+    """
+    Catálogo de variables [(variable_id, code, unit)], guardado en el proceso
+    mientras la versión de catálogo de la tabla compartida no cambie.
+    """
+    matrix = get_latest_matrix()
+    version = matrix.catalog_version if matrix is not None else None
+    if version is None or _catalog["version"] != version:
+        rows = list(VariableCatalog.objects.values_list("variable_id", "code", "unit"))
+        if version is None:
+            return rows
+        _catalog.update(version=version, rows=rows)
+    return _catalog["rows"]
@@ -0,0 +1,82 @@
+from src.sensors.models import Sensor
+from .aqi_state import current_state
+from .latest_matrix import get_latest_matrix
+from .recent_series import current_recent_series
+from .report_cache import get_report_cache, note_ingested
+from .models import Measurement, VariableCatalog
+
+
+def publish_measurements(measurements) -> None:
+    """
+    Publica mediciones recién confirmadas en el estado compartido en memoria:
+    la tabla de últimos valores (latest_matrix.py), el estado incremental del
+    AQI (aqi_state.py) y las series recientes (recent_series.py). La estación y
+    el código de variable se toman de las instancias ya cargadas; los que
+    falten se resuelven con una consulta cada uno.
+    """
+    matrix = get_latest_matrix()
+    if matrix is not None and not matrix.is_warm:
+        matrix = None
+    state = current_state()
+    if state is not None and not state.is_warm:
+        state = None
+    # Lecturas atrasadas: los reportes guardados de periodos cerrados se revalidan
+    note_ingested(m.measure_date for m in measurements)
+    series = current_recent_series()
+    if series is not None:
+        # append no hace nada si las series están frías
+        series.append((m.sensor_id, m.variable_id, m.value, m.measure_date) for m in measurements)
+    if matrix is None and state is None:
+        return
+
+    missing = {m.sensor_id for m in measurements if not Measurement.sensor.is_cached(m)}
+    stations = dict(
+        Sensor.objects.filter(pk__in=missing).values_list("sensor_id", "station_id")
+    ) if missing else {}
+    readings = [
+        (
+            m.sensor.station_id if Measurement.sensor.is_cached(m) else stations.get(m.sensor_id),
+            m,
+        )
+        for m in measurements
+    ]
+
+    if matrix is not None:
+        matrix.publish(
+            (station_id, m.variable_id, m.value, m.measure_date) for station_id, m in readings
+        )
+
+    if state is not None:
+        missing = {m.variable_id for m in measurements if not Measurement.variable.is_cached(m)}
+        codes = dict(
+            VariableCatalog.objects.filter(pk__in=missing).values_list("variable_id", "code")
+        ) if missing else {}
+        state.update(
+            (
+                station_id,
+                m.variable.code if Measurement.variable.is_cached(m) else codes.get(m.variable_id),
+                m.value,
+                m.measure_date,
+            )
+            for station_id, m in readings
+        )
+
+
+def invalidate_live_state() -> None:
+    """
+    Fuerza la recarga del estado compartido (cargas masivas, borrados, cambios
+    de sensor o de catálogo) y la revalidación de los reportes en caché de
+    periodos cerrados.
+    """
+    matrix = get_latest_matrix()
+    if matrix is not None:
+        matrix.invalidate()
+    state = current_state()
+    if state is not None:
+        state.invalidate()
+    series = current_recent_series()
+    if series is not None:
+        series.invalidate()
+    cache = get_report_cache()
+    if cache is not None:
+        cache.forget_closed()
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from src.measurements.partitions import (
+    ensure_partitions,
+    expire_partitions,
+    is_partitioned,
+    list_partitions,
+)
+
+
+class Command(BaseCommand):
+    """
+    Mantenimiento de las particiones mensuales de la tabla 'measurement'.
+
+    1. Pre-crea las particiones de los próximos meses (--months-ahead).
+    2. Separa las particiones fuera de la ventana de retención (--retention-months)
+       y, con --drop, las elimina.
+
+    Pensado para ejecutarse en el arranque y periódicamente (p. ej. cron diario).
+    """
+    help = "Crea particiones futuras y separa/elimina las vencidas de la tabla measurement"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=settings.MEASUREMENT_PARTITION_MONTHS_AHEAD,
+            help="Meses futuros para los que se garantiza una partición.",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=settings.MEASUREMENT_RETENTION_MONTHS,
+            help="Meses a conservar (incluido el actual). Sin valor no se expira nada.",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Eliminar las particiones vencidas en lugar de solo separarlas.",
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write(
+                self.style.WARNING("La tabla measurement no está particionada; nada que hacer.")
+            )
+            return
+
+        created = ensure_partitions(months_ahead=options["months_ahead"])
+        for name in created:
+            self.stdout.write(f"Partición creada: {name}")
+
+        retention = options["retention_months"]
+        if retention:
+            expired = expire_partitions(retention, drop=options["drop"])
+            action = "eliminada" if options["drop"] else "separada"
+            for name in expired:
+                self.stdout.write(f"Partición {action}: {name}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Particiones activas: {len(list_partitions())}")
+        )
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from src.measurements.models import ReportJob
+from src.measurements.report_jobs import claim_next_job, process_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    """
+    Worker de reportes PDF asíncronos (ver ReportJobViewSet).
+
+    Toma los trabajos pendientes en orden de llegada, genera cada PDF en
+    MEDIA_ROOT y marca el trabajo como completado o fallido. Se pueden correr
+    varios workers a la vez: cada trabajo lo toma uno solo (SKIP LOCKED).
+    """
+    help = "Procesa la cola de reportes PDF asíncronos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Procesa los trabajos pendientes y termina, sin esperar nuevos.",
+        )
+        parser.add_argument(
+            "--poll-seconds",
+            type=float,
+            default=settings.REPORT_JOBS["POLL_SECONDS"],
+            help="Espera entre consultas cuando la cola está vacía.",
+        )
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=settings.REPORT_JOBS["STALE_MINUTES"])
+        self.stdout.write(self.style.SUCCESS("Worker de reportes iniciado."))
+
+        while True:
+            close_old_connections()
+            requeued = requeue_stale_jobs(stale_after)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Trabajos reencolados: {requeued}"))
+
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_seconds"])
+                continue
+
+            job = process_job(job)
+            if job.status == ReportJob.Status.COMPLETED:
+                self.stdout.write(self.style.SUCCESS(f"Reporte #{job.job_id}: {job.file.name}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"Reporte #{job.job_id} falló: {job.error}"))
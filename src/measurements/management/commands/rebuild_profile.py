@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from src.measurements.utils import cali_profile
+
+
+class Command(BaseCommand):
+    """
+    Recalcula el perfil horario de contaminantes desde el CSV y reescribe su
+    caché en disco (data/cali_profile.json).
+
+    El simulador y seed_history leen la caché mientras el CSV no cambie (fecha
+    de modificación y tamaño); este comando la regenera a pedido, por ejemplo
+    al desplegar una imagen con un CSV nuevo.
+    """
+    help = "Recalcula y guarda en caché el perfil horario de contaminantes"
+
+    def handle(self, *args, **options):
+        if cali_profile.csv_signature() is None:
+            raise CommandError(f"No se encontró el CSV: {cali_profile.CSV_PATH}")
+
+        try:
+            profile, saved = cali_profile.rebuild_profile()
+        except Exception as e:
+            raise CommandError(f"Error procesando CSV: {e}")
+
+        if not saved:
+            raise CommandError(f"No se pudo escribir la caché: {cali_profile.CACHE_PATH}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Perfil horario guardado ({len(profile)} horas): {cali_profile.CACHE_PATH}")
+        )
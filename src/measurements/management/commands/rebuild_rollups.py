@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from src.measurements.rollups import parse_bound, rebuild_rollups, rollups_enabled
+
+
+class Command(BaseCommand):
+    """
+    Reconstruye la tabla de agregados (measurement_rollup) desde las mediciones crudas.
+
+    Los agregados se mantienen solos en cada ingesta; este comando es para
+    cargas hechas sin actualizar agregados, reasignación de sensores a otra
+    estación o reparaciones. Sin fechas reconstruye todo el histórico.
+    """
+    help = "Reconstruye los agregados por hora y día de las mediciones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="Fecha inicial (YYYY-MM-DD o ISO 8601).")
+        parser.add_argument("--end", help="Fecha final (YYYY-MM-DD o ISO 8601).")
+
+    def handle(self, *args, **options):
+        if not rollups_enabled():
+            raise CommandError("Los agregados requieren PostgreSQL.")
+
+        start = parse_bound(options["start"]) if options["start"] else None
+        end = parse_bound(options["end"]) if options["end"] else None
+        if (options["start"] and start is None) or (options["end"] and end is None):
+            raise CommandError("Formato de fecha inválido.")
+
+        created = rebuild_rollups(start, end)
+        self.stdout.write(
+            self.style.SUCCESS(f"Agregados horarios reconstruidos: {created}")
+        )
@@ -0,0 +1,86 @@
+import json
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from src.measurements.models import Measurement, MeasurementDeadLetter
+from src.measurements.services import MeasurementService
+
+
+class Command(BaseCommand):
+    """
+    Reprocesa las mediciones que el buffer de escritura diferida guardó en
+    measurement_dead_letter. La escritura es idempotente (ON CONFLICT sobre
+    la llave natural); las que se escriben se eliminan de la tabla y las que
+    vuelven a fallar se conservan con el nuevo error.
+
+    Antes importa a la tabla el archivo local de lotes que el buffer no pudo
+    guardar en ella (MEASUREMENT_WRITE_BUFFER['SPILL_PATH']).
+    """
+    help = "Reintenta la escritura de las mediciones no persistidas por el buffer"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Mediciones por lote."
+        )
+
+    def handle(self, *args, **options):
+        imported = self.import_spill_file(settings.MEASUREMENT_WRITE_BUFFER["SPILL_PATH"])
+        if imported:
+            self.stdout.write(f"Mediciones importadas del archivo local: {imported}")
+
+        written = failed = 0
+        last_id = 0
+        while True:
+            letters = list(
+                MeasurementDeadLetter.objects.filter(dead_letter_id__gt=last_id)
+                .order_by("dead_letter_id")[: options["batch_size"]]
+            )
+            if not letters:
+                break
+            last_id = letters[-1].dead_letter_id
+            batch = [
+                Measurement(
+                    sensor_id=letter.sensor_id,
+                    variable_id=letter.variable_id,
+                    value=letter.value,
+                    measure_date=letter.measure_date,
+                )
+                for letter in letters
+            ]
+            try:
+                MeasurementService.bulk_insert(batch)
+            except Exception as e:
+                MeasurementDeadLetter.objects.filter(
+                    pk__in=[letter.pk for letter in letters]
+                ).update(error=str(e))
+                failed += len(letters)
+                continue
+            MeasurementDeadLetter.objects.filter(pk__in=[letter.pk for letter in letters]).delete()
+            written += len(letters)
+
+        self.stdout.write(self.style.SUCCESS(f"Mediciones reprocesadas: {written}"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Mediciones que siguen fallando: {failed}"))
+
+    @staticmethod
+    def import_spill_file(path) -> int:
+        """
+        Pasa a measurement_dead_letter las mediciones del archivo local.
+        El archivo se renombra antes de leerlo para que el buffer empiece uno
+        nuevo, y se elimina solo después de guardar sus filas.
+        Returns:
+            int: Cantidad de mediciones importadas.
+        """
+        replaying = f"{path}.replay"
+        if not os.path.exists(replaying):
+            if not os.path.exists(path):
+                return 0
+            os.replace(path, replaying)
+
+        with open(replaying, encoding="utf-8") as spill_file:
+            letters = [
+                MeasurementDeadLetter(**json.loads(line)) for line in spill_file if line.strip()
+            ]
+        MeasurementDeadLetter.objects.bulk_create(letters)
+        os.remove(replaying)
+        return len(letters)
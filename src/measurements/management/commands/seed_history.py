@@ -1,12 +1,16 @@
 import random
 import math
 from datetime import timedelta
+import numpy as np
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from src.sensors.models import Sensor
-from src.measurements.models import VariableCatalog, Measurement
+from src.measurements.bulk_loader import copy_measurements
+from src.measurements.models import VariableCatalog, Measurement, MeasurementRollup
+from src.measurements.partitions import ensure_partitions
+from src.measurements.rollups import rebuild_rollups
 from src.measurements.services import AQICalculatorService
-from src.measurements.utils.cali_profile import HOURLY_PROFILE
+from src.measurements.utils.cali_profile import get_hourly_profile
 
 
 class Command(BaseCommand):
@@ -33,6 +37,7 @@ class Command(BaseCommand):
 
         # Limpieza
         Measurement.objects.all().delete()
+        MeasurementRollup.objects.all().delete()
 
         now = timezone.now()
         start_date = now.replace(month=11, day=1, hour=0, minute=0, second=0)
@@ -40,15 +45,23 @@ class Command(BaseCommand):
             start_date = start_date.replace(year=now.year - 1)
         end_date = now
 
-        sensors = Sensor.objects.filter(status=Sensor.Status.ACTIVE)
+        # Particiones mensuales para todo el rango del histórico
+        ensure_partitions(start=start_date)
+
+        sensors = list(Sensor.objects.filter(status=Sensor.Status.ACTIVE))
+        aqi_sensor = sensors[0] if sensors else None
         variables_map = {v.code: v for v in VariableCatalog.objects.all()}
         aqi_variable, _ = VariableCatalog.objects.get_or_create(
             code="AQI",
             defaults={"name": "AQI", "unit": "AQI", "max_expected_value": 500},
         )
 
+        hourly_profile = get_hourly_profile()
         current_date = start_date
         batch = []
+        # Por hora: (fecha, hora, día anómalo, evento fuerte) y concentración de cada contaminante
+        aqi_hours = []
+        aqi_inputs = {code: [] for code in AQICalculatorService.SUPPORTED_POLLUTANTS}
 
         total_records = 0
         total_anomalies = 0
@@ -59,7 +72,7 @@ class Command(BaseCommand):
             hour = current_date.hour
 
             # Datos base del CSV
-            base_data = HOURLY_PROFILE.get(str(hour), {})
+            base_data = hourly_profile.get(str(hour), {})
 
             # Flags de Alerta
             is_anomaly_day = (month, day) in self.ANOMALY_DATES
@@ -113,52 +126,23 @@ class Command(BaseCommand):
                     current_hour_values[code] = final_val
 
                     batch.append(
-                        Measurement(
-                            sensor=sensor,
-                            variable=var_obj,
-                            value=round(final_val, 2),
-                            measure_date=current_date,
+                        (
+                            sensor.sensor_id,
+                            var_obj.variable_id,
+                            round(final_val, 2),
+                            current_date,
                         )
                     )
                     total_records += 1
 
-            # --- calulo de puntaje AQI ---
-            try:
-                aqi_vals = []
-                for c, v in current_hour_values.items():
-                    try:
-                        aqi_vals.append(AQICalculatorService.calculate_sub_index(c, v))
-                    except:
-                        pass
-
-                if aqi_vals:
-                    final_aqi = max(aqi_vals)
-                    is_aqi_anomaly = False
-
-                    # Forzar AQI visual el 7 Nov si no subió naturalmente
-                    if is_strong_event and 8 <= hour <= 22 and final_aqi < 110:
-                        final_aqi = random.uniform(115, 150)
-                        is_aqi_anomaly = True
-
-                    # Si los contaminantes individuales fueron anomalía, el AQI resultante también cuenta como registro anómalo
-                    if is_anomaly_day and (is_strong_event or is_aqi_anomaly):
-                        total_anomalies += 1
-
-                    batch.append(
-                        Measurement(
-                            sensor=sensors.first(),
-                            variable=aqi_variable,
-                            value=round(final_aqi, 2),
-                            measure_date=current_date,
-                        )
-                    )
-                    total_records += 1
-            except:
-                pass
+            # --- concentraciones para el puntaje AQI (calculado al final, vectorizado) ---
+            aqi_hours.append((current_date, hour, is_anomaly_day, is_strong_event))
+            for code, values in aqi_inputs.items():
+                values.append(current_hour_values.get(code, np.nan))
 
-            # Guardar en lotes
-            if len(batch) >= 5000:
-                Measurement.objects.bulk_create(batch)
+            # Guardar en lotes (COPY)
+            if len(batch) >= 50000:
+                copy_measurements(batch, update_rollups=False)
                 batch = []
                 self.stdout.write(
                     f"... procesado hasta {current_date.date()} {hour}:00"
@@ -168,7 +152,20 @@ class Command(BaseCommand):
 
         # Guardar remanentes
         if batch:
-            Measurement.objects.bulk_create(batch)
+            copy_measurements(batch, update_rollups=False)
+
+        # --- calulo de puntaje AQI de todo el histórico ---
+        if aqi_sensor:
+            aqi_records, aqi_anomalies = self.build_aqi_records(
+                aqi_hours, aqi_inputs, aqi_sensor, aqi_variable
+            )
+            copy_measurements(aqi_records, update_rollups=False)
+            total_records += len(aqi_records)
+            total_anomalies += aqi_anomalies
+
+        # Agregados por hora y día de todo el histórico (una sola pasada al final)
+        self.stdout.write("... calculando agregados por hora y día")
+        rebuild_rollups(start_date, end_date)
 
         self.stdout.write(
             self.style.SUCCESS(f"---------------------------------------------")
@@ -180,3 +177,47 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.WARNING(f"Registros Atípicos (Alertas): {total_anomalies}")
         )
+
+    def build_aqi_records(self, hours, concentrations, aqi_sensor, aqi_variable):
+        """
+        AQI horario de todo el histórico con el motor vectorizado: un arreglo de
+        concentraciones por contaminante y el máximo de sus sub-índices por hora.
+        Returns:
+            tuple: (filas para copy_measurements, cantidad de registros anómalos)
+        """
+        sub_indices = np.vstack(
+            [
+                AQICalculatorService.calculate_sub_index_array(code, values)
+                for code, values in concentrations.items()
+            ]
+        )
+        has_data = ~np.isnan(sub_indices).all(axis=0)
+        hourly_aqi = np.where(np.isnan(sub_indices), -np.inf, sub_indices).max(axis=0)
+
+        records = []
+        anomalies = 0
+        for (current_date, hour, is_anomaly_day, is_strong_event), final_aqi, ok in zip(
+            hours, hourly_aqi.tolist(), has_data.tolist()
+        ):
+            if not ok:
+                continue
+            is_aqi_anomaly = False
+
+            # Forzar AQI visual el 7 Nov si no subió naturalmente
+            if is_strong_event and 8 <= hour <= 22 and final_aqi < 110:
+                final_aqi = random.uniform(115, 150)
+                is_aqi_anomaly = True
+
+            # Si los contaminantes individuales fueron anomalía, el AQI resultante también cuenta como registro anómalo
+            if is_anomaly_day and (is_strong_event or is_aqi_anomaly):
+                anomalies += 1
+
+            records.append(
+                (
+                    aqi_sensor.sensor_id,
+                    aqi_variable.variable_id,
+                    round(final_aqi, 2),
+                    current_date,
+                )
+            )
+        return records, anomalies
@@ -1,12 +1,16 @@
+import signal
+import sys
 import time
 import random
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db.utils import OperationalError
 from src.sensors.models import Sensor
 from src.measurements.models import Measurement, VariableCatalog
 from src.measurements.services import AQICalculatorService, MeasurementService
-from src.measurements.utils.cali_profile import HOURLY_PROFILE
+from src.measurements.utils.cali_profile import get_hourly_profile
+from src.measurements.write_buffer import close_write_buffer, get_write_buffer
 
 class Command(BaseCommand):
     """
@@ -18,6 +22,7 @@ class Command(BaseCommand):
     3. Detecta dinámicamente TODOS los sensores activos en la base de datos.
     4. Genera mediciones para TODAS las variables (PM2.5, PM10, CO, etc.).
     5. Utiliza el 'MeasurementService' para validar reglas de negocio al guardar.
+       Con MEASUREMENT_WRITE_BUFFER=true las lecturas se escriben en lotes (write-behind).
     """
     help = 'Simula datos multiparamétricos en tiempo real para todos los sensores activos'
 
@@ -40,6 +45,9 @@ class Command(BaseCommand):
         
         variables_cache = {v.code: v for v in VariableCatalog.objects.all()}
 
+        # docker stop envía SIGTERM: salir limpiamente para vaciar el buffer de escritura (atexit)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
         # Probabilidad de alerta en cada ciclo de envío (5%)
         ALERT_CHANCE = 0.05
 
@@ -47,7 +55,8 @@ class Command(BaseCommand):
             try:
                 now = timezone.now()
                 hour_str = str(now.hour)
-                base_data = HOURLY_PROFILE.get(hour_str, HOURLY_PROFILE.get("0"))
+                hourly_profile = get_hourly_profile()
+                base_data = hourly_profile.get(hour_str, hourly_profile.get("0"))
                 
                 sensors = Sensor.objects.filter(status=Sensor.Status.ACTIVE)
                 
@@ -97,20 +106,25 @@ class Command(BaseCommand):
                             f"[{timestamp}] {sensor.serial_number}: {' | '.join(log_readings)}"
                         ))
                 
-                 # Calcular y guardar AQI para cada estación con sensores
-                
-                stations_processed = set()
-                for sensor in sensors:
-                    if sensor.station and sensor.station.station_id not in stations_processed:
-                        try:
-                            self.calculate_and_save_aqi(sensor.station.station_id, now)
-                            stations_processed.add(sensor.station.station_id)
-                        except Exception as e:
-                            pass
+                # Vaciar el buffer de escritura para que el AQI vea las lecturas del ciclo
+                if settings.MEASUREMENT_WRITE_BUFFER['ENABLED']:
+                    get_write_buffer().flush()
+
+                # Calcular y guardar AQI de todas las estaciones con sensores (una consulta)
+                # La medición se asocia al primer sensor activo de cada estación
+                station_sensors = {}
+                for sensor in sorted(sensors, key=lambda s: s.sensor_id):
+                    if sensor.station_id:
+                        station_sensors.setdefault(sensor.station_id, sensor)
+                try:
+                    self.calculate_and_save_aqi(station_sensors, now)
+                except Exception:
+                    pass
                 
                 time.sleep(10) 
 
             except KeyboardInterrupt:
+                close_write_buffer()
                 break
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'Error en simulador: {e}'))
@@ -118,7 +132,7 @@ class Command(BaseCommand):
 
     def save_measurement(self, sensor, variable, value, date):
         try:
-            MeasurementService.create_measurement({
+            MeasurementService.enqueue_measurement({
                 'sensor': sensor,
                 'variable': variable,
                 'value': round(value, 2),
@@ -127,45 +141,46 @@ class Command(BaseCommand):
         except Exception as e:
             print(f"Error guardando: {e}")
 
-    def calculate_and_save_aqi(self, station_id, timestamp):
+    def calculate_and_save_aqi(self, station_sensors, timestamp):
         """
-        Calcula el AQI para una estación y lo guarda como medición.
+        Calcula el AQI de todas las estaciones con el mismo criterio de
+        aqi/current (ver AQICalculatorService.current_aqi_for_stations) y lo
+        guarda como mediciones en una única inserción.
+        Args:
+            station_sensors (dict): {station_id: Sensor} sensor al que se asocia la medición.
         """
-        try:
-            # Calcular AQI
-            aqi_data = AQICalculatorService.calculate_aqi_for_station(
-                station_id=station_id,
-                timestamp=timestamp
-            )
+        if not station_sensors:
+            return
 
+        try:
             # Obtener la variable AQI del catálogo
             aqi_variable = VariableCatalog.objects.get(code='AQI')
-
-            # Obtener un sensor de la estación para asociar la medición
-            sensor = Sensor.objects.filter(
-                station_id=station_id,
-                status=Sensor.Status.ACTIVE
-            ).first()
-
-            if sensor:
-                Measurement.objects.create(
-                    sensor=sensor,
-                    variable=aqi_variable,
-                    value=round(aqi_data['aqi'], 2),
-                    measure_date=timestamp
-                )
-
-                timestamp_str = timestamp.strftime('%H:%M:%S')
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"[{timestamp_str}] AQI Calculado: {aqi_data['aqi']:.2f} "
-                        f"({aqi_data['category']}) - Dominante: {aqi_data['dominant_pollutant']}"
-                    )
+        except VariableCatalog.DoesNotExist:
+            return
+
+        # Calcular AQI
+        results = AQICalculatorService.current_aqi_for_stations(
+            station_ids=list(station_sensors),
+            timestamp=timestamp
+        )
+
+        measurements = []
+        timestamp_str = timestamp.strftime('%H:%M:%S')
+        for station_id, aqi_data in results.items():
+            if aqi_data is None:
+                continue
+            measurements.append(Measurement(
+                sensor=station_sensors[station_id],
+                variable=aqi_variable,
+                value=round(aqi_data['aqi'], 2),
+                measure_date=timestamp
+            ))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"[{timestamp_str}] AQI Calculado (estación {station_id}): {aqi_data['aqi']:.2f} "
+                    f"({aqi_data['category']}) - Dominante: {aqi_data['dominant_pollutant']}"
                 )
+            )
 
-        except ValueError:
-            pass
-        except VariableCatalog.DoesNotExist:
-            pass
-        except Exception:
-            pass
+        if measurements:
+            MeasurementService.bulk_insert(measurements)
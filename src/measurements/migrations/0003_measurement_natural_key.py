@@ -0,0 +1,31 @@
+# Generated manually: llave natural (sensor, variable, measure_date)
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('measurements', '0002_alter_measurement_options_and_more'),
+    ]
+
+    operations = [
+        # 1. Eliminar duplicados existentes (se conserva el registro más reciente)
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM measurement older
+                USING measurement newer
+                WHERE older.sensor_id = newer.sensor_id
+                  AND older.variable_id = newer.variable_id
+                  AND older.measure_date = newer.measure_date
+                  AND older.measurement_id < newer.measurement_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+
+        # 2. Restricción única sobre la llave natural
+        migrations.AddConstraint(
+            model_name='measurement',
+            constraint=models.UniqueConstraint(fields=('sensor', 'variable', 'measure_date'), name='measurement_natural_key'),
+        ),
+    ]
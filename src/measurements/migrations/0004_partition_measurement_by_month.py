@@ -0,0 +1,125 @@
+# Generated manually: particionamiento mensual de la tabla measurement
+
+from django.db import migrations
+
+# Convierte 'measurement' en una tabla particionada por rango mensual de measure_date.
+# El estado del modelo no cambia (mismas columnas, índices y restricciones para el ORM);
+# solo cambia la estructura física. La llave primaria pasa a ser
+# (measurement_id, measure_date) porque PostgreSQL exige que toda restricción única de
+# una tabla particionada incluya la llave de partición.
+PARTITION_SQL = """
+ALTER TABLE measurement RENAME TO measurement_unpartitioned;
+ALTER INDEX measurement_sensor__1f3858_idx RENAME TO measurement_unpartitioned_sensor_date_idx;
+ALTER TABLE measurement_unpartitioned RENAME CONSTRAINT measurement_natural_key TO measurement_unpartitioned_natural_key;
+ALTER INDEX IF EXISTS measurement_pkey RENAME TO measurement_unpartitioned_pkey;
+ALTER INDEX IF EXISTS measurement_variable_id_idx RENAME TO measurement_unpartitioned_variable_id_idx;
+
+CREATE SEQUENCE measurement_id_seq AS integer;
+
+CREATE TABLE measurement (
+    measurement_id integer NOT NULL DEFAULT nextval('measurement_id_seq'),
+    value double precision NOT NULL,
+    measure_date timestamp with time zone NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    sensor_id integer NOT NULL,
+    variable_id integer NOT NULL,
+    CONSTRAINT measurement_pkey PRIMARY KEY (measurement_id, measure_date),
+    CONSTRAINT measurement_natural_key UNIQUE (sensor_id, variable_id, measure_date),
+    CONSTRAINT measurement_sensor_id_fk_sensor FOREIGN KEY (sensor_id)
+        REFERENCES sensor (sensor_id) DEFERRABLE INITIALLY DEFERRED,
+    CONSTRAINT measurement_variable_id_fk_variable_catalog FOREIGN KEY (variable_id)
+        REFERENCES variable_catalog (variable_id) DEFERRABLE INITIALLY DEFERRED
+) PARTITION BY RANGE (measure_date);
+
+ALTER SEQUENCE measurement_id_seq OWNED BY measurement.measurement_id;
+
+CREATE INDEX measurement_sensor__1f3858_idx ON measurement (sensor_id, measure_date);
+CREATE INDEX measurement_variable_id_idx ON measurement (variable_id);
+
+-- Partición por defecto: recibe datos fuera de las particiones mensuales creadas
+CREATE TABLE measurement_default PARTITION OF measurement DEFAULT;
+
+-- Particiones mensuales desde el dato más antiguo hasta 3 meses en el futuro
+DO $$
+DECLARE
+    month_start timestamptz;
+    last_month timestamptz := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + interval '3 months';
+BEGIN
+    SELECT date_trunc('month', min(measure_date) AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+      INTO month_start FROM measurement_unpartitioned;
+    month_start := least(
+        coalesce(month_start, last_month),
+        date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+    );
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF measurement FOR VALUES FROM (%L) TO (%L)',
+            'measurement_p' || to_char(month_start AT TIME ZONE 'UTC', 'YYYY_MM'),
+            month_start,
+            month_start + interval '1 month'
+        );
+        month_start := month_start + interval '1 month';
+    END LOOP;
+END $$;
+
+INSERT INTO measurement (measurement_id, value, measure_date, created_at, sensor_id, variable_id)
+SELECT measurement_id, value, measure_date, created_at, sensor_id, variable_id
+FROM measurement_unpartitioned;
+
+SELECT setval(
+    'measurement_id_seq',
+    coalesce((SELECT max(measurement_id) FROM measurement), 0) + 1,
+    false
+);
+
+DROP TABLE measurement_unpartitioned;
+"""
+
+# Reverso: vuelve a una tabla convencional con las mismas restricciones que generó el ORM.
+UNPARTITION_SQL = """
+ALTER TABLE measurement RENAME TO measurement_partitioned;
+ALTER INDEX measurement_sensor__1f3858_idx RENAME TO measurement_partitioned_sensor_date_idx;
+ALTER TABLE measurement_partitioned RENAME CONSTRAINT measurement_natural_key TO measurement_partitioned_natural_key;
+ALTER TABLE measurement_partitioned RENAME CONSTRAINT measurement_pkey TO measurement_partitioned_pkey;
+ALTER INDEX measurement_variable_id_idx RENAME TO measurement_partitioned_variable_id_idx;
+
+CREATE TABLE measurement (
+    measurement_id integer NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    value double precision NOT NULL,
+    measure_date timestamp with time zone NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    sensor_id integer NOT NULL,
+    variable_id integer NOT NULL,
+    CONSTRAINT measurement_natural_key UNIQUE (sensor_id, variable_id, measure_date),
+    CONSTRAINT measurement_sensor_id_fk_sensor FOREIGN KEY (sensor_id)
+        REFERENCES sensor (sensor_id) DEFERRABLE INITIALLY DEFERRED,
+    CONSTRAINT measurement_variable_id_fk_variable_catalog FOREIGN KEY (variable_id)
+        REFERENCES variable_catalog (variable_id) DEFERRABLE INITIALLY DEFERRED
+);
+CREATE INDEX measurement_sensor__1f3858_idx ON measurement (sensor_id, measure_date);
+CREATE INDEX measurement_sensor_id_idx ON measurement (sensor_id);
+CREATE INDEX measurement_variable_id_idx ON measurement (variable_id);
+
+INSERT INTO measurement (measurement_id, value, measure_date, created_at, sensor_id, variable_id)
+SELECT measurement_id, value, measure_date, created_at, sensor_id, variable_id
+FROM measurement_partitioned;
+
+SELECT setval(
+    pg_get_serial_sequence('measurement', 'measurement_id'),
+    coalesce((SELECT max(measurement_id) FROM measurement), 0) + 1,
+    false
+);
+
+DROP TABLE measurement_partitioned CASCADE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('measurements', '0003_measurement_natural_key'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=PARTITION_SQL, reverse_sql=UNPARTITION_SQL),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('measurements', '0004_partition_measurement_by_month'),
+        ('sensors', '0004_maintenancelog'),
+        ('stations', '0006_migrate_to_postgis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementRollup',
+            fields=[
+                ('rollup_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('granularity', models.CharField(choices=[('hour', 'Hora'), ('day', 'Día')], max_length=4)),
+                ('bucket_start', models.DateTimeField(verbose_name='Inicio del Periodo')),
+                ('count', models.IntegerField()),
+                ('sum', models.FloatField()),
+                ('min', models.FloatField()),
+                ('max', models.FloatField()),
+                ('sum_sq', models.FloatField(verbose_name='Suma de Cuadrados')),
+                ('last_value', models.FloatField()),
+                ('last_date', models.DateTimeField()),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='sensors.sensor')),
+                ('station', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='measurement_rollups', to='stations.monitoringstation')),
+                ('variable', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='rollups', to='measurements.variablecatalog')),
+            ],
+            options={
+                'verbose_name': 'Agregado de Mediciones',
+                'verbose_name_plural': 'Agregados de Mediciones',
+                'db_table': 'measurement_rollup',
+                'indexes': [models.Index(fields=['variable', 'granularity', 'bucket_start'], name='rollup_variable_bucket_idx'), models.Index(fields=['station', 'variable', 'granularity', 'bucket_start'], name='rollup_station_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('sensor', 'variable', 'granularity', 'bucket_start'), name='measurement_rollup_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('measurements', '0005_measurementrollup'),
+        ('sensors', '0004_maintenancelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['measure_date', 'measurement_id'], name='measurement_date_id_idx'),
+        ),
+    ]
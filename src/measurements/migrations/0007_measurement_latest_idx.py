@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('measurements', '0006_measurement_date_id_idx'),
+        ('sensors', '0004_maintenancelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['variable', 'sensor', '-measure_date'], name='measurement_latest_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('measurements', '0008_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementDeadLetter',
+            fields=[
+                ('dead_letter_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('sensor_id', models.IntegerField()),
+                ('variable_id', models.IntegerField()),
+                ('value', models.FloatField(verbose_name='Valor Medido')),
+                ('measure_date', models.DateTimeField(verbose_name='Fecha de Toma de Dato')),
+                ('error', models.TextField(verbose_name='Error de Escritura')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Medición No Persistida',
+                'verbose_name_plural': 'Mediciones No Persistidas',
+                'db_table': 'measurement_dead_letter',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
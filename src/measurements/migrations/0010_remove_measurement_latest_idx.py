@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('measurements', '0009_measurementdeadletter'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='measurement',
+            name='measurement_latest_idx',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:14
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('measurements', '0010_remove_measurement_latest_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurement',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+    ]
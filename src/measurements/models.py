@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Now
 
 from django.db import models
 from src.sensors.models import Sensor 
+from src.stations.models import MonitoringStation
 
 class VariableCatalog(models.Model):
     """
@@ -52,6 +55,8 @@ class Measurement(models.Model):
     value = models.FloatField(verbose_name="Valor Medido")
     measure_date = models.DateTimeField(verbose_name="Fecha de Toma de Dato")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Última escritura de la fila: cambia también cuando un upsert corrige el valor
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
 
     def __str__(self):
         return f"{self.variable.code}: {self.value}"
@@ -63,4 +68,162 @@ class Measurement(models.Model):
         ordering = ['-measure_date']
         indexes = [
             models.Index(fields=['sensor', 'measure_date']),
-        ]
\ No newline at end of file
+            # Orden de la paginación por cursor del listado (measure_date, measurement_id)
+            models.Index(fields=['measure_date', 'measurement_id'], name='measurement_date_id_idx'),
+        ]
+        constraints = [
+            # Llave natural: un sensor reporta un único valor por variable e instante.
+            # Permite ingesta idempotente (INSERT ... ON CONFLICT) ante reintentos.
+            # Su índice (sensor, variable, measure_date) resuelve también la
+            # última medición de cada serie (latest_matrix.latest_rows).
+            models.UniqueConstraint(
+                fields=['sensor', 'variable', 'measure_date'],
+                name='measurement_natural_key',
+            ),
+        ]
+
+class MeasurementRollup(models.Model):
+    """
+    Agregado precalculado de mediciones por sensor, variable y periodo (hora o día).
+    Se mantiene de forma incremental en cada ingesta (ver rollups.py) y puede
+    reconstruirse con el comando `rebuild_rollups`. Las consultas de rangos
+    largos leen esta tabla en lugar de re-agregar las mediciones crudas.
+    """
+
+    class Granularity(models.TextChoices):
+        HOUR = "hour", "Hora"
+        DAY = "day", "Día"
+
+    rollup_id = models.BigAutoField(primary_key=True)
+    sensor = models.ForeignKey(
+        Sensor,
+        on_delete=models.CASCADE,
+        related_name='rollups',
+    )
+    # Estación del sensor al momento de agregar (desnormalizada para consultas por estación/ciudad)
+    station = models.ForeignKey(
+        MonitoringStation,
+        on_delete=models.SET_NULL,
+        related_name='measurement_rollups',
+        null=True,
+        blank=True,
+    )
+    variable = models.ForeignKey(
+        VariableCatalog,
+        on_delete=models.PROTECT,
+        related_name='rollups',
+    )
+    granularity = models.CharField(max_length=4, choices=Granularity.choices)
+    bucket_start = models.DateTimeField(verbose_name="Inicio del Periodo")
+
+    count = models.IntegerField()
+    sum = models.FloatField()
+    min = models.FloatField()
+    max = models.FloatField()
+    sum_sq = models.FloatField(verbose_name="Suma de Cuadrados")
+    last_value = models.FloatField()
+    last_date = models.DateTimeField()
+
+    @property
+    def avg(self):
+        return self.sum / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.variable_id}@{self.sensor_id} {self.granularity} {self.bucket_start}"
+
+    class Meta:
+        db_table = 'measurement_rollup'
+        verbose_name = "Agregado de Mediciones"
+        verbose_name_plural = "Agregados de Mediciones"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sensor', 'variable', 'granularity', 'bucket_start'],
+                name='measurement_rollup_key',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['variable', 'granularity', 'bucket_start'],
+                name='rollup_variable_bucket_idx',
+            ),
+            models.Index(
+                fields=['station', 'variable', 'granularity', 'bucket_start'],
+                name='rollup_station_bucket_idx',
+            ),
+        ]
+
+class MeasurementDeadLetter(models.Model):
+    """
+    Mediciones que el buffer de escritura diferida no pudo persistir tras
+    agotar sus reintentos. Se guardan sin llaves foráneas (el sensor pudo
+    eliminarse) para reprocesarlas con el comando `replay_dead_letters`.
+    """
+    dead_letter_id = models.BigAutoField(primary_key=True)
+    sensor_id = models.IntegerField()
+    variable_id = models.IntegerField()
+    value = models.FloatField(verbose_name="Valor Medido")
+    measure_date = models.DateTimeField(verbose_name="Fecha de Toma de Dato")
+    error = models.TextField(verbose_name="Error de Escritura")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Sensor {self.sensor_id} / variable {self.variable_id} @ {self.measure_date}"
+
+    class Meta:
+        db_table = 'measurement_dead_letter'
+        verbose_name = "Medición No Persistida"
+        verbose_name_plural = "Mediciones No Persistidas"
+        ordering = ['created_at']
+
+
+class ReportJob(models.Model):
+    """
+    Solicitud de un reporte PDF generado fuera del ciclo de la petición.
+    La API crea el trabajo en estado PENDING; el comando `process_report_jobs`
+    lo toma (SELECT ... FOR UPDATE SKIP LOCKED), genera el PDF en MEDIA_ROOT
+    y lo deja disponible para descarga.
+    """
+
+    class ReportType(models.TextChoices):
+        AIR_QUALITY = "air_quality", "Calidad del Aire"
+        TRENDS = "trends", "Tendencias"
+        ALERTS = "alerts", "Alertas Críticas"
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pendiente"
+        RUNNING = "RUNNING", "En Proceso"
+        COMPLETED = "COMPLETED", "Completado"
+        FAILED = "FAILED", "Fallido"
+
+    job_id = models.BigAutoField(primary_key=True)
+    report_type = models.CharField(max_length=20, choices=ReportType.choices)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='report_jobs',
+    )
+    # Parámetros del reporte: station_id, start_date, end_date, variable_code
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+
+    file = models.FileField(upload_to='reports/%Y/%m/', blank=True)
+    filename = models.CharField(max_length=255, blank=True, verbose_name="Nombre de Descarga")
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.report_type} #{self.job_id} ({self.status})"
+
+    class Meta:
+        db_table = 'report_job'
+        verbose_name = "Trabajo de Reporte"
+        verbose_name_plural = "Trabajos de Reporte"
+        ordering = ['-created_at']
+        indexes = [
+            # Cola del worker: trabajos pendientes en orden de llegada
+            models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'),
+        ]
@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+
+class MeasurementCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para el listado de mediciones.
+
+    A diferencia de la paginación por número de página, no usa OFFSET: cada
+    página continúa desde la posición codificada en el cursor, de modo que su
+    costo no depende de qué tan profundo se navegue en la tabla.
+    Orden: más recientes primero; measurement_id desempata lecturas simultáneas.
+    """
+
+    ordering = ("-measure_date", "-measurement_id")
+    page_size = 500
+    page_size_query_param = "page_size"
+    max_page_size = 5000
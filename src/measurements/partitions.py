@@ -0,0 +1,166 @@
+from datetime import datetime, timezone as dt_timezone
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Measurement
+
+# Nombre de las particiones mensuales: measurement_pYYYY_MM
+PARTITION_PREFIX = f"{Measurement._meta.db_table}_p"
+DEFAULT_PARTITION = f"{Measurement._meta.db_table}_default"
+
+
+def month_start(value: datetime) -> datetime:
+    """
+    Inicio del mes (UTC) que contiene `value`.
+    """
+    value = value.astimezone(dt_timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """
+    Desplaza un inicio de mes `months` meses (positivo o negativo).
+    """
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARTITION_PREFIX}{start.year:04d}_{start.month:02d}"
+
+
+def is_partitioned() -> bool:
+    """
+    Indica si la tabla de mediciones está particionada (solo PostgreSQL).
+    """
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [Measurement._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> list:
+    """
+    Lista las particiones mensuales adjuntas a la tabla de mediciones.
+    Returns:
+        list: Tuplas (nombre, inicio_de_mes) ordenadas por fecha.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)",
+            [Measurement._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        try:
+            start = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y_%m")
+        except ValueError:
+            continue
+        partitions.append((name, start.replace(tzinfo=dt_timezone.utc)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def ensure_partitions(start: datetime = None, months_ahead: int = 3) -> list:
+    """
+    Crea las particiones mensuales faltantes desde `start` hasta `months_ahead`
+    meses después del mes actual.
+
+    Si la partición por defecto ya contiene filas del mes a crear (datos que
+    llegaron antes de que existiera su partición), se mueven dentro de la misma
+    transacción: la nueva tabla se crea suelta, se rellena, se le agrega un
+    CHECK equivalente al rango (para que ATTACH no tenga que re-escanearla) y
+    luego se adjunta.
+
+    Args:
+        start (datetime, optional): Fecha desde la cual garantizar particiones.
+            Por defecto el mes actual.
+        months_ahead (int): Meses futuros a pre-crear.
+    Returns:
+        list: Nombres de las particiones creadas.
+    """
+    if not is_partitioned():
+        return []
+
+    table = Measurement._meta.db_table
+    current = month_start(start or timezone.now())
+    last = add_months(month_start(timezone.now()), months_ahead)
+    existing = {name for name, _ in list_partitions()}
+    created = []
+
+    while current <= last:
+        name = partition_name(current)
+        if name not in existing:
+            upper = add_months(current, 1)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)'
+                )
+                cursor.execute(
+                    f'ALTER TABLE "{name}" ADD CONSTRAINT "{name}_range_check" '
+                    f"CHECK (measure_date >= %s AND measure_date < %s)",
+                    [current, upper],
+                )
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+                    f"WHERE measure_date >= %s AND measure_date < %s RETURNING *) "
+                    f'INSERT INTO "{name}" SELECT * FROM moved',
+                    [current, upper],
+                )
+                cursor.execute(
+                    f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" '
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    [current, upper],
+                )
+                cursor.execute(
+                    f'ALTER TABLE "{name}" DROP CONSTRAINT "{name}_range_check"'
+                )
+            created.append(name)
+        current = add_months(current, 1)
+
+    return created
+
+
+def expire_partitions(retention_months: int, drop: bool = False) -> list:
+    """
+    Separa (DETACH) las particiones cuyo mes completo quedó fuera de la
+    ventana de retención y, opcionalmente, las elimina. Desprender una
+    partición es una operación de catálogo: no borra filas una a una ni
+    deja trabajo para VACUUM en el resto de la tabla.
+
+    Args:
+        retention_months (int): Meses completos a conservar, contando el actual.
+        drop (bool): Si es True, elimina la tabla después de separarla.
+    Returns:
+        list: Nombres de las particiones separadas (o eliminadas).
+    """
+    if retention_months < 1:
+        raise ValueError("retention_months debe ser al menos 1")
+    if not is_partitioned():
+        return []
+
+    table = Measurement._meta.db_table
+    cutoff = add_months(month_start(timezone.now()), -(retention_months - 1))
+    expired = []
+
+    for name, start in list_partitions():
+        if add_months(start, 1) > cutoff:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+            if drop:
+                cursor.execute(f'DROP TABLE "{name}"')
+        expired.append(name)
+
+    return expired
@@ -0,0 +1,296 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import groupby
+import numpy as np
+from django.conf import settings
+from src.sensors.models import Sensor
+from .models import Measurement
+from .shared_memory import SharedArrayFile, per_process
+
+# Filas leídas por vuelta del cursor de servidor al cargar el estado
+FETCH_CHUNK_SIZE = 10000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+class RecentSeries(SharedArrayFile):
+    """
+    Últimas horas de cada serie (sensor, variable) en anillos de capacidad fija
+    (valores float32 y fechas int64 en microsegundos), en un archivo mapeado en
+    memoria compartido por todos los procesos (ver shared_memory.py).
+
+    Cada serie ocupa una fila; `keys` guarda su (sensor_id, variable_id). La
+    ingesta agrega las lecturas confirmadas en orden de fecha en O(1); una
+    lectura atrasada se inserta en su posición y una repetida reemplaza el
+    valor (igual que el upsert de la ingesta). Cuando el anillo se llena se
+    descarta la lectura más antigua y avanza la fecha de cobertura: una
+    consulta que empieza antes de esa fecha no se responde desde memoria.
+    """
+
+    def __init__(self, path: str, max_series: int, capacity: int):
+        self.max_series = max_series
+        self.capacity = capacity
+        self._index = {}
+        self._index_version = None
+        super().__init__(path)
+
+    def layout(self) -> list:
+        rows = self.max_series
+        return [
+            ("seq", np.uint64, (rows,)),
+            ("keys", np.int64, (rows, 2)),
+            # Inicio lógico del anillo, cantidad de lecturas y desde cuándo
+            # (epoch, microsegundos) el anillo tiene todas las lecturas de la serie
+            ("meta", np.int64, (rows, 3)),
+            ("origin", np.int64, (1,)),
+            ("dates", np.int64, (rows, self.capacity)),
+            ("values", np.float32, (rows, self.capacity)),
+        ]
+
+    def ensure_warm(self, window: timedelta) -> None:
+        """
+        Carga la ventana `window` de cada serie desde la base de datos si el
+        estado está frío. Solo un proceso hace la carga; el resto espera.
+        """
+        if self.is_warm:
+            return
+        with self.locked():
+            if self.is_warm:
+                return
+            start = datetime.now(dt_timezone.utc) - window
+            self._load(series_rows(start), start)
+
+    def load(self, rows, start: datetime) -> None:
+        """
+        Reemplaza el contenido y lo marca como cargado.
+        Args:
+            rows (iterable): Tuplas (sensor_id, variable_id, measure_date, value)
+                ordenadas por serie y fecha, ver series_rows.
+            start (datetime): Inicio de la ventana cargada.
+        """
+        with self.locked():
+            self._load(rows, start)
+
+    def _load(self, rows, start):
+        origin = _micros(start)
+        with self.writing(range(self.max_series)):
+            self._keys[:] = 0
+            self._meta[:] = 0
+            self._origin[0] = origin
+            slot = 0
+            for key, series in groupby(rows, key=lambda row: row[:2]):
+                if slot >= self.max_series:
+                    break
+                readings = list(series)
+                kept = readings[-self.capacity:]
+                count = len(kept)
+                self._dates[slot, :count] = [_micros(row[2]) for row in kept]
+                self._values[slot, :count] = [row[3] for row in kept]
+                covered = origin
+                if len(readings) > count:
+                    covered = _micros(readings[-count - 1][2]) + 1
+                self._meta[slot] = (0, count, covered)
+                self._keys[slot] = key
+                slot += 1
+            self._next_version()
+        self.mark_warm()
+
+    def _slot_of(self, sensor_id, variable_id):
+        version = self.version
+        if self._index_version != version:
+            occupied = np.flatnonzero(self._keys[:, 0])
+            self._index = {
+                tuple(key): int(slot) for slot, key in zip(occupied, self._keys[occupied].tolist())
+            }
+            self._index_version = version
+        return self._index.get((sensor_id, variable_id))
+
+    def _assign(self, key):
+        # Requiere `locked`; retorna None si no quedan filas libres
+        free = np.flatnonzero(self._keys[:, 0] == 0)
+        if not len(free):
+            return None
+        slot = int(free[0])
+        with self.writing([slot]):
+            self._meta[slot] = (0, 0, self._origin[0])
+            # La variable primero: un sensor_id distinto de 0 marca la fila como ocupada
+            self._keys[slot, 1] = key[1]
+            self._keys[slot, 0] = key[0]
+        self._next_version()
+        return slot
+
+    def append(self, entries) -> None:
+        """
+        Agrega lecturas ya confirmadas en la base de datos.
+        Si el estado está frío no hace nada: la próxima carga las leerá de la base.
+        Args:
+            entries (iterable): Tuplas (sensor_id, variable_id, value, measure_date).
+        """
+        by_series = {}
+        for sensor_id, variable_id, value, measure_date in entries:
+            by_series.setdefault((sensor_id, variable_id), []).append(
+                (_micros(measure_date), value)
+            )
+
+        if not by_series or not self.is_warm:
+            return
+
+        with self.locked():
+            if not self.is_warm:
+                return
+            for key, readings in by_series.items():
+                slot = self._slot_of(*key)
+                if slot is None:
+                    slot = self._assign(key)
+                    if slot is None:
+                        continue
+                with self.writing([slot]):
+                    for micros, value in sorted(readings):
+                        self._insert(slot, micros, value)
+
+    def _insert(self, slot, micros, value):
+        capacity = self.capacity
+        start, count, covered = self._meta[slot].tolist()
+        if micros < covered:
+            return
+
+        last = self._dates[slot, (start + count - 1) % capacity] if count else None
+        if last is not None and micros <= last:
+            # Lectura atrasada o repetida: se ubica en el orden lógico del anillo
+            ring = (start + np.arange(count)) % capacity
+            ordered = self._dates[slot, ring]
+            position = int(np.searchsorted(ordered, micros))
+            if ordered[position] == micros:
+                self._values[slot, ring[position]] = value
+                return
+        else:
+            position = count
+
+        if count == capacity:
+            oldest = int(self._dates[slot, start])
+            covered = oldest + 1
+            start = (start + 1) % capacity
+            count -= 1
+            position -= 1
+            if micros < covered:
+                self._meta[slot] = (start, count, covered)
+                return
+
+        ring = (start + np.arange(count + 1)) % capacity
+        if position < count:
+            self._dates[slot, ring[position + 1:]] = self._dates[slot, ring[position:count]]
+            self._values[slot, ring[position + 1:]] = self._values[slot, ring[position:count]]
+        self._dates[slot, ring[position]] = micros
+        self._values[slot, ring[position]] = value
+        self._meta[slot] = (start, count + 1, covered)
+
+    def _series(self, sensor_id, variable_id):
+        # (fechas, valores, cobertura) en orden de fecha, o None si la serie no se sigue
+        slot = self._slot_of(sensor_id, variable_id)
+        if slot is None:
+            if self._keys[-1, 0]:
+                # Sin filas libres: la serie pudo quedar fuera del estado
+                return None
+            empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            return (*empty, int(self._origin[0]))
+        snapshot = self.snapshot(slot, self._keys, self._meta, self._dates, self._values)
+        if snapshot is None:
+            return None
+        key, meta, dates, values = snapshot
+        if tuple(key.tolist()) != (sensor_id, variable_id):
+            return None
+        start, count, covered = meta.tolist()
+        ring = (start + np.arange(count)) % self.capacity
+        return dates[ring], values[ring], covered
+
+    def window(self, sensor_id: int, variable_id: int, start: datetime, end: datetime = None):
+        """
+        Lecturas de la serie en [start, end] sin consultar la base de datos.
+        Returns:
+            tuple | None: (fechas en microsegundos, valores float32), o None si
+                el estado está frío o no cubre el inicio de la ventana.
+        """
+        if not self.is_warm:
+            return None
+        series = self._series(sensor_id, variable_id)
+        if series is None or _micros(start) < series[2]:
+            return None
+        dates, values, _ = series
+        low = np.searchsorted(dates, _micros(start), side="left")
+        high = len(dates) if end is None else np.searchsorted(dates, _micros(end), side="right")
+        return dates[low:high], values[low:high]
+
+    def last(self, sensor_id: int, variable_id: int, n: int):
+        """
+        Últimas n lecturas de la serie.
+        Returns:
+            tuple | None: (fechas en microsegundos, valores float32), o None si
+                el estado está frío o el anillo tiene menos de n lecturas.
+        """
+        if not self.is_warm:
+            return None
+        series = self._series(sensor_id, variable_id)
+        if series is None or len(series[0]) < n:
+            return None
+        dates, values, _ = series
+        return dates[len(dates) - n:], values[len(values) - n:]
+
+
+def to_datetimes(micros) -> list:
+    return [_EPOCH + timedelta(microseconds=int(value)) for value in micros]
+
+
+def to_floats(values) -> np.ndarray:
+    """
+    Valores float32 a float64 por su representación decimal más corta
+    (12.3 y no 12.300000190734863), para promediar y responder como la base.
+    """
+    return np.asarray(values, dtype=np.float32).astype(str).astype(np.float64)
+
+
+def series_rows(start: datetime):
+    """
+    Lecturas de sensores activos desde `start`, ordenadas por serie y fecha.
+    Returns:
+        iterator: Tuplas (sensor_id, variable_id, measure_date, value).
+    """
+    return (
+        Measurement.objects.filter(
+            measure_date__gte=start, sensor__status=Sensor.Status.ACTIVE
+        )
+        .order_by("sensor_id", "variable_id", "measure_date")
+        .values_list("sensor_id", "variable_id", "measure_date", "value")
+        .iterator(chunk_size=FETCH_CHUNK_SIZE)
+    )
+
+
+def _open_series():
+    config = settings.RECENT_SERIES
+    return RecentSeries(config["PATH"], config["MAX_SERIES"], config["CAPACITY"])
+
+
+_process_series = per_process(_open_series)
+
+
+def get_recent_series():
+    """
+    Estado compartido del proceso actual, cargado, o None si
+    settings.RECENT_SERIES está deshabilitado.
+    """
+    config = settings.RECENT_SERIES
+    if not config["ENABLED"]:
+        return None
+    series = _process_series()
+    series.ensure_warm(timedelta(hours=config["WINDOW_HOURS"]))
+    return series
+
+
+def current_recent_series():
+    """Estado compartido sin forzar su carga (escritura desde la ingesta)."""
+    if not settings.RECENT_SERIES["ENABLED"]:
+        return None
+    return _process_series()
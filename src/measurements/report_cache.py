@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import Measurement
+
+# Versión del formato de las llaves; cambiarla deja sin uso la caché existente
+CACHE_FORMAT = 1
+
+
+def day_bounds(start_date, end_date):
+    """
+    Intervalo semiabierto [inicio, fin + 1 día) de los días pedidos, el mismo
+    de PDFReportGenerator.date_range_filter.
+    """
+    start = date.fromisoformat(str(start_date))
+    end = date.fromisoformat(str(end_date)) + timedelta(days=1)
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end, time.min)),
+    )
+
+
+def params_digest(report_type, station_id, start_date, end_date, variable_code=None) -> str:
+    """
+    Identidad de la solicitud de un reporte, sin el estado de los datos.
+    """
+    normalized = [
+        CACHE_FORMAT,
+        str(report_type),
+        int(station_id) if station_id else None,
+        date.fromisoformat(str(start_date)).isoformat(),
+        date.fromisoformat(str(end_date)).isoformat(),
+        variable_code or None,
+    ]
+    return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
+
+
+def data_watermark(station_id, start_date, end_date) -> list:
+    """
+    Estado de las mediciones del rango con una sola consulta agregada: el
+    mayor measurement_id detecta inserciones, la cantidad detecta borrados y
+    la última updated_at detecta valores corregidos por un upsert (ingesta o
+    copy_measurements con on_conflict="update").
+    Returns:
+        list: [max measurement_id, cantidad, max updated_at en ISO 8601].
+    """
+    start, end = day_bounds(start_date, end_date)
+    queryset = Measurement.objects.filter(measure_date__gte=start, measure_date__lt=end)
+    if station_id:
+        queryset = queryset.filter(sensor__station_id=station_id)
+    watermark = queryset.aggregate(
+        last_id=Max("measurement_id"), count=Count("measurement_id"), updated=Max("updated_at")
+    )
+    updated = watermark["updated"].isoformat() if watermark["updated"] else None
+    return [watermark["last_id"], watermark["count"], updated]
+
+
+def artifact_key(digest: str, watermark) -> str:
+    return hashlib.sha256(json.dumps([digest, watermark]).encode()).hexdigest()
+
+
+def is_closed(end_date, now=None) -> bool:
+    """
+    Un periodo está cerrado cuando terminó hace más de
+    REPORT_CACHE['CLOSED_AFTER_HOURS']: ya no se esperan lecturas para él.
+    """
+    _, end = day_bounds(end_date, end_date)
+    grace = timedelta(hours=settings.REPORT_CACHE["CLOSED_AFTER_HOURS"])
+    return end + grace <= (now or timezone.now())
+
+
+class ReportCache:
+    """
+    Caché en disco de reportes PDF direccionada por contenido.
+
+    Cada reporte se guarda como `<llave>.pdf` (más `<llave>.json` con los
+    datos para nombrar la descarga), donde la llave resume los parámetros del
+    reporte y la marca de agua de sus datos (data_watermark): si cambian las
+    mediciones del rango cambia la llave y el reporte se vuelve a generar.
+
+    Para periodos cerrados se recuerda además parámetros -> llave en
+    `closed/`, de modo que una repetición se sirve sin consultar la base de
+    datos. Ese índice se descarta cuando llegan lecturas atrasadas, cargas
+    masivas o borrados (forget_closed).
+
+    La fecha de modificación de cada archivo marca su último uso: al superar
+    MAX_BYTES se eliminan los menos usados (LRU).
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.closed_path = os.path.join(path, "closed")
+
+    def _artifact(self, key):
+        return os.path.join(self.path, f"{key}.pdf")
+
+    def _meta(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns:
+            tuple | None: (archivo PDF abierto en modo binario, metadatos), o
+                None si la llave no está en la caché.
+        """
+        try:
+            with open(self._meta(key), encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+            artifact = open(self._artifact(key), "rb")
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(self._artifact(key))
+        except OSError:
+            pass
+        return artifact, meta
+
+    def put(self, key, content: bytes, meta: dict) -> None:
+        """
+        Guarda un reporte y elimina los menos usados si se supera MAX_BYTES.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        # Los metadatos primero: un PDF visible siempre tiene los suyos
+        self._write(self._meta(key), json.dumps(meta).encode())
+        self._write(self._artifact(key), content)
+        self._evict()
+
+    def closed_key(self, digest: str):
+        try:
+            with open(os.path.join(self.closed_path, digest), encoding="utf-8") as index:
+                return index.read().strip() or None
+        except OSError:
+            return None
+
+    def remember_closed(self, digest: str, key: str) -> None:
+        os.makedirs(self.closed_path, exist_ok=True)
+        self._write(os.path.join(self.closed_path, digest), key.encode())
+
+    def forget_closed(self) -> None:
+        """
+        Descarta el índice de periodos cerrados: la próxima solicitud de cada
+        uno vuelve a calcular la marca de agua (los PDF se conservan).
+        """
+        try:
+            entries = list(os.scandir(self.closed_path))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _write(self, target, content: bytes) -> None:
+        # Escritura atómica: otro proceso nunca lee un archivo a medio escribir
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as output:
+                output.write(content)
+            os.replace(temp_path, target)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith(".pdf"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.name[:-len(".pdf")]))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in (self._artifact(key), self._meta(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+
+def get_report_cache():
+    """
+    Caché de reportes configurada, o None si settings.REPORT_CACHE está deshabilitado.
+    """
+    config = settings.REPORT_CACHE
+    if not config["ENABLED"]:
+        return None
+    return ReportCache(config["PATH"], config["MAX_BYTES"])
+
+
+def note_ingested(dates) -> None:
+    """
+    Descarta el índice de periodos cerrados si alguna lectura ingerida es
+    anterior al margen de cierre (una lectura atrasada puede cambiar un
+    reporte ya guardado).
+    """
+    cache = get_report_cache()
+    if cache is None:
+        return
+    grace = timedelta(hours=settings.REPORT_CACHE["CLOSED_AFTER_HOURS"])
+    boundary = timezone.now() - grace
+    if any(measure_date < boundary for measure_date in dates):
+        cache.forget_closed()
@@ -0,0 +1,162 @@
+import io
+import logging
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from src.stations.models import MonitoringStation
+from .models import ReportJob
+from .report_cache import artifact_key, data_watermark, get_report_cache, is_closed, params_digest
+
+logger = logging.getLogger(__name__)
+
+# Método del generador de PDF para cada tipo de reporte
+GENERATORS = {
+    ReportJob.ReportType.AIR_QUALITY: "generate_air_quality_report",
+    ReportJob.ReportType.TRENDS: "generate_trends_report",
+    ReportJob.ReportType.ALERTS: "generate_alerts_report",
+}
+
+
+def render_report(report_type, station, start_date, end_date, variable_code=None) -> io.BytesIO:
+    """
+    Genera el PDF de un reporte en memoria.
+    pandas, matplotlib y reportlab se importan aquí, al primer reporte.
+    Args:
+        report_type (str): Uno de ReportJob.ReportType.
+        station (MonitoringStation | None): Estación, o None para toda la red.
+        start_date (str/date): Primer día incluido.
+        end_date (str/date): Último día incluido.
+        variable_code (str): Variable a graficar (no aplica a alertas).
+    Returns:
+        io.BytesIO: Buffer con el PDF, posicionado al inicio.
+    """
+    from .reports import PDFReportGenerator
+
+    buffer = io.BytesIO()
+    generator = getattr(PDFReportGenerator(buffer), GENERATORS[report_type])
+    if report_type == ReportJob.ReportType.ALERTS:
+        generator(station, start_date, end_date)
+    else:
+        generator(station, start_date, end_date, variable_code)
+    buffer.seek(0)
+    return buffer
+
+
+def report_filename(report_type, station_name, start_date, end_date) -> str:
+    """
+    Nombre de descarga del reporte, el mismo de los endpoints síncronos.
+    Args:
+        station_name (str | None): Nombre de la estación, o None para toda la red.
+    """
+    if report_type == ReportJob.ReportType.TRENDS:
+        scope_name = station_name.replace(" ", "_") if station_name else "consolidado_cali"
+        return f"{start_date}_to_{end_date}-{scope_name}-vrisa-trends.pdf"
+
+    today_str = timezone.now().strftime("%Y%m%d")
+    scope_str = station_name.replace(" ", "_").lower() if station_name else "cali_consolidated"
+    if report_type == ReportJob.ReportType.ALERTS:
+        return f"{today_str}_vrisa_{scope_str}_alerts_report.pdf"
+    return f"{today_str}_vrisa_general_{scope_str}_report.pdf"
+
+
+def build_report(report_type, station_id, start_date, end_date, variable_code=None):
+    """
+    PDF de un reporte, desde la caché en disco si ya se generó con los mismos
+    datos (ver report_cache.py). Un periodo cerrado ya guardado se sirve sin
+    consultar la base de datos; uno abierto cuesta una consulta agregada.
+    Returns:
+        tuple: (archivo binario posicionado al inicio, nombre de descarga).
+    Raises:
+        Http404: Si la estación no existe.
+    """
+    cache = get_report_cache()
+    if cache is not None:
+        digest = params_digest(report_type, station_id, start_date, end_date, variable_code)
+        closed = is_closed(end_date)
+        key = cache.closed_key(digest) if closed else None
+        if key is None:
+            key = artifact_key(digest, data_watermark(station_id, start_date, end_date))
+            if closed:
+                cache.remember_closed(digest, key)
+        cached = cache.get(key)
+        if cached is not None:
+            report, meta = cached
+            return report, report_filename(report_type, meta["station_name"], start_date, end_date)
+
+    station = get_object_or_404(MonitoringStation, pk=station_id) if station_id else None
+    station_name = station.station_name if station else None
+    buffer = render_report(report_type, station, start_date, end_date, variable_code)
+    if cache is not None:
+        try:
+            cache.put(key, buffer.getvalue(), {"station_name": station_name})
+        except OSError:
+            # Sin espacio o sin permisos: el reporte se entrega igual, sin guardarlo
+            logger.exception("No se pudo guardar el reporte en caché")
+    return buffer, report_filename(report_type, station_name, start_date, end_date)
+
+
+def requeue_stale_jobs(stale_after: timedelta) -> int:
+    """
+    Devuelve a la cola los trabajos RUNNING cuyo worker no terminó en
+    `stale_after` (proceso detenido o caído a mitad del reporte).
+    Returns:
+        int: Cantidad de trabajos reencolados.
+    """
+    return ReportJob.objects.filter(
+        status=ReportJob.Status.RUNNING,
+        started_at__lt=timezone.now() - stale_after,
+    ).update(status=ReportJob.Status.PENDING)
+
+
+def claim_next_job():
+    """
+    Toma el trabajo pendiente más antiguo y lo marca RUNNING.
+    SKIP LOCKED permite varios workers sin que dos tomen el mismo trabajo; el
+    bloqueo dura solo la transacción del cambio de estado, no la generación.
+    Returns:
+        ReportJob | None: El trabajo tomado, o None si la cola está vacía.
+    """
+    with transaction.atomic():
+        job = (
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ReportJob.Status.PENDING)
+            .order_by("created_at", "job_id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ReportJob.Status.RUNNING
+        job.started_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=["status", "started_at", "attempts"])
+    return job
+
+
+def process_job(job: ReportJob) -> ReportJob:
+    """
+    Genera el PDF de un trabajo tomado y lo guarda en MEDIA_ROOT.
+    Un error deja el trabajo en FAILED con el mensaje, sin reintentos.
+    """
+    params = job.params
+    try:
+        report, filename = build_report(
+            job.report_type,
+            params.get("station_id"),
+            params["start_date"],
+            params["end_date"],
+            params.get("variable_code"),
+        )
+        with report:
+            # save=False: el estado y el archivo se guardan juntos abajo
+            job.file.save(filename, ContentFile(report.read()), save=False)
+        job.filename = filename
+        job.status = ReportJob.Status.COMPLETED
+        job.error = ""
+    except Exception as e:
+        job.status = ReportJob.Status.FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["file", "filename", "status", "error", "finished_at"])
+    return job
@@ -0,0 +1,588 @@
+import io
+import matplotlib
+import matplotlib.pyplot as plt
+import pandas as pd
+from django.db.models import Avg
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Image as ImageRL
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from .models import Measurement, VariableCatalog
+from .report_cache import day_bounds
+from .rollups import parse_bound, rollup_series, select_tier
+
+# Configurar backend no interactivo para matplotlib
+matplotlib.use("Agg")
+
+
+class PDFReportGenerator:
+    """
+    Generador de reportes en formato PDF para el sistema VriSA.
+
+    Utiliza ReportLab para la maquetación del documento y Pandas/Matplotlib
+    para el procesamiento de datos y generación de gráficas.
+    """
+
+    def __init__(self, buffer):
+        """
+        Inicializa el generador de reportes.
+
+        Args:
+            buffer (io.BytesIO): Buffer de memoria donde se escribirá el archivo PDF binario.
+        """
+        self.buffer = buffer
+        self.doc = SimpleDocTemplate(self.buffer, pagesize=landscape(letter))
+        self.elements = []
+        self.styles = getSampleStyleSheet()
+
+        # Estilos personalizados
+        self.styles.add(
+            ParagraphStyle(
+                name="CenterTitle", parent=self.styles["Heading1"], alignment=1
+            )
+        )
+        self.styles.add(
+            ParagraphStyle(name="SmallText", parent=self.styles["Normal"], fontSize=8)
+        )
+
+    def add_header(self, title, subtitle):
+        """
+        Agrega el encabezado estándar al flujo del documento.
+        Incluye el título principal, subtítulo y la fecha de generación automática.
+
+        Args:
+            title (str): Título principal del reporte.
+            subtitle (str): Subtítulo (ej: rango de fechas, filtros aplicados).
+        """
+        self.elements.append(Paragraph(title, self.styles["CenterTitle"]))
+        self.elements.append(Paragraph(subtitle, self.styles["Normal"]))
+        self.elements.append(Spacer(1, 20))
+        self.elements.append(
+            Paragraph(
+                f"Generado el: {timezone.now().strftime('%Y-%m-%d %H:%M')}",
+                self.styles["Normal"],
+            )
+        )
+        self.elements.append(Spacer(1, 20))
+
+    @staticmethod
+    def date_range_filter(start_date, end_date) -> dict:
+        """
+        Filtro de rango de días completos sobre measure_date como intervalo
+        semiabierto [inicio, fin + 1 día). A diferencia de `measure_date__date`,
+        compara la columna directamente, lo que permite usar el índice y que
+        PostgreSQL descarte las particiones mensuales fuera del rango.
+
+        Args:
+            start_date (str/date): Primer día incluido (YYYY-MM-DD).
+            end_date (str/date): Último día incluido (YYYY-MM-DD).
+        """
+        start, end = day_bounds(start_date, end_date)
+        return {"measure_date__gte": start, "measure_date__lt": end}
+
+    def generate_air_quality_report(
+        self, station, start_date, end_date, variable_code=None
+    ):
+        """
+        Genera el Reporte Ejecutivo de Calidad del Aire.
+
+        Este método consulta los datos históricos, los procesa utilizando Pandas para
+        obtener estadísticas descriptivas (Media, Mín, Máx, Desviación Estándar) y
+        valida si los valores exceden los límites permitidos en el catálogo de variables.
+
+        Estructura del reporte:
+        1. Tabla Resumen: Métricas por variable con indicador de estado (OK/ALERTA).
+        2. Detalle de Alertas: Lista específica de mediciones que superaron los límites (si existen).
+
+        Args:
+            station (MonitoringStation): Instancia de la estación a consultar. Si es None, se consideran todas.
+            start_date (str/date): Fecha de inicio del rango de análisis.
+            end_date (str/date): Fecha de fin del rango de análisis.
+            variable_code (str, optional): Código de variable para filtrar (ej: 'PM2.5'). Si es None, trae todas.
+        """
+        scope_name = (
+            station.station_name
+            if station
+            else "Red de Monitoreo de Cali (Consolidado)"
+        )
+        subtitle = f"Periodo analizado: {start_date} al {end_date}"
+        if variable_code:
+            subtitle += f" | Variable filtrada: {variable_code}"
+
+        self.add_header(
+            f"Reporte Ejecutivo de Calidad del Aire - {scope_name}", subtitle
+        )
+
+        # Filtros Dinámicos
+        filters = self.date_range_filter(start_date, end_date)
+        if station:
+            filters["sensor__station"] = station
+        if variable_code:
+            filters["variable__code"] = variable_code
+
+        # Se obtienen los campos necesarios para el DataFrame
+        queryset = (
+            Measurement.objects.filter(**filters)
+            .select_related("variable")
+            .values(
+                "measure_date",
+                "value",
+                "variable__code",
+                "variable__name",
+                "variable__unit",
+                "variable__min_expected_value",
+                "variable__max_expected_value",
+                "sensor__station__station_name",
+            )
+        )
+
+        if not queryset.exists():
+            self.elements.append(
+                Paragraph(
+                    "No hay datos registrados para los criterios seleccionados.",
+                    self.styles["Normal"],
+                )
+            )
+            self.doc.build(self.elements)
+            return
+
+        # Procesamiento con Pandas
+        df = pd.DataFrame(list(queryset))
+        grouped = df.groupby("variable__code")
+
+        # --- Tabla resumen con estadísticos centrales ---
+        self.elements.append(
+            Paragraph("Resumen Estadístico por Variable", self.styles["Heading2"])
+        )
+        self.elements.append(Spacer(1, 10))
+        summary_data = [
+            [
+                "Variable",
+                "Unidad",
+                "N° Muestras",
+                "Promedio",
+                "Mínimo",
+                "Máximo",
+                "Mediana",
+                "Desv. Std",
+                "C.V (%)",
+                "Límite",
+                "Estado",
+            ]
+        ]
+
+        # Lista para guardar alertas detalladas
+        alerts_detected = []
+
+        for code, group in grouped:
+            # Cálculos estadísticos básicos
+            count = group["value"].count()
+            mean = group["value"].mean()
+            min_val = group["value"].min()
+            max_val = group["value"].max()
+            median = group["value"].median()
+            std_dev = group["value"].std()
+
+            # Cálculo del Coeficiente de Variación (CV)
+            if mean != 0 and not pd.isna(std_dev):
+                cv = (std_dev / abs(mean)) * 100
+            else:
+                cv = 0.0
+
+            # Obtener metadatos de la variable
+            unit = group["variable__unit"].iloc[0]
+            limit_max_db = group["variable__max_expected_value"].iloc[0]
+            limit_min = group["variable__min_expected_value"].iloc[0]
+
+            # Lógica de "Límite Efectivo" para Alertas
+            # Por defecto usamos el límite configurado en la base de datos
+            effective_limit_max = limit_max_db
+
+            # Si la variable es AQI, ignoramos el 500 de la DB y usamos 100 como umbral de alerta
+            # (100 es el límite de "Moderado" a "Dañino para grupos sensibles" según EPA)
+            if code == "AQI":
+                effective_limit_max = 100.0
+
+            # Evaluar Estado (OK vs ALERTA)
+            status = "OK"
+
+            # Usamos effective_limit_max para la comparación lógica
+            if max_val > effective_limit_max or min_val < limit_min:
+                status = "ALERTA"
+
+                # Identificamos las filas específicas que causaron la alerta
+                outliers = group[
+                    (group["value"] > effective_limit_max)
+                    | (group["value"] < limit_min)
+                ]
+
+                # Agregamos al detalle de alertas (tabla inferior del PDF)
+                for _, row_data in outliers.iterrows():
+                    st_name = row_data.get("sensor__station__station_name", "N/A")
+                    alerts_detected.append(
+                        [
+                            row_data["measure_date"].strftime("%Y-%m-%d %H:%M"),
+                            st_name,
+                            code,
+                            f"{row_data['value']:.2f}",
+                            f"{effective_limit_max:.2f}",  # Mostramos el límite real usado (100 para AQI)
+                        ]
+                    )
+
+            # Construir la fila de la tabla resumen
+            row = [
+                code,
+                unit,
+                f"{count}",
+                f"{mean:.2f}",
+                f"{min_val:.2f}",
+                f"{max_val:.2f}",
+                f"{median:.2f}",
+                f"{std_dev:.2f}" if not pd.isna(std_dev) else "0.00",
+                f"{cv:.1f}%",
+                f"{effective_limit_max:.0f}",  # Visualmente mostramos el límite efectivo
+                status,
+            ]
+            summary_data.append(row)
+
+        col_widths = [55, 45, 55, 55, 45, 45, 45, 55, 50, 45, 55]
+        # Renderizar Tabla Resumen
+        table = Table(summary_data, colWidths=col_widths)
+
+        # Estilos dinámicos para la columna de Estado
+        table_styles = [
+            (
+                "BACKGROUND",
+                (0, 0),
+                (-1, 0),
+                colors.Color(0.26, 0.22, 0.95),
+            ),  # Header Azul
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("FONTSIZE", (0, 0), (-1, -1), 8),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ]
+
+        # Pintar celdas de estado (Fila, Columna 9 es 'Estado')
+        for i, row in enumerate(summary_data[1:], start=1):
+            bg_color = colors.red if row[-1] == "ALERTA" else colors.green
+            table_styles.append(("BACKGROUND", (10, i), (10, i), bg_color))
+            table_styles.append(("TEXTCOLOR", (10, i), (10, i), colors.white))
+            table_styles.append(("FONTNAME", (10, i), (10, i), "Helvetica-Bold"))
+
+        table.setStyle(TableStyle(table_styles))
+        self.elements.append(table)
+        self.elements.append(Spacer(1, 30))
+
+        # --- Detalle de alertas ---
+        if alerts_detected:
+            self.elements.append(
+                Paragraph(
+                    "Detalle de Eventos Críticos (Alertas)", self.styles["Heading2"]
+                )
+            )
+            self.elements.append(
+                Paragraph(
+                    "A continuación se listan los momentos específicos donde se superaron los límites permitidos:",
+                    self.styles["Normal"],
+                )
+            )
+            self.elements.append(Spacer(1, 10))
+
+            # Ordenar por fecha
+            alerts_detected.sort(key=lambda x: x[0])
+
+            # Headers de alertas
+            alerts_data = [
+                [
+                    "Fecha y Hora",
+                    "Estación",
+                    "Variable",
+                    "Valor Registrado",
+                    "Límite Permitido",
+                ]
+            ] + alerts_detected
+
+            alert_table = Table(
+                alerts_data, colWidths=[110, 140, 60, 90, 90], repeatRows=1
+            )
+            alert_table.setStyle(
+                TableStyle(
+                    [
+                        ("BACKGROUND", (0, 0), (-1, 0), colors.firebrick),
+                        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+                        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+                        (
+                            "ROWBACKGROUNDS",
+                            (0, 1),
+                            (-1, -1),
+                            [colors.whitesmoke, colors.white],
+                        ),
+                    ]
+                )
+            )
+            self.elements.append(alert_table)
+        else:
+            self.elements.append(
+                Paragraph(
+                    "No se detectaron anomalías ni excesos en los límites durante este periodo.",
+                    self.styles["Normal"],
+                )
+            )
+
+        self.doc.build(self.elements)
+
+    def generate_trends_report(self, station, start_date, end_date, variable_code=None):
+        """
+        Genera un reporte visual de tendencias.
+        Crea gráficas de línea (time-series) para cada variable solicitada usando Matplotlib
+        y las incrusta como imágenes en el PDF.
+        Si 'station' es None, calcula el promedio de todas las estaciones (Ciudad).
+        Para rangos largos las series se leen de los agregados por hora o día.
+
+        Args:
+            station (MonitoringStation): La estación a analizar.
+            start_date (str/date): Fecha de inicio.
+            end_date (str/date): Fecha de fin.
+            variable_code (str, optional): Si se especifica, solo grafica esa variable.
+        """
+        scope_name = (
+            station.station_name
+            if station
+            else "Promedio de Ciudad (Todas las estaciones)"
+        )
+        subtitle = f"Desde: {start_date} Hasta: {end_date}"
+        if variable_code:
+            subtitle += f" | Variable: {variable_code}"
+
+        self.add_header("Reporte de Tendencias", f"{scope_name} | {subtitle}")
+
+        if variable_code:
+            variables = VariableCatalog.objects.filter(code=variable_code)
+        else:
+            variables = VariableCatalog.objects.all()
+
+        tier = select_tier(parse_bound(start_date), parse_bound(end_date))
+
+        for var in variables:
+            plt.figure(figsize=(10, 4))
+
+            # Filtros base
+            filters = {"variable": var, "measure_date__range": [start_date, end_date]}
+
+            if tier:
+                # Rango largo -> Promedio por hora/día desde los agregados
+                data = rollup_series(
+                    [var.code],
+                    parse_bound(start_date),
+                    parse_bound(end_date),
+                    tier,
+                    station_ids=[station.pk] if station else None,
+                )
+
+                if not data:
+                    plt.close()
+                    continue
+
+                dates = [x["measure_date"] for x in data]
+                values = [x["value"] for x in data]
+                scope_label = station.station_name if station else "Promedio Global"
+                label_legend = f"{var.name} ({scope_label})"
+
+            elif station:
+                # Estación Específica -> Datos crudos
+                filters["sensor__station"] = station
+                data = Measurement.objects.filter(**filters).order_by("measure_date")
+
+                if not data.exists():
+                    plt.close()
+                    continue
+
+                dates = [m.measure_date for m in data]
+                values = [m.value for m in data]
+                label_legend = f"{var.name} ({station.station_name})"
+
+            else:
+                # Todas las estaciones -> Agregar por promedio
+                # Es necesario agrupar por fecha para que la gráfica tenga sentido
+                data = (
+                    Measurement.objects.filter(**filters)
+                    .values("measure_date")
+                    .annotate(avg_value=Avg("value"))
+                    .order_by("measure_date")
+                )
+
+                if not data.exists():
+                    plt.close()
+                    continue
+
+                dates = [x["measure_date"] for x in data]
+                values = [x["avg_value"] for x in data]
+                label_legend = f"{var.name} (Promedio Global)"
+
+            # Generación de la gráfica con Matplotlib
+            plt.plot(dates, values, label=label_legend, color="#4339F2", linewidth=2)
+
+            # Línea de límite normativo
+            plt.axhline(
+                y=var.max_expected_value,
+                color="r",
+                linestyle="--",
+                label=f"Límite ({var.max_expected_value})",
+            )
+
+            plt.title(f"Comportamiento de {var.name}")
+            plt.ylabel(f"{var.unit}")
+            plt.legend()
+            plt.grid(True, linestyle="--", alpha=0.6)
+            plt.xticks(rotation=45, fontsize=8)
+            plt.tight_layout()
+
+            # Guardar imagen en memoria
+            img_buffer = io.BytesIO()
+            plt.savefig(img_buffer, format="png", dpi=100)
+            plt.close()
+            img_buffer.seek(0)
+
+            # Insertar en PDF
+            self.elements.append(
+                Paragraph(f"Variable: {var.name} ({var.code})", self.styles["Heading3"])
+            )
+            self.elements.append(ImageRL(img_buffer, width=500, height=220))
+            self.elements.append(Spacer(1, 15))
+
+        if len(self.elements) <= 5:
+            self.elements.append(
+                Paragraph(
+                    "No se encontraron datos para el rango seleccionado.",
+                    self.styles["Normal"],
+                )
+            )
+
+        self.doc.build(self.elements)
+
+    def generate_alerts_report(self, station, start_date, end_date):
+        """
+        Genera un reporte de incidentes críticos basado en las últimas 24 horas.
+        Identifica mediciones que superaron el valor máximo esperado (`max_expected_value`)
+        configurado en el catálogo de variables.
+
+        Args:
+            station_id (int, optional): ID de la estación para filtrar. Si es None, busca en todas.
+        """
+        scope_name = station.station_name if station else "Red de Monitoreo de Cali"
+        self.add_header(
+            f"Reporte de Alertas Críticas - {scope_name}",
+            f"Periodo: {start_date} al {end_date}",
+        )
+
+        # Filtros
+        filters = self.date_range_filter(start_date, end_date)
+        if station:
+            filters["sensor__station"] = station
+
+        # Consultar datos
+        queryset = Measurement.objects.filter(**filters).select_related(
+            "variable", "sensor__station"
+        )
+
+        alerts_detected = []
+
+        # Procesar para encontrar valores fuera de rango ( > max o < min )
+        # Procesar para encontrar valores fuera de rango
+        for m in queryset:
+            is_critical = False
+            limit_ref = 0
+
+            # Definir el límite superior dinámicamente
+            upper_limit = m.variable.max_expected_value
+            if m.variable.code == "AQI":
+                upper_limit = 100.0
+
+            # Verificación Límite Superior
+            if m.value > upper_limit:
+                is_critical = True
+                limit_ref = upper_limit
+            # Verificación Límite Inferior
+            elif m.value < m.variable.min_expected_value:
+                is_critical = True
+                limit_ref = m.variable.min_expected_value
+
+            if is_critical:
+                alerts_detected.append(
+                    [
+                        m.measure_date.strftime("%Y-%m-%d %H:%M"),
+                        m.sensor.station.station_name,
+                        m.variable.code,
+                        f"{m.value:.2f} {m.variable.unit}",
+                        f"{limit_ref:.2f}",
+                    ]
+                )
+        # Renderizar Tabla
+        if not alerts_detected:
+            self.elements.append(
+                Paragraph(
+                    "No se han detectado alertas críticas en el periodo seleccionado.",
+                    self.styles["Normal"],
+                )
+            )
+        else:
+            self.elements.append(
+                Paragraph(
+                    f"Se encontraron {len(alerts_detected)} eventos fuera de norma:",
+                    self.styles["Normal"],
+                )
+            )
+            self.elements.append(Spacer(1, 10))
+
+            # Ordenar por fecha
+            alerts_detected.sort(key=lambda x: x[0])
+
+            data = [
+                [
+                    "Fecha/Hora",
+                    "Estación",
+                    "Variable",
+                    "Valor Registrado",
+                    "Límite Permitido",
+                ]
+            ] + alerts_detected
+
+            table = Table(data, colWidths=[110, 150, 80, 100, 100], repeatRows=1)
+            table.setStyle(
+                TableStyle(
+                    [
+                        (
+                            "BACKGROUND",
+                            (0, 0),
+                            (-1, 0),
+                            colors.firebrick,
+                        ),  # Rojo Alerta
+                        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+                        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+                        (
+                            "ROWBACKGROUNDS",
+                            (0, 1),
+                            (-1, -1),
+                            [colors.whitesmoke, colors.white],
+                        ),
+                        (
+                            "TEXTCOLOR",
+                            (3, 1),
+                            (3, -1),
+                            colors.red,
+                        ),  # Texto del valor en rojo
+                    ]
+                )
+            )
+            self.elements.append(table)
+
+        self.doc.build(self.elements)
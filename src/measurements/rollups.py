@@ -0,0 +1,417 @@
+import hashlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Max, Min, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from src.sensors.models import Sensor
+from .models import Measurement, MeasurementRollup
+from .timeseries import bucketed_series
+
+HOUR = MeasurementRollup.Granularity.HOUR
+DAY = MeasurementRollup.Granularity.DAY
+
+# Tamaño de cada tramo al reconstruir (una transacción por tramo)
+REBUILD_CHUNK = timedelta(days=31)
+
+_ROLLUP_COLUMNS = (
+    "sensor_id, station_id, variable_id, granularity, bucket_start, "
+    "count, sum, min, max, sum_sq, last_value, last_date"
+)
+
+_ON_CONFLICT = (
+    "ON CONFLICT (sensor_id, variable_id, granularity, bucket_start) DO UPDATE SET "
+    "station_id = EXCLUDED.station_id, count = EXCLUDED.count, sum = EXCLUDED.sum, "
+    "min = EXCLUDED.min, max = EXCLUDED.max, sum_sq = EXCLUDED.sum_sq, "
+    "last_value = EXCLUDED.last_value, last_date = EXCLUDED.last_date"
+)
+
+# Agregado horario a partir de las mediciones crudas
+_HOUR_AGGREGATES = (
+    "count(*), sum(m.value), min(m.value), max(m.value), sum(m.value * m.value), "
+    "(array_agg(m.value ORDER BY m.measure_date DESC))[1], max(m.measure_date)"
+)
+
+# Agregado diario a partir de los agregados horarios
+_DAY_AGGREGATES = (
+    "sum(r.count), sum(r.sum), min(r.min), max(r.max), sum(r.sum_sq), "
+    "(array_agg(r.last_value ORDER BY r.last_date DESC))[1], max(r.last_date)"
+)
+
+
+def rollups_enabled() -> bool:
+    """
+    Los agregados se mantienen con SQL específico de PostgreSQL.
+    """
+    return connection.vendor == "postgresql"
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    return floor_hour(value).replace(hour=0)
+
+
+def ceil_hour(value: datetime) -> datetime:
+    floored = floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+def parse_bound(value):
+    """
+    Convierte un límite de rango (datetime, 'YYYY-MM-DD' o ISO 8601) en un
+    datetime con zona horaria. Retorna None si no se puede interpretar.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = parse_datetime(str(value))
+            if parsed is None:
+                day = parse_date(str(value))
+                parsed = datetime.combine(day, time.min) if day else None
+        except ValueError:
+            parsed = None
+    if parsed is None:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def select_tier(start, end):
+    """
+    Elige el nivel de agregación más grueso adecuado para el rango consultado,
+    según settings.MEASUREMENT_ROLLUP_TIERS.
+    Returns:
+        str | None: 'day', 'hour' o None (usar mediciones crudas).
+    """
+    if not rollups_enabled() or start is None or end is None:
+        return None
+    span = end - start
+    tiers = settings.MEASUREMENT_ROLLUP_TIERS
+    for granularity in (DAY, HOUR):
+        if span > tiers[granularity]:
+            return granularity
+    return None
+
+
+def bucket_keys(rows) -> set:
+    """
+    Periodos horarios tocados por un conjunto de lecturas.
+    Args:
+        rows (iterable): Tuplas (sensor_id, variable_id, measure_date).
+    Returns:
+        set: Tuplas (sensor_id, variable_id, inicio_de_hora).
+    """
+    keys = set()
+    for sensor_id, variable_id, measure_date in rows:
+        if timezone.is_naive(measure_date):
+            measure_date = timezone.make_aware(measure_date)
+        keys.add((sensor_id, variable_id, floor_hour(measure_date)))
+    return keys
+
+
+def refresh_rollups(keys) -> None:
+    """
+    Recalcula los agregados horarios y diarios de los periodos tocados.
+
+    Se recalcula el periodo completo desde las mediciones crudas (en lugar de
+    sumar deltas) porque la ingesta es un upsert: una lectura repetida puede
+    reemplazar un valor existente. Cada periodo horario tiene a lo sumo unas
+    decenas de filas y el diario se deriva de los 24 horarios, de modo que el
+    costo es proporcional a lo ingerido y no al tamaño de la tabla.
+
+    Dos ingestas concurrentes sobre el mismo periodo no ven las filas aún no
+    confirmadas de la otra (READ COMMITTED): sin coordinación, la que confirma
+    último sobrescribe el agregado con un conteo parcial. Por eso cada
+    transacción toma un advisory lock por (sensor, variable, día) antes de
+    recalcular; la segunda espera a que la primera confirme y su recálculo
+    ya incluye esas filas.
+
+    Args:
+        keys (iterable): Tuplas (sensor_id, variable_id, inicio_de_hora),
+            ver `bucket_keys`.
+    """
+    keys = list(keys)
+    if not keys or not rollups_enabled():
+        return
+
+    days = {(sensor_id, variable_id, bucket.replace(hour=0)) for sensor_id, variable_id, bucket in keys}
+    table = MeasurementRollup._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Orden fijo de adquisición para que dos ingestas no se bloqueen mutuamente
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(k) FROM unnest(%s::bigint[]) WITH ORDINALITY AS t(k, i) "
+            "ORDER BY i",
+            [sorted({_lock_id(*day) for day in days})],
+        )
+        cursor.execute(
+            f"INSERT INTO {table} ({_ROLLUP_COLUMNS}) "
+            f"SELECT m.sensor_id, s.station_id, m.variable_id, %s, k.bucket_start, {_HOUR_AGGREGATES} "
+            "FROM unnest(%s::integer[], %s::integer[], %s::timestamptz[]) "
+            "AS k(sensor_id, variable_id, bucket_start) "
+            f"JOIN {Measurement._meta.db_table} m ON m.sensor_id = k.sensor_id "
+            "AND m.variable_id = k.variable_id "
+            "AND m.measure_date >= k.bucket_start "
+            "AND m.measure_date < k.bucket_start + interval '1 hour' "
+            f"JOIN {Sensor._meta.db_table} s ON s.sensor_id = m.sensor_id "
+            "GROUP BY m.sensor_id, s.station_id, m.variable_id, k.bucket_start "
+            f"{_ON_CONFLICT}",
+            [HOUR, *_unzip(keys)],
+        )
+        cursor.execute(
+            f"INSERT INTO {table} ({_ROLLUP_COLUMNS}) "
+            "SELECT r.sensor_id, (array_agg(r.station_id ORDER BY r.bucket_start DESC))[1], "
+            f"r.variable_id, %s, k.bucket_start, {_DAY_AGGREGATES} "
+            "FROM unnest(%s::integer[], %s::integer[], %s::timestamptz[]) "
+            "AS k(sensor_id, variable_id, bucket_start) "
+            f"JOIN {table} r ON r.sensor_id = k.sensor_id "
+            "AND r.variable_id = k.variable_id "
+            "AND r.granularity = %s "
+            "AND r.bucket_start >= k.bucket_start "
+            "AND r.bucket_start < k.bucket_start + interval '1 day' "
+            "GROUP BY r.sensor_id, r.variable_id, k.bucket_start "
+            f"{_ON_CONFLICT}",
+            [DAY, *_unzip(days), HOUR],
+        )
+
+
+def rebuild_rollups(start=None, end=None) -> int:
+    """
+    Reconstruye los agregados desde las mediciones crudas, por tramos de
+    REBUILD_CHUNK. Sin rango se reconstruye todo el histórico. El rango se
+    amplía a días completos para que los agregados diarios queden completos.
+
+    Returns:
+        int: Cantidad de agregados horarios generados.
+    """
+    if not rollups_enabled():
+        return 0
+
+    if start is None or end is None:
+        bounds = Measurement.objects.aggregate(first=Min("measure_date"), last=Max("measure_date"))
+        if start is None and end is None:
+            MeasurementRollup.objects.all().delete()
+        start = start or bounds["first"]
+        end = end or bounds["last"]
+        if start is None or end is None:
+            return 0
+
+    start = floor_day(start)
+    end = floor_day(end) + timedelta(days=1)
+    table = MeasurementRollup._meta.db_table
+    created = 0
+
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + REBUILD_CHUNK, end)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE bucket_start >= %s AND bucket_start < %s",
+                [chunk_start, chunk_end],
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({_ROLLUP_COLUMNS}) "
+                f"SELECT m.sensor_id, s.station_id, m.variable_id, %s, "
+                f"date_trunc('hour', m.measure_date), {_HOUR_AGGREGATES} "
+                f"FROM {Measurement._meta.db_table} m "
+                f"JOIN {Sensor._meta.db_table} s ON s.sensor_id = m.sensor_id "
+                "WHERE m.measure_date >= %s AND m.measure_date < %s "
+                "GROUP BY m.sensor_id, s.station_id, m.variable_id, date_trunc('hour', m.measure_date) "
+                f"{_ON_CONFLICT}",
+                [HOUR, chunk_start, chunk_end],
+            )
+            created += cursor.rowcount
+            cursor.execute(
+                f"INSERT INTO {table} ({_ROLLUP_COLUMNS}) "
+                "SELECT r.sensor_id, (array_agg(r.station_id ORDER BY r.bucket_start DESC))[1], "
+                f"r.variable_id, %s, date_trunc('day', r.bucket_start), {_DAY_AGGREGATES} "
+                f"FROM {table} r "
+                "WHERE r.granularity = %s AND r.bucket_start >= %s AND r.bucket_start < %s "
+                "GROUP BY r.sensor_id, r.variable_id, date_trunc('day', r.bucket_start) "
+                f"{_ON_CONFLICT}",
+                [DAY, HOUR, chunk_start, chunk_end],
+            )
+        chunk_start = chunk_end
+
+    return created
+
+
+def rollup_group_fields(station_ids=None) -> tuple:
+    """
+    Campos que identifican cada serie en las consultas sobre agregados:
+    variable y, si se pidieron estaciones, la estación.
+    """
+    return ("variable__code", "station_id") if station_ids else ("variable__code",)
+
+
+def rollup_series(variable_codes, start, end, granularity: str, station_ids=None):
+    """
+    Series promedio por periodo leídas desde los agregados, una por variable
+    (y por estación si se indican station_ids; sin ellas, promedio de la red).
+
+    Returns:
+        QuerySet: Diccionarios {"variable__code", ["station_id"], "measure_date", "value"}
+            ordenados por serie y fecha.
+    """
+    bucket_floor = floor_day if granularity == DAY else floor_hour
+    queryset = MeasurementRollup.objects.filter(
+        variable__code__in=variable_codes,
+        granularity=granularity,
+        bucket_start__gte=bucket_floor(start),
+        bucket_start__lte=end,
+    )
+    if station_ids:
+        queryset = queryset.filter(station_id__in=station_ids)
+
+    group_by = rollup_group_fields(station_ids)
+    return (
+        queryset.values(*group_by, measure_date=F("bucket_start"))
+        .annotate(
+            value=ExpressionWrapper(Sum("sum") / Sum("count"), output_field=FloatField())
+        )
+        .order_by(*group_by, "measure_date")
+    )
+
+
+def whole_hour_offsets(tzinfo, start: datetime, end: datetime) -> bool:
+    """
+    Indica si la zona horaria tiene un desfase de horas completas respecto a
+    UTC en todo [start, end], de modo que sus horas y días locales se pueden
+    armar con agregados horarios UTC. Zonas como Asia/Kolkata (+05:30) o
+    America/St_Johns (-03:30) requieren las mediciones crudas.
+    El desfase se revisa en cada día del rango (cambios de horario incluidos).
+    """
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    moment = start
+    while True:
+        offset = moment.astimezone(tzinfo).utcoffset()
+        if offset is None or offset % timedelta(hours=1):
+            return False
+        if moment >= end:
+            return True
+        moment = min(moment + timedelta(days=1), end)
+
+
+def rollup_bucketed_series(
+    variable_codes, start, end, resolution: str, aggregate, tzinfo=None, station_ids=None
+):
+    """
+    Series agrupadas por periodos de una hora o más, calculadas sobre los
+    agregados horarios en lugar de las mediciones crudas. Los días locales se
+    forman a partir de horas UTC, lo que solo es exacto para zonas horarias con
+    desfase de horas completas (p. ej. America/Bogota): verificar antes con
+    `whole_hour_offsets`.
+
+    Args:
+        aggregate: Expresión de agregación sobre columnas de MeasurementRollup
+            (ver timeseries.rollup_aggregate).
+    Returns:
+        QuerySet: Diccionarios {"variable__code", ["station_id"], "bucket", "value"}
+            ordenados por serie y periodo.
+    """
+    queryset = MeasurementRollup.objects.filter(
+        variable__code__in=variable_codes,
+        granularity=HOUR,
+        bucket_start__gte=floor_hour(start),
+        bucket_start__lte=end,
+    )
+    if station_ids:
+        queryset = queryset.filter(station_id__in=station_ids)
+    return bucketed_series(
+        queryset, "bucket_start", resolution, aggregate, tzinfo,
+        group_by=rollup_group_fields(station_ids),
+    )
+
+
+def window_averages(variable_codes, start: datetime, end: datetime, station_ids=None, per_station=False) -> dict:
+    """
+    Promedio de varias variables en [start, end] considerando solo sensores
+    activos, resuelto en una sola consulta agrupada por variable (y estación).
+
+    Las horas completas del intervalo se leen de los agregados horarios y solo
+    los bordes parciales (antes de la primera hora completa y después de la
+    última) se leen de las mediciones crudas; ambas partes se combinan con
+    UNION ALL. El resultado es idéntico al promedio sobre las filas crudas.
+
+    Args:
+        variable_codes (list): Códigos de variable (ej: AQICalculatorService.SUPPORTED_POLLUTANTS).
+        station_ids (list, optional): Restringe a esas estaciones, un promedio por estación.
+        per_station (bool): Sin station_ids, un promedio por cada estación de la red.
+    Returns:
+        dict: {(station_id, variable_code): promedio} solo para las combinaciones
+            con mediciones; station_id es None para el promedio de la red.
+    """
+    by_station = bool(station_ids) or per_station
+    raw_group = ["variable__code", "sensor__station_id"] if by_station else ["variable__code"]
+    rollup_group = ["variable__code", "station_id"] if by_station else ["variable__code"]
+
+    raw = Measurement.objects.filter(
+        variable__code__in=variable_codes, sensor__status=Sensor.Status.ACTIVE
+    )
+    if station_ids:
+        raw = raw.filter(sensor__station_id__in=station_ids)
+
+    first_full = ceil_hour(start)
+    last_full = floor_hour(end)
+
+    if not rollups_enabled() or first_full >= last_full:
+        rows = (
+            raw.filter(measure_date__gte=start, measure_date__lte=end)
+            .values_list(*raw_group)
+            .annotate(count=Count("value"), total=Sum("value"))
+            .order_by()
+        )
+    else:
+        edges = (
+            raw.filter(
+                Q(measure_date__gte=start, measure_date__lt=first_full)
+                | Q(measure_date__gte=last_full, measure_date__lte=end)
+            )
+            .values_list(*raw_group)
+            .annotate(count=Count("value"), total=Sum("value"))
+            .order_by()
+        )
+        rolled = MeasurementRollup.objects.filter(
+            variable__code__in=variable_codes,
+            granularity=HOUR,
+            bucket_start__gte=first_full,
+            bucket_start__lt=last_full,
+            sensor__status=Sensor.Status.ACTIVE,
+        )
+        if station_ids:
+            rolled = rolled.filter(station_id__in=station_ids)
+        rolled = (
+            rolled.values_list(*rollup_group)
+            .annotate(count=Sum("count"), total=Sum("sum"))
+            .order_by()
+        )
+        rows = edges.union(rolled, all=True)
+
+    totals = {}
+    for row in rows:
+        key = (row[1] if by_station else None, row[0])
+        count, total = totals.get(key, (0, 0.0))
+        totals[key] = (count + int(row[-2]), total + float(row[-1] or 0))
+
+    return {key: total / count for key, (count, total) in totals.items() if count}
+
+
+def _unzip(keys):
+    sensor_ids, variable_ids, buckets = [], [], []
+    for sensor_id, variable_id, bucket in keys:
+        sensor_ids.append(sensor_id)
+        variable_ids.append(variable_id)
+        buckets.append(bucket)
+    return sensor_ids, variable_ids, buckets
+
+
+def _lock_id(sensor_id, variable_id, day) -> int:
+    # Llave de 64 bits con signo para pg_advisory_xact_lock
+    digest = hashlib.blake2b(f"rollup:{sensor_id}:{variable_id}:{day.isoformat()}".encode(), digest_size=8)
+    return int.from_bytes(digest.digest(), "big", signed=True)
@@ -1,5 +1,7 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import VariableCatalog, Measurement
+from src.stations.models import MonitoringStation
+from .models import VariableCatalog, Measurement, ReportJob
 
 class VariableCatalogSerializer(serializers.ModelSerializer):
     """
@@ -34,4 +36,83 @@ class MeasurementSerializer(serializers.ModelSerializer):
             'value', 
             'measure_date', 
             'created_at'
-        ]
\ No newline at end of file
+        ]
+
+class MeasurementBatchItemSerializer(serializers.Serializer):
+    """
+    Serializador de ENTRADA para cada lectura de la ingesta por lotes.
+    A diferencia de MeasurementSerializer, recibe 'sensor' y 'variable' como
+    IDs planos: la existencia y el estado se resuelven en bloque en el
+    MeasurementService para evitar una consulta por fila.
+    """
+    sensor = serializers.IntegerField()
+    variable = serializers.IntegerField()
+    value = serializers.FloatField()
+    measure_date = serializers.DateTimeField()
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """
+    Serializador de los trabajos de reporte asíncronos.
+    - Escritura: recibe el tipo y los mismos parámetros de los endpoints
+      síncronos (station_id opcional, start_date, end_date, variable_code).
+    - Lectura: estado del trabajo y URL de descarga cuando está completo.
+    """
+    station_id = serializers.IntegerField(required=False, allow_null=True, write_only=True)
+    start_date = serializers.DateField(write_only=True)
+    end_date = serializers.DateField(write_only=True)
+    variable_code = serializers.CharField(
+        required=False, allow_null=True, allow_blank=True, write_only=True
+    )
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'job_id',
+            'report_type',
+            'station_id',
+            'start_date',
+            'end_date',
+            'variable_code',
+            'params',
+            'status',
+            'filename',
+            'error',
+            'attempts',
+            'created_at',
+            'started_at',
+            'finished_at',
+            'download_url',
+        ]
+        read_only_fields = [
+            'params', 'status', 'filename', 'error', 'attempts',
+            'created_at', 'started_at', 'finished_at',
+        ]
+
+    def validate_station_id(self, value):
+        if value and not MonitoringStation.objects.filter(pk=value).exists():
+            raise serializers.ValidationError("La estación no existe.")
+        return value or None
+
+    def validate(self, attrs):
+        if attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError(
+                {'end_date': "end_date debe ser igual o posterior a start_date."}
+            )
+        return attrs
+
+    def create(self, validated_data):
+        params = {
+            'station_id': validated_data.pop('station_id', None),
+            'start_date': validated_data.pop('start_date').isoformat(),
+            'end_date': validated_data.pop('end_date').isoformat(),
+            'variable_code': validated_data.pop('variable_code', None) or None,
+        }
+        return ReportJob.objects.create(params=params, **validated_data)
+
+    def get_download_url(self, obj):
+        if obj.status != ReportJob.Status.COMPLETED:
+            return None
+        request = self.context.get('request')
+        url = reverse('report-jobs-download', args=[obj.job_id])
+        return request.build_absolute_uri(url) if request else url
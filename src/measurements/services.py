@@ -1,23 +1,22 @@
-import io
 from datetime import timedelta
-import matplotlib
-import matplotlib.pyplot as plt
-import pandas as pd
+from time import monotonic
+import numpy as np
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Avg
+from django.db.models import Avg, Count, Max
 from django.utils import timezone
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import landscape, letter
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.platypus import Image as ImageRL
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
-from common.validation import AQI_BREAKPOINTS, AQI_CATEGORIES
 from src.sensors.models import Sensor
+from .aqi_arrays import CATEGORIES, category_indices, sub_indices
+from .aqi_backfill import aqi_grid, historical_aqi
+from .bulk_loader import NATURAL_KEY_FIELDS, ON_CONFLICT_UPDATE, copy_measurements
+from .aqi_state import get_aqi_state
+from .latest_matrix import get_latest_matrix, latest_rows, variable_catalog
+from .live_state import publish_measurements
+from .recent_series import get_recent_series, to_datetimes, to_floats
 from .models import Measurement, VariableCatalog
-
-# Configurar backend no interactivo para matplotlib
-matplotlib.use("Agg")
+from .rollups import bucket_keys, refresh_rollups, window_averages
+from .write_buffer import get_write_buffer
 
 
 class MeasurementService:
@@ -47,557 +46,261 @@ class MeasurementService:
         variable = data.get("variable")
         value = data.get("value")
 
-        # Sensor Activo
-        if sensor.status != Sensor.Status.ACTIVE:
-            raise ValidationError(
-                f"El sensor {sensor.serial_number} no está activo (Estado: {sensor.status})."
-            )
-
-        if value < 0:
-            raise ValidationError(
-                f"El valor no puede ser negativo para {variable.code}."
-            )
-
-        if variable.code == "HUM" and value > 100:
-            raise ValidationError("La humedad no puede superar el 100%.")
-
-        with transaction.atomic():
-            measurement = Measurement.objects.create(**data)
-            return measurement
+        error = MeasurementService._check_reading(sensor, variable, value)
+        if error:
+            raise ValidationError(error)
 
+        # Escritura idempotente: un reintento del mismo dato no genera duplicados
+        return MeasurementService.bulk_insert([Measurement(**data)])[0]
 
-class PDFReportGenerator:
-    """
-    Generador de reportes en formato PDF para el sistema VriSA.
-
-    Utiliza ReportLab para la maquetación del documento y Pandas/Matplotlib
-    para el procesamiento de datos y generación de gráficas.
-    """
-
-    def __init__(self, buffer):
+    @staticmethod
+    def create_measurements_bulk(rows: list, sensors: dict = None) -> list:
         """
-        Inicializa el generador de reportes.
-
+        Ingesta por lotes de mediciones con validación basada en conjuntos.
+        En lugar de validar fila por fila contra la base de datos, resuelve todos
+        los sensores y variables referenciados con una consulta por tabla y aplica
+        las mismas reglas de `create_measurement` sobre los datos en memoria.
+        Las filas válidas se insertan con un único INSERT multi-fila dentro de una
+        sola transacción.
         Args:
-            buffer (io.BytesIO): Buffer de memoria donde se escribirá el archivo PDF binario.
+            rows (list): Lista de diccionarios con 'sensor' (ID), 'variable' (ID),
+                'value' y 'measure_date'. Proviene de MeasurementBatchItemSerializer.
+            sensors (dict, optional): Sensores ya resueltos {sensor_id: Sensor}.
+                Si se provee (p. ej. desde la caché de tokens de estación), no se
+                consulta la tabla de sensores y solo se aceptan esos sensores.
+        Returns:
+            list: Un resultado por fila, en el mismo orden de entrada:
+                {"index", "status": "created", "measurement_id"} o
+                {"index", "status": "rejected", "errors": [...]}.
         """
-        self.buffer = buffer
-        self.doc = SimpleDocTemplate(self.buffer, pagesize=landscape(letter))
-        self.elements = []
-        self.styles = getSampleStyleSheet()
-
-        # Estilos personalizados
-        self.styles.add(
-            ParagraphStyle(
-                name="CenterTitle", parent=self.styles["Heading1"], alignment=1
-            )
-        )
-        self.styles.add(
-            ParagraphStyle(name="SmallText", parent=self.styles["Normal"], fontSize=8)
-        )
+        restricted = sensors is not None
+        if not restricted:
+            sensors = Sensor.objects.only(
+                "sensor_id", "serial_number", "status", "station_id"
+            ).in_bulk({row["sensor"] for row in rows})
+        variables = VariableCatalog.objects.in_bulk({row["variable"] for row in rows})
+
+        results = []
+        pending = []
+
+        for index, row in enumerate(rows):
+            sensor = sensors.get(row["sensor"])
+            variable = variables.get(row["variable"])
+
+            if sensor is None:
+                error = (
+                    f"El sensor {row['sensor']} no pertenece a la estación."
+                    if restricted
+                    else f"El sensor {row['sensor']} no existe."
+                )
+            elif variable is None:
+                error = f"La variable {row['variable']} no existe."
+            else:
+                error = MeasurementService._check_reading(
+                    sensor, variable, row["value"]
+                )
 
-    def add_header(self, title, subtitle):
-        """
-        Agrega el encabezado estándar al flujo del documento.
-        Incluye el título principal, subtítulo y la fecha de generación automática.
+            if error:
+                results.append({"index": index, "status": "rejected", "errors": [error]})
+                continue
 
-        Args:
-            title (str): Título principal del reporte.
-            subtitle (str): Subtítulo (ej: rango de fechas, filtros aplicados).
-        """
-        self.elements.append(Paragraph(title, self.styles["CenterTitle"]))
-        self.elements.append(Paragraph(subtitle, self.styles["Normal"]))
-        self.elements.append(Spacer(1, 20))
-        self.elements.append(
-            Paragraph(
-                f"Generado el: {timezone.now().strftime('%Y-%m-%d %H:%M')}",
-                self.styles["Normal"],
+            results.append({"index": index, "status": "created"})
+            pending.append(
+                Measurement(
+                    sensor=sensor,
+                    variable=variable,
+                    value=row["value"],
+                    measure_date=row["measure_date"],
+                )
             )
-        )
-        self.elements.append(Spacer(1, 20))
-
-    def generate_air_quality_report(
-        self, station, start_date, end_date, variable_code=None
-    ):
-        """
-        Genera el Reporte Ejecutivo de Calidad del Aire.
 
-        Este método consulta los datos históricos, los procesa utilizando Pandas para
-        obtener estadísticas descriptivas (Media, Mín, Máx, Desviación Estándar) y
-        valida si los valores exceden los límites permitidos en el catálogo de variables.
+        if pending:
+            MeasurementService.bulk_insert(pending)
 
-        Estructura del reporte:
-        1. Tabla Resumen: Métricas por variable con indicador de estado (OK/ALERTA).
-        2. Detalle de Alertas: Lista específica de mediciones que superaron los límites (si existen).
+        # Asignar los IDs generados a las filas aceptadas (mismo orden de inserción)
+        created = iter(pending)
+        for result in results:
+            if result["status"] == "created":
+                result["measurement_id"] = next(created).measurement_id
 
-        Args:
-            station (MonitoringStation): Instancia de la estación a consultar. Si es None, se consideran todas.
-            start_date (str/date): Fecha de inicio del rango de análisis.
-            end_date (str/date): Fecha de fin del rango de análisis.
-            variable_code (str, optional): Código de variable para filtrar (ej: 'PM2.5'). Si es None, trae todas.
-        """
-        scope_name = (
-            station.station_name
-            if station
-            else "Red de Monitoreo de Cali (Consolidado)"
-        )
-        subtitle = f"Periodo analizado: {start_date} al {end_date}"
-        if variable_code:
-            subtitle += f" | Variable filtrada: {variable_code}"
+        return results
 
-        self.add_header(
-            f"Reporte Ejecutivo de Calidad del Aire - {scope_name}", subtitle
-        )
+    @staticmethod
+    def enqueue_measurement(data: dict) -> Measurement:
+        """
+        Variante de `create_measurement` con escritura diferida (write-behind).
+        Aplica las mismas validaciones y, si settings.MEASUREMENT_WRITE_BUFFER
+        está habilitado, encola la medición para ser escrita en lote por el buffer
+        del proceso; si no, la guarda de inmediato.
+        Returns:
+            Measurement: La instancia (sin measurement_id si quedó en el buffer).
+        Raises:
+            ValidationError: Si la lectura no cumple las reglas de negocio.
+            WriteBufferFullError: Si el buffer está lleno (backpressure).
+        """
+        if not settings.MEASUREMENT_WRITE_BUFFER["ENABLED"]:
+            return MeasurementService.create_measurement(data)
 
-        # Filtros Dinámicos
-        filters = {"measure_date__date__range": [start_date, end_date]}
-        if station:
-            filters["sensor__station"] = station
-        if variable_code:
-            filters["variable__code"] = variable_code
-
-        # Se obtienen los campos necesarios para el DataFrame
-        queryset = (
-            Measurement.objects.filter(**filters)
-            .select_related("variable")
-            .values(
-                "measure_date",
-                "value",
-                "variable__code",
-                "variable__name",
-                "variable__unit",
-                "variable__min_expected_value",
-                "variable__max_expected_value",
-                "sensor__station__station_name",
-            )
+        error = MeasurementService._check_reading(
+            data.get("sensor"), data.get("variable"), data.get("value")
         )
+        if error:
+            raise ValidationError(error)
 
-        if not queryset.exists():
-            self.elements.append(
-                Paragraph(
-                    "No hay datos registrados para los criterios seleccionados.",
-                    self.styles["Normal"],
-                )
-            )
-            self.doc.build(self.elements)
-            return
+        measurement = Measurement(**data)
+        get_write_buffer().put(measurement)
+        return measurement
 
-        # Procesamiento con Pandas
-        df = pd.DataFrame(list(queryset))
-        grouped = df.groupby("variable__code")
-
-        # --- Tabla resumen con estadísticos centrales ---
-        self.elements.append(
-            Paragraph("Resumen Estadístico por Variable", self.styles["Heading2"])
-        )
-        self.elements.append(Spacer(1, 10))
-        summary_data = [
-            [
-                "Variable",
-                "Unidad",
-                "N° Muestras",
-                "Promedio",
-                "Mínimo",
-                "Máximo",
-                "Mediana",
-                "Desv. Std",
-                "C.V (%)",
-                "Límite",
-                "Estado",
-            ]
-        ]
-
-        # Lista para guardar alertas detalladas
-        alerts_detected = []
-
-        for code, group in grouped:
-            # Cálculos estadísticos básicos
-            count = group["value"].count()
-            mean = group["value"].mean()
-            min_val = group["value"].min()
-            max_val = group["value"].max()
-            median = group["value"].median()
-            std_dev = group["value"].std()
-
-            # Cálculo del Coeficiente de Variación (CV)
-            if mean != 0 and not pd.isna(std_dev):
-                cv = (std_dev / abs(mean)) * 100
-            else:
-                cv = 0.0
-
-            # Obtener metadatos de la variable
-            unit = group["variable__unit"].iloc[0]
-            limit_max_db = group["variable__max_expected_value"].iloc[0]
-            limit_min = group["variable__min_expected_value"].iloc[0]
-
-            # Lógica de "Límite Efectivo" para Alertas
-            # Por defecto usamos el límite configurado en la base de datos
-            effective_limit_max = limit_max_db
-
-            # Si la variable es AQI, ignoramos el 500 de la DB y usamos 100 como umbral de alerta
-            # (100 es el límite de "Moderado" a "Dañino para grupos sensibles" según EPA)
-            if code == "AQI":
-                effective_limit_max = 100.0
-
-            # Evaluar Estado (OK vs ALERTA)
-            status = "OK"
-
-            # Usamos effective_limit_max para la comparación lógica
-            if max_val > effective_limit_max or min_val < limit_min:
-                status = "ALERTA"
-
-                # Identificamos las filas específicas que causaron la alerta
-                outliers = group[
-                    (group["value"] > effective_limit_max)
-                    | (group["value"] < limit_min)
-                ]
-
-                # Agregamos al detalle de alertas (tabla inferior del PDF)
-                for _, row_data in outliers.iterrows():
-                    st_name = row_data.get("sensor__station__station_name", "N/A")
-                    alerts_detected.append(
-                        [
-                            row_data["measure_date"].strftime("%Y-%m-%d %H:%M"),
-                            st_name,
-                            code,
-                            f"{row_data['value']:.2f}",
-                            f"{effective_limit_max:.2f}",  # Mostramos el límite real usado (100 para AQI)
-                        ]
-                    )
+    @staticmethod
+    def bulk_insert(measurements: list) -> list:
+        """
+        Persiste un lote de mediciones ya validadas con un INSERT multi-fila
+        idempotente (INSERT ... ON CONFLICT sobre la llave natural sensor,
+        variable, measure_date). Si un dispositivo reintenta el envío, la lectura
+        existente se actualiza en lugar de duplicarse.
+        Es el punto de escritura común de la ingesta individual, por lotes y del
+        buffer de escritura diferida; en la misma transacción actualiza los
+        agregados por hora y día de los periodos tocados y, al confirmar, publica
+        las lecturas en el estado compartido en memoria (ver live_state.py).
+        Args:
+            measurements (list): Instancias de Measurement sin guardar.
+        Returns:
+            list: Las mismas instancias con su measurement_id asignado.
+        """
+        # PostgreSQL no permite que un mismo INSERT ... ON CONFLICT afecte dos veces
+        # la misma fila: dentro del lote gana la última lectura de cada llave.
+        unique = {}
+        for measurement in measurements:
+            key = (measurement.sensor_id, measurement.variable_id, measurement.measure_date)
+            unique[key] = measurement
 
-            # Construir la fila de la tabla resumen
-            row = [
-                code,
-                unit,
-                f"{count}",
-                f"{mean:.2f}",
-                f"{min_val:.2f}",
-                f"{max_val:.2f}",
-                f"{median:.2f}",
-                f"{std_dev:.2f}" if not pd.isna(std_dev) else "0.00",
-                f"{cv:.1f}%",
-                f"{effective_limit_max:.0f}",  # Visualmente mostramos el límite efectivo
-                status,
-            ]
-            summary_data.append(row)
-
-        col_widths = [55, 45, 55, 55, 45, 45, 45, 55, 50, 45, 55]
-        # Renderizar Tabla Resumen
-        table = Table(summary_data, colWidths=col_widths)
-
-        # Estilos dinámicos para la columna de Estado
-        table_styles = [
-            (
-                "BACKGROUND",
-                (0, 0),
-                (-1, 0),
-                colors.Color(0.26, 0.22, 0.95),
-            ),  # Header Azul
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-            ("FONTSIZE", (0, 0), (-1, -1), 8),
-            ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-        ]
-
-        # Pintar celdas de estado (Fila, Columna 9 es 'Estado')
-        for i, row in enumerate(summary_data[1:], start=1):
-            bg_color = colors.red if row[-1] == "ALERTA" else colors.green
-            table_styles.append(("BACKGROUND", (10, i), (10, i), bg_color))
-            table_styles.append(("TEXTCOLOR", (10, i), (10, i), colors.white))
-            table_styles.append(("FONTNAME", (10, i), (10, i), "Helvetica-Bold"))
-
-        table.setStyle(TableStyle(table_styles))
-        self.elements.append(table)
-        self.elements.append(Spacer(1, 30))
-
-        # --- Detalle de alertas ---
-        if alerts_detected:
-            self.elements.append(
-                Paragraph(
-                    "Detalle de Eventos Críticos (Alertas)", self.styles["Heading2"]
-                )
-            )
-            self.elements.append(
-                Paragraph(
-                    "A continuación se listan los momentos específicos donde se superaron los límites permitidos:",
-                    self.styles["Normal"],
-                )
-            )
-            self.elements.append(Spacer(1, 10))
-
-            # Ordenar por fecha
-            alerts_detected.sort(key=lambda x: x[0])
-
-            # Headers de alertas
-            alerts_data = [
-                [
-                    "Fecha y Hora",
-                    "Estación",
-                    "Variable",
-                    "Valor Registrado",
-                    "Límite Permitido",
-                ]
-            ] + alerts_detected
-
-            alert_table = Table(
-                alerts_data, colWidths=[110, 140, 60, 90, 90], repeatRows=1
-            )
-            alert_table.setStyle(
-                TableStyle(
-                    [
-                        ("BACKGROUND", (0, 0), (-1, 0), colors.firebrick),
-                        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-                        (
-                            "ROWBACKGROUNDS",
-                            (0, 1),
-                            (-1, -1),
-                            [colors.whitesmoke, colors.white],
-                        ),
-                    ]
-                )
-            )
-            self.elements.append(alert_table)
-        else:
-            self.elements.append(
-                Paragraph(
-                    "No se detectaron anomalías ni excesos en los límites durante este periodo.",
-                    self.styles["Normal"],
-                )
+        with transaction.atomic():
+            Measurement.objects.bulk_create(
+                list(unique.values()),
+                update_conflicts=True,
+                unique_fields=NATURAL_KEY_FIELDS,
+                update_fields=["value", "updated_at"],
             )
+            refresh_rollups(bucket_keys(unique))
+            batch = list(unique.values())
+            transaction.on_commit(lambda: publish_measurements(batch))
+
+        for measurement in measurements:
+            key = (measurement.sensor_id, measurement.variable_id, measurement.measure_date)
+            measurement.measurement_id = unique[key].measurement_id
 
-        self.doc.build(self.elements)
+        return measurements
 
-    def generate_trends_report(self, station, start_date, end_date, variable_code=None):
+    @staticmethod
+    def latest_by_variable(station_ids=None) -> dict:
         """
-        Genera un reporte visual de tendencias.
-        Crea gráficas de línea (time-series) para cada variable solicitada usando Matplotlib
-        y las incrusta como imágenes en el PDF.
-        Si 'station' es None, calcula el promedio de todas las estaciones (Ciudad).
+        Última medición de sensores activos para cada variable del catálogo.
+        Se lee de la tabla compartida en memoria (ver latest_matrix.py) cuando
+        está habilitada; en otro caso, o si no cubre la consulta, con una sola
+        consulta (ver latest_matrix.latest_rows) en lugar de una por variable.
 
         Args:
-            station (MonitoringStation): La estación a analizar.
-            start_date (str/date): Fecha de inicio.
-            end_date (str/date): Fecha de fin.
-            variable_code (str, optional): Si se especifica, solo grafica esa variable.
-        """
-        scope_name = (
-            station.station_name
-            if station
-            else "Promedio de Ciudad (Todas las estaciones)"
-        )
-        subtitle = f"Desde: {start_date} Hasta: {end_date}"
-        if variable_code:
-            subtitle += f" | Variable: {variable_code}"
+            station_ids (list, optional): IDs de estación; sin ellos se toma la
+                última medición de toda la red.
+        Returns:
+            dict: {station_id: {codigo: {"value", "unit", "last_updated"} | None}};
+                la llave es None cuando no se filtra por estación.
+        """
+        variables = variable_catalog()
+
+        rows = None
+        matrix = get_latest_matrix()
+        if matrix is not None:
+            matrix.ensure_warm()
+            rows = matrix.read(station_ids, [variable_id for variable_id, _, _ in variables])
+        if rows is None:
+            rows = latest_rows(station_ids)
+
+        keys = [int(station_id) for station_id in station_ids] if station_ids else [None]
+        latest = {key: {code: None for _, code, _ in variables} for key in keys}
+        catalog = {variable_id: (code, unit) for variable_id, code, unit in variables}
+
+        for row in rows:
+            if row["variable_id"] not in catalog:
+                continue
+            code, unit = catalog[row["variable_id"]]
+            key = row["sensor__station_id"] if station_ids else None
+            latest[key][code] = {
+                "value": row["value"],
+                "unit": unit,
+                "last_updated": row["measure_date"],
+            }
+        return latest
 
-        self.add_header("Reporte de Tendencias", f"{scope_name} | {subtitle}")
+    @staticmethod
+    def recent_series(sensor_id: int, variable_id: int, hours: float = 24, last: int = 0) -> dict:
+        """
+        Resumen de las últimas horas de una serie (sensor activo, variable) y
+        sus últimas lecturas, para indicadores y mini-gráficas.
+        Se lee de los anillos en memoria (ver recent_series.py) cuando están
+        habilitados y cubren la ventana; en otro caso, de la base de datos.
 
-        if variable_code:
-            variables = VariableCatalog.objects.filter(code=variable_code)
+        Args:
+            hours (float): Largo de la ventana hasta ahora.
+            last (int): Cantidad de lecturas más recientes a retornar.
+        Returns:
+            dict: {"count", "mean", "max"} de la ventana (None sin lecturas) y
+                "data": [{"measure_date", "value"}] con las últimas `last` lecturas.
+        """
+        start = timezone.now() - timedelta(hours=hours)
+
+        window = tail = None
+        series = get_recent_series()
+        if series is not None:
+            window = series.window(sensor_id, variable_id, start)
+            tail = series.last(sensor_id, variable_id, last) if last else ([], [])
+
+        if window is not None:
+            values = to_floats(window[1])
+            stats = {
+                "count": len(values),
+                "mean": float(values.mean()) if len(values) else None,
+                "max": float(values.max()) if len(values) else None,
+            }
         else:
-            variables = VariableCatalog.objects.all()
-
-        for var in variables:
-            plt.figure(figsize=(10, 4))
-
-            # Filtros base
-            filters = {"variable": var, "measure_date__range": [start_date, end_date]}
-
-            if station:
-                # Estación Específica -> Datos crudos
-                filters["sensor__station"] = station
-                data = Measurement.objects.filter(**filters).order_by("measure_date")
-
-                if not data.exists():
-                    plt.close()
-                    continue
-
-                dates = [m.measure_date for m in data]
-                values = [m.value for m in data]
-                label_legend = f"{var.name} ({station.station_name})"
-
-            else:
-                # Todas las estaciones -> Agregar por promedio
-                # Es necesario agrupar por fecha para que la gráfica tenga sentido
-                data = (
-                    Measurement.objects.filter(**filters)
-                    .values("measure_date")
-                    .annotate(avg_value=Avg("value"))
-                    .order_by("measure_date")
-                )
-
-                if not data.exists():
-                    plt.close()
-                    continue
-
-                dates = [x["measure_date"] for x in data]
-                values = [x["avg_value"] for x in data]
-                label_legend = f"{var.name} (Promedio Global)"
-
-            # Generación de la gráfica con Matplotlib
-            plt.plot(dates, values, label=label_legend, color="#4339F2", linewidth=2)
-
-            # Línea de límite normativo
-            plt.axhline(
-                y=var.max_expected_value,
-                color="r",
-                linestyle="--",
-                label=f"Límite ({var.max_expected_value})",
-            )
-
-            plt.title(f"Comportamiento de {var.name}")
-            plt.ylabel(f"{var.unit}")
-            plt.legend()
-            plt.grid(True, linestyle="--", alpha=0.6)
-            plt.xticks(rotation=45, fontsize=8)
-            plt.tight_layout()
-
-            # Guardar imagen en memoria
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format="png", dpi=100)
-            plt.close()
-            img_buffer.seek(0)
-
-            # Insertar en PDF
-            self.elements.append(
-                Paragraph(f"Variable: {var.name} ({var.code})", self.styles["Heading3"])
-            )
-            self.elements.append(ImageRL(img_buffer, width=500, height=220))
-            self.elements.append(Spacer(1, 15))
-
-        if len(self.elements) <= 5:
-            self.elements.append(
-                Paragraph(
-                    "No se encontraron datos para el rango seleccionado.",
-                    self.styles["Normal"],
-                )
-            )
+            stats = Measurement.objects.filter(
+                sensor_id=sensor_id,
+                sensor__status=Sensor.Status.ACTIVE,
+                variable_id=variable_id,
+                measure_date__gte=start,
+            ).aggregate(count=Count("value"), mean=Avg("value"), max=Max("value"))
+
+        if tail is not None:
+            points = zip(to_datetimes(tail[0]), to_floats(tail[1]).tolist())
+        else:
+            rows = Measurement.objects.filter(
+                sensor_id=sensor_id,
+                sensor__status=Sensor.Status.ACTIVE,
+                variable_id=variable_id,
+            ).order_by("-measure_date").values_list("measure_date", "value")[:last]
+            points = reversed(rows)
 
-        self.doc.build(self.elements)
+        stats["data"] = [{"measure_date": date, "value": value} for date, value in points]
+        return stats
 
-    def generate_alerts_report(self, station, start_date, end_date):
+    @staticmethod
+    def _check_reading(sensor, variable, value) -> str:
         """
-        Genera un reporte de incidentes críticos basado en las últimas 24 horas.
-        Identifica mediciones que superaron el valor máximo esperado (`max_expected_value`)
-        configurado en el catálogo de variables.
-
-        Args:
-            station_id (int, optional): ID de la estación para filtrar. Si es None, busca en todas.
+        Reglas de negocio comunes a la ingesta individual y por lotes.
+        Returns:
+            str: Mensaje de error si la lectura no es válida, None en caso contrario.
         """
-        scope_name = station.station_name if station else "Red de Monitoreo de Cali"
-        self.add_header(
-            f"Reporte de Alertas Críticas - {scope_name}",
-            f"Periodo: {start_date} al {end_date}",
-        )
-
-        # Filtros
-        filters = {"measure_date__date__range": [start_date, end_date]}
-        if station:
-            filters["sensor__station"] = station
+        # Sensor Activo
+        if sensor.status != Sensor.Status.ACTIVE:
+            return f"El sensor {sensor.serial_number} no está activo (Estado: {sensor.status})."
 
-        # Consultar datos
-        queryset = Measurement.objects.filter(**filters).select_related(
-            "variable", "sensor__station"
-        )
+        if value < 0:
+            return f"El valor no puede ser negativo para {variable.code}."
 
-        alerts_detected = []
-
-        # Procesar para encontrar valores fuera de rango ( > max o < min )
-        # Procesar para encontrar valores fuera de rango
-        for m in queryset:
-            is_critical = False
-            limit_ref = 0
-
-            # Definir el límite superior dinámicamente
-            upper_limit = m.variable.max_expected_value
-            if m.variable.code == "AQI":
-                upper_limit = 100.0
-
-            # Verificación Límite Superior
-            if m.value > upper_limit:
-                is_critical = True
-                limit_ref = upper_limit
-            # Verificación Límite Inferior
-            elif m.value < m.variable.min_expected_value:
-                is_critical = True
-                limit_ref = m.variable.min_expected_value
-
-            if is_critical:
-                alerts_detected.append(
-                    [
-                        m.measure_date.strftime("%Y-%m-%d %H:%M"),
-                        m.sensor.station.station_name,
-                        m.variable.code,
-                        f"{m.value:.2f} {m.variable.unit}",
-                        f"{limit_ref:.2f}",
-                    ]
-                )
-        # Renderizar Tabla
-        if not alerts_detected:
-            self.elements.append(
-                Paragraph(
-                    "No se han detectado alertas críticas en el periodo seleccionado.",
-                    self.styles["Normal"],
-                )
-            )
-        else:
-            self.elements.append(
-                Paragraph(
-                    f"Se encontraron {len(alerts_detected)} eventos fuera de norma:",
-                    self.styles["Normal"],
-                )
-            )
-            self.elements.append(Spacer(1, 10))
-
-            # Ordenar por fecha
-            alerts_detected.sort(key=lambda x: x[0])
-
-            data = [
-                [
-                    "Fecha/Hora",
-                    "Estación",
-                    "Variable",
-                    "Valor Registrado",
-                    "Límite Permitido",
-                ]
-            ] + alerts_detected
-
-            table = Table(data, colWidths=[110, 150, 80, 100, 100], repeatRows=1)
-            table.setStyle(
-                TableStyle(
-                    [
-                        (
-                            "BACKGROUND",
-                            (0, 0),
-                            (-1, 0),
-                            colors.firebrick,
-                        ),  # Rojo Alerta
-                        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-                        (
-                            "ROWBACKGROUNDS",
-                            (0, 1),
-                            (-1, -1),
-                            [colors.whitesmoke, colors.white],
-                        ),
-                        (
-                            "TEXTCOLOR",
-                            (3, 1),
-                            (3, -1),
-                            colors.red,
-                        ),  # Texto del valor en rojo
-                    ]
-                )
-            )
-            self.elements.append(table)
+        if variable.code == "HUM" and value > 100:
+            return "La humedad no puede superar el 100%."
 
-        self.doc.build(self.elements)
+        return None
 
 
 class AQICalculatorService:
@@ -615,6 +318,9 @@ class AQICalculatorService:
     # Contaminantes soportados para cálculo de AQI
     SUPPORTED_POLLUTANTS = ["PM2.5", "PM10", "O3", "CO", "NO2", "SO2"]
 
+    # Último AQI en vivo por estación (None = red) del proceso: {station_id: (marca, instante, datos)}
+    _current_cache = {}
+
     @staticmethod
     def calculate_sub_index(pollutant_code: str, concentration: float) -> float:
         """
@@ -629,35 +335,27 @@ class AQICalculatorService:
         Raises:
             ValueError: Si el contaminante no está soportado
         """
-        if pollutant_code not in AQI_BREAKPOINTS:
-            raise ValueError(
-                f"Contaminante {pollutant_code} no soportado para cálculo de AQI"
-            )
-
-        if concentration < 0:
-            return 0
+        # Mismo cálculo que la versión vectorizada, para que ambas coincidan
+        return float(sub_indices(pollutant_code, [concentration])[0])
 
-        breakpoints = AQI_BREAKPOINTS[pollutant_code]
-
-        # Encontrar el breakpoint correcto
-        for c_low, c_high, i_low, i_high in breakpoints:
-            if c_low <= concentration <= c_high:
-                # Fórmula lineal EPA
-                sub_index = ((i_high - i_low) / (c_high - c_low)) * (
-                    concentration - c_low
-                ) + i_low
-                return round(sub_index, 2)
-
-        # Si excede el máximo, retornar el valor más alto
-        if concentration > breakpoints[-1][1]:
-            # Usar el último breakpoint para calcular una extrapolación
-            c_low, c_high, i_low, i_high = breakpoints[-1]
-            sub_index = ((i_high - i_low) / (c_high - c_low)) * (
-                concentration - c_low
-            ) + i_low
-            return round(sub_index, 2)
+    @staticmethod
+    def calculate_sub_index_array(pollutant_code: str, concentrations) -> np.ndarray:
+        """
+        Sub-índices de AQI para un arreglo de concentraciones de un contaminante
+        (ver aqi_arrays.sub_indices). Pensado para recálculos históricos.
+        Returns:
+            np.ndarray: Sub-índices; NaN donde la concentración es NaN.
+        """
+        return sub_indices(pollutant_code, concentrations)
 
-        return 0
+    @staticmethod
+    def get_aqi_category_array(aqi_values) -> list:
+        """
+        Categoría de AQI de cada valor de un arreglo.
+        Returns:
+            list: Diccionarios de categoría (level, color, description), en el mismo orden.
+        """
+        return [CATEGORIES[index] for index in category_indices(aqi_values)]
 
     @staticmethod
     def get_aqi_category(aqi_value: float) -> dict:
@@ -668,12 +366,9 @@ class AQICalculatorService:
         Returns:
             dict: Información de la categoría (level, color, description)
         """
-        for (low, high), category_info in AQI_CATEGORIES.items():
-            if low <= aqi_value <= high:
-                return category_info
-
-        # Si excede 500, retornar Hazardous
-        return AQI_CATEGORIES[(301, 500)]
+        # Misma regla que la versión vectorizada: un valor entre dos rangos
+        # (ej: 50.4) toma la categoría inferior y los mayores a 500 son Hazardous
+        return CATEGORIES[int(category_indices([aqi_value])[0])]
 
     @staticmethod
     def calculate_aqi_for_station(station_id: int = None, timestamp=None) -> dict:
@@ -681,6 +376,7 @@ class AQICalculatorService:
         Calcula el AQI actual.
         - Si se provee station_id: Calcula el AQI específico para esa estación.
         - Si station_id es None: Calcula el AQI promedio de la ciudad (basado en todos los sensores activos).
+        Los promedios de los seis contaminantes se obtienen con una sola consulta agrupada.
         """
         if timestamp is None:
             timestamp = timezone.now()
@@ -688,57 +384,87 @@ class AQICalculatorService:
         # Ventana de tiempo: últimas 24 horas para tener datos representativos
         time_window_start = timestamp - timedelta(hours=24)
 
-        sub_indices = {}
-
-        # Calcular sub-índice para cada contaminante
-        for pollutant_code in AQICalculatorService.SUPPORTED_POLLUTANTS:
-            try:
-                # Obtener la variable del catálogo
-                variable = VariableCatalog.objects.get(code=pollutant_code)
-
-                # Construcción dinámica del QuerySet
-                filters = {
-                    "variable": variable,
-                    "measure_date__gte": time_window_start,
-                    "measure_date__lte": timestamp,
-                    "sensor__status": Sensor.Status.ACTIVE,  # IMPORTANTE: Solo datos confiables
-                }
-
-                # Si pidieron una estación específica, filtramos por ella.
-                # Si es None, el filtro no se aplica y trae datos de toda la red (Cali).
-                if station_id:
-                    filters["sensor__station_id"] = station_id
-
-                measurements = Measurement.objects.filter(**filters)
-
-                if measurements.exists():
-                    # Calculamos el promedio de concentración.
-                    # Al ser un AQI "Live" o consolidado, el promedio es la medida estadística
-                    # más segura para representar el estado actual de una zona o estación.
-                    avg_concentration = measurements.aggregate(Avg("value"))[
-                        "value__avg"
-                    ]
-
-                    if avg_concentration is not None:
-                        # Calcular sub-índice usando la fórmula EPA
-                        sub_index = AQICalculatorService.calculate_sub_index(
-                            pollutant_code, avg_concentration
-                        )
-                        sub_indices[pollutant_code] = sub_index
-
-            except VariableCatalog.DoesNotExist:
-                continue
+        # Calculamos el promedio de concentración (solo sensores activos: datos confiables).
+        # Al ser un AQI "Live" o consolidado, el promedio es la medida estadística
+        # más segura para representar el estado actual de una zona o estación.
+        # Si station_id es None, se promedian los datos de toda la red (Cali).
+        # Las horas completas de la ventana se leen de los agregados horarios.
+        averages = window_averages(
+            AQICalculatorService.SUPPORTED_POLLUTANTS,
+            time_window_start,
+            timestamp,
+            station_ids=[station_id] if station_id else None,
+        )
+        aqi_data = AQICalculatorService._build_aqi(
+            {code: avg for (_, code), avg in averages.items()}, timestamp, station_id
+        )
 
         # Si después de revisar todos los contaminantes no hay datos:
-        if not sub_indices:
-            scope_msg = (
-                f"la estación {station_id}" if station_id else "la red de monitoreo"
-            )
+        if aqi_data is None:
             # Podemos lanzar error o devolver un objeto vacío.
             # Lanzar error permite al frontend mostrar "Sin datos" o un estado de carga.
-            raise ValueError(
-                f"No hay datos suficientes recientes (últimas 24h) para calcular AQI en {scope_msg}"
+            raise AQICalculatorService._no_data_error(station_id, "últimas 24h")
+
+        return aqi_data
+
+    @staticmethod
+    def calculate_aqi_for_stations(station_ids: list = None, timestamp=None) -> dict:
+        """
+        AQI actual de varias estaciones con una sola consulta agrupada por
+        estación y contaminante.
+        Args:
+            station_ids (list, optional): IDs de estación; None para todas las
+                estaciones con mediciones en la ventana.
+        Returns:
+            dict: {station_id: datos de AQI (igual que calculate_aqi_for_station) | None};
+                None si la estación no tiene datos en las últimas 24 horas.
+        """
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        averages = window_averages(
+            AQICalculatorService.SUPPORTED_POLLUTANTS,
+            timestamp - timedelta(hours=24),
+            timestamp,
+            station_ids=station_ids,
+            per_station=True,
+        )
+
+        concentrations = {int(station_id): {} for station_id in station_ids or []}
+        for (station_id, code), avg in averages.items():
+            if station_id is not None:
+                concentrations.setdefault(station_id, {})[code] = avg
+
+        return {
+            station_id: AQICalculatorService._build_aqi(values, timestamp, station_id)
+            for station_id, values in concentrations.items()
+        }
+
+    @staticmethod
+    def _no_data_error(station_id, window: str) -> ValueError:
+        scope_msg = f"la estación {station_id}" if station_id else "la red de monitoreo"
+        return ValueError(
+            f"No hay datos suficientes recientes ({window}) para calcular AQI en {scope_msg}"
+        )
+
+    @staticmethod
+    def _build_aqi(concentrations: dict, timestamp, station_id=None):
+        """
+        Aplica la lógica de sub-índices a los promedios por contaminante.
+        Returns:
+            dict | None: Datos de AQI, o None si no hay ningún contaminante con datos.
+        """
+        # Calcular sub-índice para cada contaminante usando la fórmula EPA
+        sub_indices = {
+            pollutant_code: AQICalculatorService.calculate_sub_index(
+                pollutant_code, concentrations[pollutant_code]
             )
+            for pollutant_code in AQICalculatorService.SUPPORTED_POLLUTANTS
+            if concentrations.get(pollutant_code) is not None
+        }
+
+        if not sub_indices:
+            return None
 
         # El AQI final es el MÁXIMO de todos los sub-índices (el contaminante crítico)
         aqi_value = max(sub_indices.values())
@@ -759,6 +485,92 @@ class AQICalculatorService:
             "station_id": station_id,
         }
 
+    @staticmethod
+    def current_aqi(station_id: int = None) -> dict:
+        """
+        AQI en vivo de una estación o de la red.
+
+        Con settings.AQI_STATE habilitado se calcula sin consultar la base de
+        datos desde el estado incremental en memoria (ver aqi_state.py), con el
+        periodo de promedio EPA de cada contaminante: NowCast para PM2.5 y
+        PM10, 8 horas para O3 y CO, 1 hora para NO2 y SO2.
+
+        En otro caso se usa el promedio de 24 horas de calculate_aqi_for_station,
+        reutilizando el último cálculo mientras no llegue una medición nueva
+        (marca de agua de la tabla compartida de últimos valores) y no pase
+        LATEST_MATRIX['AQI_TTL_SECONDS']; el TTL acota el desplazamiento de la ventana.
+        Raises:
+            ValueError: Si no hay datos recientes.
+        """
+        state = get_aqi_state()
+        if state is not None:
+            timestamp = timezone.now()
+            concentrations = state.concentrations(station_id, timestamp)
+            if concentrations is not None:
+                aqi_data = AQICalculatorService._build_aqi(concentrations, timestamp, station_id)
+                if aqi_data is None:
+                    raise AQICalculatorService._no_data_error(station_id, "periodos EPA")
+                return aqi_data
+
+        watermark = None
+        matrix = get_latest_matrix()
+        if matrix is not None:
+            matrix.ensure_warm()
+            watermark = matrix.watermark(station_id)
+
+        cached = AQICalculatorService._current_cache.get(station_id)
+        if (
+            watermark is not None
+            and cached is not None
+            and cached[0] == watermark
+            and monotonic() - cached[1] < settings.LATEST_MATRIX["AQI_TTL_SECONDS"]
+        ):
+            return dict(cached[2])
+
+        aqi_data = AQICalculatorService.calculate_aqi_for_station(station_id=station_id)
+        if watermark is not None:
+            AQICalculatorService._current_cache[station_id] = (
+                watermark, monotonic(), aqi_data
+            )
+        return dict(aqi_data)
+
+    @staticmethod
+    def current_aqi_for_stations(station_ids: list, timestamp=None) -> dict:
+        """
+        AQI en vivo de varias estaciones, con el mismo criterio de current_aqi
+        para que el mapa y el detalle de una estación coincidan.
+
+        Con settings.AQI_STATE habilitado cada estación se calcula desde el
+        estado incremental en memoria (periodos de promedio EPA). Las que el
+        estado no cubre (estado frío o fuera de su capacidad) se calculan con
+        el promedio de 24 horas de calculate_aqi_for_stations, en una sola
+        consulta agrupada.
+        Returns:
+            dict: {station_id: datos de AQI | None}; None si la estación no
+                tiene datos suficientes.
+        """
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        results = {}
+        pending = [int(station_id) for station_id in station_ids]
+        state = get_aqi_state()
+        if state is not None:
+            cold = []
+            for station_id in pending:
+                concentrations = state.concentrations(station_id, timestamp)
+                if concentrations is None:
+                    cold.append(station_id)
+                else:
+                    results[station_id] = AQICalculatorService._build_aqi(
+                        concentrations, timestamp, station_id
+                    )
+            pending = cold
+
+        if pending:
+            results.update(AQICalculatorService.calculate_aqi_for_stations(pending, timestamp))
+        return results
+
     @staticmethod
     def calculate_aqi_historical(
         station_id: int, start_date, end_date, interval_hours=1
@@ -773,7 +585,9 @@ class AQICalculatorService:
             end_date: Fecha de fin
             interval_hours: Intervalo en horas entre cálculos (default: 1)
         Returns:
-            int: Cantidad de registros de AQI creados
+            int: Cantidad de registros de AQI creados o actualizados.
+                La carga es idempotente: re-ejecutar un rango sobrescribe los
+                valores existentes en lugar de duplicarlos.
         """
         # Obtener o crear la variable AQI en el catálogo
         aqi_variable, created = VariableCatalog.objects.get_or_create(
@@ -795,47 +609,33 @@ class AQICalculatorService:
         if not sensor:
             raise ValueError(f"No hay sensores activos en la estación {station_id}")
 
-        current_time = start_date
-        aqi_records = []
-        created_count = 0
-
-        while current_time <= end_date:
-            try:
-                # Calcular AQI para este timestamp
-                aqi_data = AQICalculatorService.calculate_aqi_for_station(
-                    station_id, current_time
-                )
+        # Promedios móviles de 24 h de todo el rango en una sola pasada (ver aqi_backfill.py)
+        grid = aqi_grid(start_date, end_date, interval_hours)
+        if not grid:
+            return 0
+        aqi_values = historical_aqi(
+            station_id, AQICalculatorService.SUPPORTED_POLLUTANTS, grid
+        )
 
-                # Verificar si ya existe una medición de AQI en este timestamp
-                existing = Measurement.objects.filter(
-                    sensor=sensor, variable=aqi_variable, measure_date=current_time
-                ).exists()
-
-                if not existing:
-                    # Crear registro de medición
-                    aqi_records.append(
-                        Measurement(
-                            sensor=sensor,
-                            variable=aqi_variable,
-                            value=aqi_data["aqi"],
-                            measure_date=current_time,
-                        )
-                    )
-                    created_count += 1
+        # Los instantes sin datos suficientes se omiten, igual que en el cálculo en vivo.
+        # Los duplicados se resuelven en la carga (ON CONFLICT sobre la llave natural)
+        aqi_records = (
+            (sensor.sensor_id, aqi_variable.variable_id, round(aqi, 2), current_time)
+            for current_time, aqi in zip(grid, aqi_values.tolist())
+            if not np.isnan(aqi)
+        )
 
-                # Hacer bulk insert cada 500 registros
-                if len(aqi_records) >= 500:
-                    Measurement.objects.bulk_create(aqi_records, ignore_conflicts=True)
-                    aqi_records = []
+        # Carga masiva (COPY)
+        created_count = copy_measurements(aqi_records, on_conflict=ON_CONFLICT_UPDATE)
 
-            except ValueError:
-                # Si no hay datos suficientes para este timestamp, continuar
-                pass
+        return created_count
 
-            current_time += timedelta(hours=interval_hours)
 
-        # Insertar registros restantes
-        if aqi_records:
-            Measurement.objects.bulk_create(aqi_records, ignore_conflicts=True)
+def __getattr__(name):
+    # Compatibilidad: el generador de PDF (pandas, matplotlib, reportlab) vive en
+    # reports.py y solo se importa cuando se pide, no al cargar este módulo
+    if name == "PDFReportGenerator":
+        from .reports import PDFReportGenerator
 
-        return created_count
+        return PDFReportGenerator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,168 @@
+import fcntl
+import mmap
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+import numpy as np
+
+# Encabezado del archivo (int64)
+_MAGIC = 0x31584D4C41534952  # "RISALMX1"
+_H_MAGIC, _H_LAYOUT, _H_WARM, _H_VERSION, _H_LOADED_AT = range(5)
+_HEADER_SLOTS = 8
+
+# Intentos de lectura antes de desistir si un escritor está actualizando la fila
+READ_RETRIES = 100
+
+
+class SharedArrayFile:
+    """
+    Arreglos NumPy sobre un archivo mapeado en memoria (mmap), compartidos por
+    todos los procesos del servidor.
+
+    Cada subclase declara sus arreglos en `layout()`; el primero debe ser el
+    contador de secuencia por fila (seqlock). El escritor deja el contador
+    impar mientras modifica la fila y par al terminar, y el lector repite la
+    copia si el contador cambió, de modo que las lecturas no toman ningún
+    bloqueo. Los escritores se serializan con flock sobre el archivo.
+
+    El encabezado guarda si el contenido ya se cargó desde la base de datos
+    (is_warm) y un contador de versión de uso libre para la subclase.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        layout = self.layout()
+        signature = zlib.crc32(repr(layout).encode("utf-8"))
+
+        header_bytes = _HEADER_SLOTS * 8
+        sizes = [int(np.prod(shape)) * np.dtype(dtype).itemsize for _, dtype, shape in layout]
+        size = header_bytes + sum(sizes)
+
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o660)
+        with self.locked():
+            header = np.frombuffer(
+                os.pread(self._fd, header_bytes, 0).ljust(header_bytes, b"\0"), dtype=np.int64
+            )
+            fresh = (
+                os.fstat(self._fd).st_size != size
+                or header[_H_MAGIC] != _MAGIC
+                or header[_H_LAYOUT] != signature
+            )
+            if fresh:
+                # Archivo nuevo o con otra estructura: se reinicia en frío
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+
+            self._mmap = mmap.mmap(self._fd, size)
+            self._header = np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=self._mmap)
+            offset = header_bytes
+            for (name, dtype, shape), nbytes in zip(layout, sizes):
+                array = np.ndarray(shape, dtype=dtype, buffer=self._mmap, offset=offset)
+                setattr(self, f"_{name}", array)
+                offset += nbytes
+            self._seq = getattr(self, f"_{layout[0][0]}")
+
+            if fresh:
+                self._header[_H_MAGIC] = _MAGIC
+                self._header[_H_LAYOUT] = signature
+
+    def layout(self) -> list:
+        """
+        Returns:
+            list: Tuplas (nombre, dtype, forma); el arreglo queda en self._<nombre>.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def locked(self):
+        # flock excluye a otros procesos; el lock de hilo, a otros hilos del mismo proceso
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def writing(self, slots):
+        """
+        Modifica las filas indicadas dentro del seqlock (requiere `locked`).
+        """
+        for slot in slots:
+            self._seq[slot] += 1
+        try:
+            yield
+        finally:
+            for slot in slots:
+                self._seq[slot] += 1
+
+    def snapshot(self, slot, *arrays):
+        """
+        Copia consistente de la fila `slot` de cada arreglo, sin bloqueos.
+        Returns:
+            tuple | None: Copias de las filas, o None si un escritor no terminó a tiempo.
+        """
+        for _ in range(READ_RETRIES):
+            before = int(self._seq[slot])
+            if before % 2:
+                continue
+            rows = tuple(array[slot].copy() for array in arrays)
+            if int(self._seq[slot]) == before:
+                return rows
+        return None
+
+    @property
+    def is_warm(self) -> bool:
+        """False hasta que el contenido se carga desde la base de datos (arranque en frío)."""
+        return bool(self._header[_H_WARM])
+
+    @property
+    def loaded_at(self) -> int:
+        """Instante (epoch, segundos) de la última carga desde la base de datos."""
+        return int(self._header[_H_LOADED_AT])
+
+    def mark_warm(self, loaded_at: int = 0) -> None:
+        self._header[_H_LOADED_AT] = loaded_at
+        self._header[_H_WARM] = 1
+
+    def invalidate(self) -> None:
+        """Marca el contenido como frío; la siguiente lectura lo recarga desde la base de datos."""
+        with self.locked():
+            self._header[_H_WARM] = 0
+
+    @property
+    def version(self) -> int:
+        return int(self._header[_H_VERSION])
+
+    def bump_version(self) -> None:
+        with self.locked():
+            self._next_version()
+
+    def _next_version(self) -> None:
+        # Requiere `locked`
+        self._header[_H_VERSION] += 1
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+
+def per_process(factory):
+    """
+    Envuelve la construcción de un SharedArrayFile para tener una instancia por
+    proceso: se reabre después de un fork (cada worker mapea el archivo).
+    """
+    state = {"instance": None, "pid": None}
+    lock = threading.Lock()
+
+    def get():
+        if state["instance"] is None or state["pid"] != os.getpid():
+            with lock:
+                if state["instance"] is None or state["pid"] != os.getpid():
+                    state["instance"] = factory()
+                    state["pid"] = os.getpid()
+        return state["instance"]
+
+    return get
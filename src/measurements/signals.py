@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from src.sensors.models import Sensor
+from src.measurements.aqi_state import current_state
+from src.measurements.latest_matrix import get_latest_matrix
+from src.measurements.live_state import invalidate_live_state
+from src.measurements.models import VariableCatalog
+
+
+# Measurement no tiene receptores a propósito: un receptor de post_delete obliga a
+# Django a cargar cada fila en los borrados masivos (seed_history, retención).
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def reload_live_state(sender, instance, **kwargs):
+    """
+    Cambio de estado o reasignación de un sensor: los últimos valores y el AQI
+    en memoria pueden dejar de ser válidos y se recargan.
+    """
+    invalidate_live_state()
+
+
+@receiver(post_save, sender=VariableCatalog)
+@receiver(post_delete, sender=VariableCatalog)
+def refresh_variable_catalog(sender, instance, **kwargs):
+    """
+    Nueva versión del catálogo: cada proceso vuelve a leerlo en su próxima consulta.
+    """
+    matrix = get_latest_matrix()
+    if matrix is not None:
+        matrix.bump_catalog()
+    # El estado del AQI agrupa por código de contaminante
+    state = current_state()
+    if state is not None:
+        state.invalidate()
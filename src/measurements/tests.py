@@ -1,12 +1,57 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+from zoneinfo import ZoneInfo
+import numpy as np
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase, force_authenticate
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from common.validation import OperativeStatus
 from src.measurements.services import MeasurementService
-from src.measurements.models import VariableCatalog, Measurement
+from src.measurements.models import VariableCatalog, Measurement, MeasurementRollup, ReportJob
 from src.sensors.models import Sensor
 from src.stations.models import MonitoringStation 
 from src.institutions.models import EnvironmentalInstitution
+from src.users.models import User
 from src.measurements.services import AQICalculatorService
+from src.measurements.reports import PDFReportGenerator
+from src.measurements import history
+from src.measurements.partitions import add_months, month_start, partition_name
+from src.measurements.rollups import whole_hour_offsets
+from src.measurements.aqi_arrays import CATEGORIES, category_indices, sub_indices
+from src.measurements import aqi_backfill
+from src.measurements.aqi_backfill import aqi_grid, historical_aqi
+from src.measurements.aqi_state import AQIState, nowcast, period_mean
+from src.measurements.latest_matrix import LatestMatrix
+from src.measurements.recent_series import RecentSeries, to_floats
+from src.measurements.report_cache import ReportCache, is_closed, params_digest
+from src.measurements.report_jobs import build_report, process_job, report_filename
+from src.measurements.serializers import ReportJobSerializer
+from src.measurements.views import TrendsReportView
+from src.measurements.utils import cali_profile
+from src.measurements.downsampling import METHOD_LTTB, METHOD_MINMAX, downsample
+from src.measurements.exports import (
+    EXPORT_COLUMNS,
+    FORMAT_PARQUET,
+    columnar_stream,
+    csv_stream,
+    gzip_stream,
+    ndjson_stream,
+)
+from src.measurements.write_buffer import MeasurementWriteBuffer, WriteBufferFullError
 
 class MeasurementServiceTestCase(TestCase):
     def setUp(self):
@@ -110,4 +155,1112 @@ class AQICalculatorTestCase(TestCase):
             # AQI 160 -> Rojo (Unhealthy)
             cat_bad = AQICalculatorService.get_aqi_category(160)
             self.assertEqual(cat_bad['level'], 'Unhealthy')
-            self.assertEqual(cat_bad['color'], '#FF0000')
\ No newline at end of file
+            self.assertEqual(cat_bad['color'], '#FF0000')
+
+    def test_build_aqi_from_grouped_averages(self):
+        """
+        Los promedios de la consulta agrupada alimentan la lógica de sub-índices:
+        el AQI es el del contaminante dominante y sin datos no hay resultado
+        """
+        timestamp = timezone.now()
+        aqi = AQICalculatorService._build_aqi({'PM2.5': 12.0, 'PM10': 155.0}, timestamp, 7)
+
+        self.assertEqual(aqi['dominant_pollutant'], 'PM10')
+        self.assertEqual(aqi['aqi'], aqi['sub_indices']['PM10'])
+        self.assertEqual(aqi['station_id'], 7)
+        self.assertIsNone(AQICalculatorService._build_aqi({}, timestamp))
+
+class MeasurementBatchIngestionTestCase(TestCase):
+    def setUp(self):
+        self.inst = EnvironmentalInstitution.objects.create(institute_name="Batch Inst", physic_address="x")
+        self.station = MonitoringStation.objects.create(
+            station_name="EstBatch",
+            institution=self.inst,
+            location=Point(-76.5, 3.4, srid=4326)
+        )
+        self.sensor = Sensor.objects.create(
+            serial_number="SN-BATCH",
+            model="X1",
+            manufacturer="Acme",
+            installation_date="2023-01-01",
+            status=Sensor.Status.ACTIVE,
+            station=self.station
+        )
+        self.inactive_sensor = Sensor.objects.create(
+            serial_number="SN-OFF",
+            model="X1",
+            manufacturer="Acme",
+            installation_date="2023-01-01",
+            status=Sensor.Status.INACTIVE,
+            station=self.station
+        )
+        self.humidity = VariableCatalog.objects.create(
+            name="Humedad", code="HUM", unit="%",
+            min_expected_value=0, max_expected_value=100
+        )
+
+    def test_bulk_returns_per_row_results(self):
+        """
+        Las filas válidas se guardan y las inválidas se reportan en su posición
+        """
+        now = timezone.now()
+        rows = [
+            {'sensor': self.sensor.pk, 'variable': self.humidity.pk, 'value': 55.0, 'measure_date': now},
+            {'sensor': self.inactive_sensor.pk, 'variable': self.humidity.pk, 'value': 55.0, 'measure_date': now},
+            {'sensor': self.sensor.pk, 'variable': self.humidity.pk, 'value': 120.0, 'measure_date': now},
+            {'sensor': self.sensor.pk, 'variable': self.humidity.pk, 'value': -1.0, 'measure_date': now},
+        ]
+        results = MeasurementService.create_measurements_bulk(rows)
+
+        self.assertEqual([r['status'] for r in results], ['created', 'rejected', 'rejected', 'rejected'])
+        self.assertTrue(Measurement.objects.filter(pk=results[0]['measurement_id']).exists())
+        self.assertEqual(Measurement.objects.count(), 1)
+
+
+    def test_retry_is_idempotent(self):
+        """
+        Reenviar la misma lectura (sensor, variable, fecha) no duplica el registro
+        """
+        now = timezone.now()
+        row = {'sensor': self.sensor.pk, 'variable': self.humidity.pk, 'value': 40.0, 'measure_date': now}
+        first = MeasurementService.create_measurements_bulk([row])
+        second = MeasurementService.create_measurements_bulk([dict(row, value=41.0)])
+
+        self.assertEqual(first[0]['measurement_id'], second[0]['measurement_id'])
+        self.assertEqual(Measurement.objects.count(), 1)
+        self.assertEqual(Measurement.objects.get().value, 41.0)
+
+    def test_rollups_follow_ingestion(self):
+        """
+        Los agregados por hora y día se recalculan con cada ingesta, incluso si un reintento cambia el valor
+        """
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+        rows = [
+            {'sensor': self.sensor.pk, 'variable': self.humidity.pk, 'value': value, 'measure_date': hour + timedelta(minutes=minute)}
+            for minute, value in ((0, 40.0), (20, 50.0), (40, 60.0))
+        ]
+        MeasurementService.create_measurements_bulk(rows)
+        MeasurementService.create_measurements_bulk([dict(rows[0], value=70.0)])
+
+        hourly = MeasurementRollup.objects.get(granularity=MeasurementRollup.Granularity.HOUR, bucket_start=hour)
+        self.assertEqual((hourly.count, hourly.sum, hourly.min, hourly.max), (3, 180.0, 50.0, 70.0))
+        self.assertEqual(hourly.last_value, 60.0)
+        self.assertEqual(hourly.station_id, self.station.pk)
+        daily = MeasurementRollup.objects.get(granularity=MeasurementRollup.Granularity.DAY)
+        self.assertEqual((daily.count, daily.sum), (3, 180.0))
+
+    def test_latest_by_variable_interleaved_sensors(self):
+        """
+        La última medición por variable y estación se elige entre todos los
+        sensores activos aunque sus lecturas se intercalen, en una consulta (más el catálogo)
+        """
+        station_2 = MonitoringStation.objects.create(
+            station_name="EstBatch2", institution=self.inst, location=Point(-76.5, 3.4, srid=4326)
+        )
+        sensor_b = Sensor.objects.create(
+            serial_number="SN-BATCH-B", model="X1", manufacturer="Acme",
+            installation_date="2023-01-01", status=Sensor.Status.ACTIVE, station=self.station
+        )
+        sensor_c = Sensor.objects.create(
+            serial_number="SN-BATCH-C", model="X1", manufacturer="Acme",
+            installation_date="2023-01-01", status=Sensor.Status.ACTIVE, station=station_2
+        )
+        temperature = VariableCatalog.objects.create(name="Temperatura", code="TEMP", unit="C")
+        VariableCatalog.objects.create(name="Presión", code="PRES", unit="hPa")
+
+        now = timezone.now()
+        readings = [
+            # (sensor, variable, valor, minutos atrás)
+            (self.sensor, temperature, 20.0, 50),
+            (sensor_b, temperature, 21.0, 40),
+            (self.sensor, temperature, 22.0, 30),
+            (sensor_c, temperature, 23.0, 35),
+            (sensor_b, temperature, 24.0, 45),
+            (self.inactive_sensor, temperature, 99.0, 1),
+            (sensor_b, self.humidity, 60.0, 10),
+            (sensor_c, self.humidity, 61.0, 20),
+            (self.sensor, self.humidity, 62.0, 15),
+        ]
+        for sensor, variable, value, minutes in readings:
+            Measurement.objects.create(
+                sensor=sensor, variable=variable, value=value, measure_date=now - timedelta(minutes=minutes)
+            )
+
+        # Se prueba la consulta SQL (latest_rows), no la tabla compartida en memoria
+        with self.settings(LATEST_MATRIX=dict(settings.LATEST_MATRIX, ENABLED=False)):
+            with self.assertNumQueries(2):
+                latest = MeasurementService.latest_by_variable([self.station.pk, station_2.pk])
+            city = MeasurementService.latest_by_variable()[None]
+
+        values = {
+            station_id: {code: data and data["value"] for code, data in codes.items()}
+            for station_id, codes in latest.items()
+        }
+        self.assertEqual(values[self.station.pk], {"TEMP": 22.0, "HUM": 60.0, "PRES": None})
+        self.assertEqual(values[station_2.pk], {"TEMP": 23.0, "HUM": 61.0, "PRES": None})
+        self.assertEqual(city["TEMP"]["value"], 22.0)
+        self.assertEqual(city["TEMP"]["last_updated"], now - timedelta(minutes=30))
+        self.assertEqual(city["HUM"]["value"], 60.0)
+        self.assertIsNone(city["PRES"])
+
+
+class StationsAQIViewTestCase(APITestCase):
+    def setUp(self):
+        cali = EnvironmentalInstitution.objects.create(institute_name="Cali Inst", physic_address="x")
+        bogota = EnvironmentalInstitution.objects.create(institute_name="Bogota Inst", physic_address="y")
+        self.with_data = MonitoringStation.objects.create(
+            station_name="Norte", institution=cali, operative_status=OperativeStatus.ACTIVE,
+            location=Point(-76.53, 3.45, srid=4326)
+        )
+        self.without_data = MonitoringStation.objects.create(
+            station_name="Sur", institution=cali, operative_status=OperativeStatus.ACTIVE,
+            location=Point(-76.50, 3.40, srid=4326)
+        )
+        self.outside = MonitoringStation.objects.create(
+            station_name="Bogota", institution=bogota, operative_status=OperativeStatus.ACTIVE,
+            location=Point(-74.08, 4.60, srid=4326)
+        )
+        # Pendiente: no aparece en el mapa aunque esté dentro del área
+        MonitoringStation.objects.create(
+            station_name="Pendiente", institution=cali, location=Point(-76.52, 3.44, srid=4326)
+        )
+        self.bogota_inst = bogota
+
+        sensor = Sensor.objects.create(
+            serial_number="SN-MAP", model="X1", manufacturer="Acme",
+            installation_date="2023-01-01", status=Sensor.Status.ACTIVE, station=self.with_data
+        )
+        pm25 = VariableCatalog.objects.create(name="PM 2.5", code="PM2.5", unit="µg/m³")
+        MeasurementService.bulk_insert([
+            Measurement(sensor=sensor, variable=pm25, value=12.0, measure_date=timezone.now() - timedelta(minutes=5))
+        ])
+
+        self.client.force_authenticate(user=User.objects.create_user(email="mapa@vrisa.com", password="password"))
+        # Se prueba la consulta agrupada, no el estado incremental en memoria
+        settings_override = self.settings(AQI_STATE=dict(settings.AQI_STATE, ENABLED=False))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def station_ids(self, response):
+        return [station["station_id"] for station in response.data["stations"]]
+
+    def test_active_stations_in_one_grouped_query(self):
+        """
+        Todas las estaciones activas se resuelven con la consulta de estaciones
+        y una consulta agrupada; las que no tienen datos se retornan con aqi null
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("aqi-stations"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.station_ids(response),
+            [self.with_data.pk, self.without_data.pk, self.outside.pk],
+        )
+        norte, sur, _ = response.data["stations"]
+        self.assertEqual((norte["aqi"], norte["category"], norte["dominant_pollutant"]), (50, "Good", "PM2.5"))
+        self.assertEqual((norte["latitude"], norte["longitude"]), (3.45, -76.53))
+        self.assertIsNone(sur["aqi"])
+        self.assertNotIn("category", sur)
+
+    def test_filters_by_bbox_and_institution(self):
+        """
+        bbox limita a las estaciones dentro del área e institution a las de esa institución
+        """
+        response = self.client.get(reverse("aqi-stations"), {"bbox": "-77,3,-76,4"})
+        self.assertEqual(self.station_ids(response), [self.with_data.pk, self.without_data.pk])
+
+        response = self.client.get(reverse("aqi-stations"), {"institution": self.bogota_inst.pk})
+        self.assertEqual(self.station_ids(response), [self.outside.pk])
+
+        response = self.client.get(
+            reverse("aqi-stations"), {"institution": self.bogota_inst.pk, "bbox": "-77,3,-76,4"}
+        )
+        self.assertEqual(response.data["stations"], [])
+
+    def test_invalid_filters_return_400(self):
+        """
+        Una institución no numérica o un bbox sin cuatro números responden 400
+        """
+        for params in ({"institution": "abc"}, {"bbox": "-77,3,-76"}, {"bbox": "a,b,c,d"}):
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse("aqi-stations"), params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class AQIBackfillTestCase(TestCase):
+    def setUp(self):
+        inst = EnvironmentalInstitution.objects.create(institute_name="Backfill Inst", physic_address="x")
+        self.station = MonitoringStation.objects.create(
+            station_name="EstBackfill", institution=inst, location=Point(-76.5, 3.4, srid=4326)
+        )
+        sensor = Sensor.objects.create(
+            serial_number="SN-BACKFILL", model="X1", manufacturer="Acme",
+            installation_date="2023-01-01", status=Sensor.Status.ACTIVE, station=self.station
+        )
+        inactive = Sensor.objects.create(
+            serial_number="SN-BACKFILL-OFF", model="X1", manufacturer="Acme",
+            installation_date="2023-01-01", status=Sensor.Status.INACTIVE, station=self.station
+        )
+        pm25 = VariableCatalog.objects.create(name="PM 2.5", code="PM2.5", unit="µg/m³")
+        co = VariableCatalog.objects.create(name="Monóxido de Carbono", code="CO", unit="ppm")
+
+        self.base = datetime(2025, 1, 10, tzinfo=dt_timezone.utc)
+        readings = [
+            # (sensor, variable, valor, instante)
+            (sensor, pm25, 30.5, self.base - timedelta(hours=25)),
+            # Exactamente en t - 24h del primer instante de la grilla alineada (inclusivo)
+            (sensor, pm25, 80.0, self.base - timedelta(hours=24)),
+            (sensor, pm25, 12.0, self.base - timedelta(hours=23, minutes=17)),
+            # Exactamente en t - 24h de un instante de la grilla no alineada
+            (sensor, pm25, 60.0, self.base - timedelta(hours=21, minutes=43)),
+            (sensor, pm25, 40.5, self.base - timedelta(hours=6, minutes=1)),
+            # Exactamente en un instante t de la grilla alineada (inclusivo)
+            (sensor, pm25, 150.5, self.base),
+            (sensor, pm25, 9.0, self.base + timedelta(hours=2, minutes=30)),
+            (sensor, pm25, 55.5, self.base + timedelta(hours=3)),
+            (sensor, pm25, 20.0, self.base + timedelta(hours=5, minutes=59, seconds=59)),
+            (sensor, co, 12.5, self.base + timedelta(hours=1)),
+            (sensor, co, 4.0, self.base + timedelta(hours=4, minutes=17)),
+            # Sensor inactivo: no cuenta en ningún cálculo
+            (inactive, pm25, 400.0, self.base + timedelta(hours=1)),
+        ]
+        MeasurementService.bulk_insert([
+            Measurement(sensor=sensor, variable=variable, value=value, measure_date=measure_date)
+            for sensor, variable, value, measure_date in readings
+        ])
+
+    def assert_matches_per_step(self, grid):
+        pollutants = AQICalculatorService.SUPPORTED_POLLUTANTS
+        backfill = historical_aqi(self.station.pk, pollutants, grid)
+
+        for t, value in zip(grid, backfill):
+            try:
+                expected = AQICalculatorService.calculate_aqi_for_station(self.station.pk, t)["aqi"]
+            except ValueError:
+                expected = None
+            actual = None if np.isnan(value) else round(float(value), 2)
+            self.assertEqual(actual, expected, t)
+
+    def test_aligned_grid_matches_per_step_aqi(self):
+        """
+        Con la grilla alineada a la hora (agregados horarios más las mediciones
+        exactas en t) el AQI coincide con calculate_aqi_for_station en cada instante
+        """
+        grid = aqi_grid(self.base - timedelta(hours=2), self.base + timedelta(hours=31))
+
+        with mock.patch(
+            "src.measurements.aqi_backfill._raw_window_totals", wraps=aqi_backfill._raw_window_totals
+        ) as raw:
+            self.assert_matches_per_step(grid)
+        raw.assert_not_called()
+
+    def test_unaligned_grid_matches_per_step_aqi(self):
+        """
+        Con instantes fuera de la hora exacta se leen las mediciones crudas y
+        el AQI coincide con calculate_aqi_for_station en cada instante
+        """
+        grid = aqi_grid(self.base - timedelta(hours=1, minutes=43), self.base + timedelta(hours=32), 2)
+
+        with mock.patch(
+            "src.measurements.aqi_backfill._rollup_window_totals", wraps=aqi_backfill._rollup_window_totals
+        ) as rollup:
+            self.assert_matches_per_step(grid)
+        rollup.assert_not_called()
+
+
+class ConcurrentRollupTestCase(TransactionTestCase):
+    def setUp(self):
+        inst = EnvironmentalInstitution.objects.create(institute_name="Rollup Inst", physic_address="x")
+        station = MonitoringStation.objects.create(
+            station_name="EstRollup", institution=inst, location=Point(-76.5, 3.4, srid=4326)
+        )
+        self.sensor = Sensor.objects.create(
+            serial_number="SN-ROLLUP",
+            model="X1",
+            manufacturer="Acme",
+            installation_date="2023-01-01",
+            status=Sensor.Status.ACTIVE,
+            station=station
+        )
+        self.variable = VariableCatalog.objects.create(
+            name="Humedad", code="HUM", unit="%", min_expected_value=0, max_expected_value=100
+        )
+
+    def test_concurrent_batches_into_same_bucket(self):
+        """
+        Dos ingestas concurrentes en la misma hora quedan ambas en los agregados
+        """
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+        first_written = threading.Event()
+
+        def ingest(minutes, value, hold=False):
+            try:
+                with transaction.atomic():
+                    MeasurementService.bulk_insert([
+                        Measurement(
+                            sensor_id=self.sensor.pk, variable_id=self.variable.pk,
+                            value=value, measure_date=hour + timedelta(minutes=minute),
+                        )
+                        for minute in minutes
+                    ])
+                    if hold:
+                        # La segunda ingesta recalcula antes de que esta confirme
+                        first_written.set()
+                        time.sleep(0.5)
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=ingest, args=((0, 1, 2), 10.0, True))
+        first.start()
+        first_written.wait()
+        second = threading.Thread(target=ingest, args=((30, 31), 20.0))
+        second.start()
+        first.join()
+        second.join()
+
+        for granularity in (MeasurementRollup.Granularity.HOUR, MeasurementRollup.Granularity.DAY):
+            rollup = MeasurementRollup.objects.get(granularity=granularity)
+            self.assertEqual((rollup.count, rollup.sum), (5, 70.0))
+
+
+class ReportCacheWatermarkTestCase(TestCase):
+    def setUp(self):
+        inst = EnvironmentalInstitution.objects.create(institute_name="Report Inst", physic_address="x")
+        self.station = MonitoringStation.objects.create(
+            station_name="EstReport", institution=inst, location=Point(-76.5, 3.4, srid=4326)
+        )
+        self.sensor = Sensor.objects.create(
+            serial_number="SN-REPORT",
+            model="X1",
+            manufacturer="Acme",
+            installation_date="2023-01-01",
+            status=Sensor.Status.ACTIVE,
+            station=self.station
+        )
+        self.variable = VariableCatalog.objects.create(
+            name="Humedad", code="HUM", unit="%", min_expected_value=0, max_expected_value=100
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_overwritten_value_regenerates_report(self):
+        """
+        Un upsert que corrige un valor cambia la marca de agua y el reporte se vuelve a generar
+        """
+        reading = dict(sensor_id=self.sensor.pk, variable_id=self.variable.pk, measure_date=timezone.now())
+        MeasurementService.bulk_insert([Measurement(value=40.0, **reading)])
+        today = timezone.localdate().isoformat()
+        config = {"ENABLED": True, "PATH": self.directory.name, "MAX_BYTES": 1024 ** 2, "CLOSED_AFTER_HOURS": 24}
+
+        rendered = []
+
+        def render(report_type, station, start_date, end_date, variable_code=None):
+            rendered.append(Measurement.objects.get().value)
+            return io.BytesIO(f"%PDF-{len(rendered)}".encode())
+
+        with self.settings(REPORT_CACHE=config), \
+                mock.patch("src.measurements.report_jobs.render_report", side_effect=render):
+            build_report("trends", self.station.pk, today, today)[0].close()
+            report, _ = build_report("trends", self.station.pk, today, today)
+            with report:
+                self.assertEqual(report.read(), b"%PDF-1")
+
+            MeasurementService.bulk_insert([Measurement(value=55.0, **reading)])
+            report, _ = build_report("trends", self.station.pk, today, today)
+            with report:
+                self.assertEqual(report.read(), b"%PDF-2")
+
+        self.assertEqual(rendered, [40.0, 55.0])
+        self.assertEqual(Measurement.objects.count(), 1)
+
+
+class StationReportTestCase(TestCase):
+    def setUp(self):
+        inst = EnvironmentalInstitution.objects.create(institute_name="Station Report Inst", physic_address="x")
+        self.station = MonitoringStation.objects.create(
+            station_name="Estacion Norte", institution=inst, location=Point(-76.5, 3.4, srid=4326)
+        )
+        self.user = User.objects.create_user(email="reportes@vrisa.com", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        # Sin caché de reportes y con el PDF simulado: se prueba el flujo, no reportlab
+        render = mock.patch(
+            "src.measurements.report_jobs.render_report", side_effect=lambda *args: io.BytesIO(b"%PDF-1")
+        )
+        self.render = render.start()
+        self.addCleanup(render.stop)
+        settings_override = self.settings(
+            MEDIA_ROOT=self.directory.name, REPORT_CACHE={"ENABLED": False}
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_sync_report_of_a_station(self):
+        """
+        El endpoint síncrono entrega el reporte de una estación con su nombre en la descarga
+        """
+        response = self.client.get(reverse("report-trends"), {
+            "station_id": self.station.pk, "start_date": "2026-01-01", "end_date": "2026-01-31",
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "2026-01-01_to_2026-01-31-Estacion_Norte-vrisa-trends.pdf",
+            response["Content-Disposition"],
+        )
+        self.assertEqual(self.render.call_args.args[1], self.station)
+
+    def test_worker_report_of_a_station(self):
+        """
+        El worker completa el trabajo de una estación y lo nombra como el endpoint síncrono
+        """
+        job = ReportJob.objects.create(
+            report_type=ReportJob.ReportType.ALERTS,
+            requested_by=self.user,
+            params={"station_id": self.station.pk, "start_date": "2026-01-01", "end_date": "2026-01-31"},
+        )
+
+        job = process_job(job)
+
+        self.assertEqual(job.status, ReportJob.Status.COMPLETED, job.error)
+        today = timezone.now().strftime("%Y%m%d")
+        self.assertEqual(job.filename, f"{today}_vrisa_estacion_norte_alerts_report.pdf")
+        with job.file.open("rb") as report:
+            self.assertEqual(report.read(), b"%PDF-1")
+
+
+class MeasurementWriteBufferTestCase(SimpleTestCase):
+    def test_flushes_in_batches_and_on_close(self):
+        """
+        El buffer agrupa las escrituras por tamaño de lote y vacía lo pendiente al cerrar
+        """
+        batches = []
+        buffer = MeasurementWriteBuffer(
+            writer=lambda batch: batches.append(list(batch)),
+            max_rows=2, flush_interval_ms=60000, max_queue_size=10
+        )
+        for i in range(5):
+            buffer.put(i)
+        buffer.close()
+
+        self.assertEqual(sum(batches, []), [0, 1, 2, 3, 4])
+        self.assertTrue(all(len(batch) <= 2 for batch in batches))
+
+    def test_backpressure_when_full(self):
+        """
+        Con la cola llena, put espera y luego rechaza la lectura
+        """
+        buffer = MeasurementWriteBuffer(
+            writer=lambda batch: None,
+            max_rows=100, flush_interval_ms=60000, max_queue_size=1, put_timeout=0.01
+        )
+        buffer.put(1)
+        with self.assertRaises(WriteBufferFullError):
+            buffer.put(2)
+        buffer.close()
+
+
+    def test_failed_batches_are_retried_then_dead_lettered(self):
+        """
+        Un lote que falla se reintenta y, al agotar los intentos, se entrega
+        al destino de errores en lugar de descartarse
+        """
+        attempts, written, dead = [], [], []
+
+        def writer(batch):
+            attempts.append(list(batch))
+            if batch[0] == "bad" or len(attempts) == 1:
+                raise RuntimeError("base de datos no disponible")
+            written.extend(batch)
+
+        buffer = MeasurementWriteBuffer(
+            writer=writer, max_rows=10, flush_interval_ms=60000, max_queue_size=10,
+            max_retries=3, dead_letter=lambda batch, error: dead.append((list(batch), str(error))),
+        )
+        buffer.put("ok")
+        self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending_retries, 1)
+        self.assertEqual(buffer.flush(force_retries=True), 1)
+        self.assertEqual(written, ["ok"])
+
+        buffer.put("bad")
+        for _ in range(3):
+            buffer.flush(force_retries=True)
+        buffer.close()
+
+        self.assertEqual(buffer.pending_retries, 0)
+        self.assertEqual(dead, [(["bad"], "base de datos no disponible")])
+
+    def test_backpressure_counts_pending_retries(self):
+        """
+        Durante una caída de la base de datos los lotes en reintento ocupan la
+        capacidad del buffer y put rechaza nuevas lecturas
+        """
+        def writer(batch):
+            raise RuntimeError("base de datos no disponible")
+
+        buffer = MeasurementWriteBuffer(
+            writer=writer, max_rows=10, flush_interval_ms=60000, max_queue_size=3, put_timeout=0.01
+        )
+        for i in range(3):
+            buffer.put(i)
+        buffer.flush()
+
+        self.assertEqual(buffer.pending_retries, 3)
+        with self.assertRaises(WriteBufferFullError):
+            buffer.put(3)
+
+    def test_spills_to_file_when_dead_letter_fails(self):
+        """
+        Si el destino de errores también falla, el lote se guarda en el archivo
+        local en lugar de reintentarse sin fin
+        """
+        def fail(*args):
+            raise RuntimeError("base de datos no disponible")
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        spill_path = os.path.join(directory.name, "spill", "measurements.jsonl")
+        measure_date = datetime(2026, 1, 1, 12, tzinfo=dt_timezone.utc)
+        buffer = MeasurementWriteBuffer(
+            writer=fail, max_rows=10, flush_interval_ms=60000, max_queue_size=10,
+            max_retries=2, dead_letter=fail, spill_path=spill_path,
+        )
+        buffer.put(Measurement(sensor_id=1, variable_id=2, value=40.5, measure_date=measure_date))
+        for _ in range(2):
+            buffer.flush(force_retries=True)
+
+        self.assertEqual(buffer.pending_retries, 0)
+        with open(spill_path, encoding="utf-8") as spill_file:
+            rows = [json.loads(line) for line in spill_file]
+        self.assertEqual(rows, [{
+            "sensor_id": 1, "variable_id": 2, "value": 40.5,
+            "measure_date": measure_date.isoformat(), "error": "base de datos no disponible",
+        }])
+        buffer.close()
+
+
+class MeasurementPartitionTestCase(SimpleTestCase):
+    def test_month_arithmetic_crosses_years(self):
+        """
+        Los límites de partición se calculan por mes calendario en UTC
+        """
+        start = month_start(datetime(2024, 12, 15, 10, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual(start, datetime(2024, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(add_months(start, 1), datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(add_months(start, -12), datetime(2023, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partition_name(start), "measurement_p2024_12")
+
+    def test_report_date_filter_is_half_open(self):
+        """
+        El filtro de reportes compara measure_date directamente (sin cast a fecha)
+        """
+        filters = PDFReportGenerator.date_range_filter("2025-01-01", "2025-01-31")
+        self.assertEqual(filters["measure_date__gte"], datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(filters["measure_date__lt"], datetime(2025, 2, 1, tzinfo=dt_timezone.utc))
+
+
+class RollupTimezoneTestCase(SimpleTestCase):
+    start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+    end = datetime(2026, 12, 31, tzinfo=dt_timezone.utc)
+
+    def test_whole_hour_offsets(self):
+        """
+        Solo las zonas con desfase de horas completas se arman desde agregados UTC
+        """
+        for name in ("UTC", "America/Bogota", "Europe/Madrid"):
+            self.assertTrue(whole_hour_offsets(ZoneInfo(name), self.start, self.end), name)
+        for name in ("Asia/Kolkata", "America/St_Johns", "Australia/Lord_Howe"):
+            self.assertFalse(whole_hour_offsets(ZoneInfo(name), self.start, self.end), name)
+
+    def test_half_hour_zone_uses_raw_measurements(self):
+        """
+        Días locales en Asia/Kolkata se agrupan desde las mediciones crudas aunque el rango sea largo
+        """
+        rows = mock.MagicMock()
+        rows.iterator.return_value = iter([])
+        with mock.patch.object(history, "select_tier", return_value="day"), \
+                mock.patch.object(history, "rollup_bucketed_series") as from_rollups, \
+                mock.patch.object(history, "bucketed_series", return_value=rows) as from_raw:
+            history.history_series(
+                ["PM2.5"], "2026-01-01", "2026-12-31", resolution="1d", tzinfo=ZoneInfo("Asia/Kolkata")
+            )
+            from_rollups.assert_not_called()
+            from_raw.assert_called_once()
+
+            rows.iterator.return_value = iter([])
+            history.history_series(
+                ["PM2.5"], "2026-01-01", "2026-12-31", resolution="1d", tzinfo=ZoneInfo("America/Bogota")
+            )
+            from_rollups.assert_called_once()
+
+
+class DownsamplingTestCase(SimpleTestCase):
+    def setUp(self):
+        start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        self.points = [(start + timedelta(seconds=10 * i), float(i % 50)) for i in range(10000)]
+        self.points[5000] = (self.points[5000][0], 999.0)  # Pico aislado
+
+    def test_lttb_bounds_size_and_keeps_peak(self):
+        """
+        LTTB respeta max_points, conserva extremos de la serie y el pico aislado
+        """
+        series = downsample(self.points, 200, METHOD_LTTB)
+
+        self.assertEqual(len(series), 200)
+        self.assertEqual(series[0]["measure_date"], self.points[0][0])
+        self.assertEqual(series[-1]["measure_date"], self.points[-1][0])
+        self.assertIn(999.0, [p["value"] for p in series])
+
+    def test_minmax_envelope_keeps_extremes_in_order(self):
+        """
+        La envolvente conserva mínimo y máximo de cada bucket en orden cronológico
+        """
+        series = downsample(self.points, 100, METHOD_MINMAX)
+        dates = [p["measure_date"] for p in series]
+
+        self.assertLessEqual(len(series), 100)
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(max(p["value"] for p in series), 999.0)
+        self.assertEqual(min(p["value"] for p in series), 0.0)
+
+
+class MeasurementExportTestCase(SimpleTestCase):
+    def setUp(self):
+        start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        self.rows = [
+            (i, start + timedelta(minutes=i), 1, "SN-1", 2, "PM2.5", "µg/m³", float(i))
+            for i in range(2500)
+        ]
+
+    def test_csv_stream_emits_header_and_all_rows(self):
+        """
+        El CSV se entrega en varios bloques, con encabezado y una línea por medición
+        """
+        chunks = list(csv_stream(iter(self.rows)))
+        lines = "".join(chunks).splitlines()
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(lines[0], ",".join(EXPORT_COLUMNS))
+        self.assertEqual(len(lines), len(self.rows) + 1)
+        self.assertTrue(lines[1].startswith("0,2025-01-01T00:00:00+00:00,1,SN-1,2,PM2.5"))
+
+    def test_gzip_ndjson_round_trip(self):
+        """
+        NDJSON comprimido se descomprime a un objeto JSON por línea
+        """
+        body = b"".join(gzip_stream(ndjson_stream(iter(self.rows))))
+        records = [json.loads(line) for line in gzip.decompress(body).decode("utf-8").splitlines()]
+
+        self.assertEqual(len(records), len(self.rows))
+        self.assertEqual(records[-1]["measurement_id"], 2499)
+        self.assertEqual(records[0]["measure_date"], "2025-01-01T00:00:00+00:00")
+
+    def test_parquet_stream_loads_in_pandas(self):
+        """
+        Parquet se construye por lotes y se carga en pandas con tipos nativos
+        """
+        import pyarrow.parquet as pq
+
+        body = b"".join(columnar_stream(iter(self.rows), FORMAT_PARQUET))
+        frame = pq.read_table(io.BytesIO(body)).to_pandas()
+
+        self.assertEqual(list(frame.columns), list(EXPORT_COLUMNS))
+        self.assertEqual(len(frame), len(self.rows))
+        self.assertEqual(frame["value"].sum(), sum(row[-1] for row in self.rows))
+
+
+class LatestMatrixTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "latest.bin")
+        self.matrix = LatestMatrix(self.path, max_stations=8, max_variables=4)
+        self.now = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+
+    def tearDown(self):
+        self.matrix.close()
+        self.tmp.cleanup()
+
+    def test_cold_matrix_defers_to_database(self):
+        """
+        Antes de la carga inicial la tabla no responde ni acepta publicaciones
+        """
+        self.matrix.publish([(1, 1, 10.0, self.now)])
+
+        self.assertIsNone(self.matrix.read([1], [1]))
+        self.assertIsNone(self.matrix.watermark(1))
+
+    def test_publish_is_visible_to_other_mappings(self):
+        """
+        Otra instancia sobre el mismo archivo (otro worker) ve la medición más reciente
+        """
+        self.matrix.load([], [])
+        watermark = self.matrix.watermark(1)
+        self.matrix.publish([(1, 2, 10.0, self.now), (1, 2, 5.0, self.now - timedelta(hours=1))])
+
+        other = LatestMatrix(self.path, max_stations=8, max_variables=4)
+        try:
+            rows = other.read([1], [1, 2])
+            city = other.read(None, [1, 2])
+        finally:
+            other.close()
+
+        self.assertEqual([(r["variable_id"], r["value"], r["measure_date"]) for r in rows], [(2, 10.0, self.now)])
+        self.assertEqual(city[0]["value"], 10.0)
+        self.assertNotEqual(self.matrix.watermark(1), watermark)
+        self.assertIsNone(self.matrix.read([9], [1]))
+
+
+class AQIStateTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state = AQIState(os.path.join(self.tmp.name, "aqi.bin"), max_stations=4)
+        self.now = datetime(2025, 1, 1, 12, 30, tzinfo=dt_timezone.utc)
+
+    def tearDown(self):
+        self.state.close()
+        self.tmp.cleanup()
+
+    def test_nowcast_and_period_coverage(self):
+        """
+        NowCast pondera las horas recientes (peso mínimo 0.5) y exige 2 de las
+        3 últimas; los promedios de 8 horas exigen 75% de cobertura
+        """
+        self.assertAlmostEqual(nowcast([10.0, 20.0] + [np.nan] * 10), 40 / 3)
+        self.assertAlmostEqual(nowcast([10.0, np.nan, 10.0]), 10.0)
+        self.assertIsNone(nowcast([10.0, np.nan, np.nan, 10.0]))
+        self.assertIsNone(period_mean([1.0] * 5 + [np.nan] * 3))
+        self.assertEqual(period_mean([1.0] * 6 + [np.nan] * 2), 1.0)
+
+    def test_updates_build_epa_periods(self):
+        """
+        Las lecturas suman en la cubeta de su hora; la red agrega todas las
+        estaciones y una lectura más antigua que el anillo se descarta
+        """
+        hour = self.now.replace(minute=0)
+        self.state.load(
+            [(1, "PM2.5", hour - timedelta(hours=1), 2, 40.0), (2, "NO2", hour - timedelta(hours=1), 1, 30.0)]
+        )
+        self.state.update(
+            [
+                (1, "PM2.5", 10.0, self.now),
+                (1, "PM2.5", 10.0, self.now - timedelta(hours=25)),
+                (2, "NO2", 50.0, self.now),
+                (1, "TEMP", 25.0, self.now),
+            ]
+        )
+
+        station = self.state.concentrations(1, self.now)
+        city = self.state.concentrations(None, self.now)
+
+        self.assertAlmostEqual(station["PM2.5"], 40 / 3)
+        self.assertIsNone(station["NO2"])
+        self.assertEqual(city["NO2"], 50.0)
+        self.assertIsNone(self.state.concentrations(9, self.now))
+
+    def test_batch_aqi_matches_current_aqi(self):
+        """
+        El AQI de varias estaciones (mapa) usa el estado incremental como
+        aqi/current; solo las estaciones que el estado no cubre van a la consulta agrupada
+        """
+        hour = self.now.replace(minute=0)
+        self.state.load([(1, "PM2.5", hour - timedelta(hours=1), 2, 40.0)])
+        self.state.update([(1, "PM2.5", 10.0, self.now)])
+        grouped_query = mock.patch.object(
+            AQICalculatorService, "calculate_aqi_for_stations", return_value={9: {"aqi": 12.0}}
+        )
+
+        with mock.patch("src.measurements.services.get_aqi_state", return_value=self.state), \
+                mock.patch("src.measurements.services.timezone.now", return_value=self.now), \
+                grouped_query as grouped:
+            results = AQICalculatorService.current_aqi_for_stations([1, 9], self.now)
+            current = AQICalculatorService.current_aqi(1)
+
+        self.assertEqual(results[1], current)
+        self.assertEqual(results[1]["aqi"], AQICalculatorService.calculate_sub_index("PM2.5", 40 / 3))
+        self.assertEqual(results[9], {"aqi": 12.0})
+        grouped.assert_called_once_with([9], self.now)
+
+
+class RecentSeriesTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.series = RecentSeries(os.path.join(self.tmp.name, "recent.bin"), max_series=2, capacity=4)
+        self.start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+    def tearDown(self):
+        self.series.close()
+        self.tmp.cleanup()
+
+    def at(self, minutes):
+        return self.start + timedelta(minutes=minutes)
+
+    def test_ring_keeps_order_and_coverage(self):
+        """
+        Las lecturas atrasadas se insertan en orden, las repetidas reemplazan
+        el valor y al llenarse el anillo la ventana anterior deja de cubrirse
+        """
+        self.series.load([(1, 1, self.at(1), 10.0)], self.start)
+        self.series.append(
+            [(1, 1, 30.0, self.at(3)), (1, 1, 20.0, self.at(2)), (1, 1, 12.3, self.at(1))]
+        )
+
+        dates, values = self.series.window(1, 1, self.start)
+        self.assertEqual(to_floats(values).tolist(), [12.3, 20.0, 30.0])
+
+        self.series.append([(1, 1, 40.0, self.at(4)), (1, 1, 50.0, self.at(5)), (1, 1, 5.0, self.at(0))])
+
+        self.assertIsNone(self.series.window(1, 1, self.start))
+        dates, values = self.series.window(1, 1, self.at(2))
+        self.assertEqual(values.tolist(), [20.0, 30.0, 40.0, 50.0])
+        self.assertEqual(self.series.last(1, 1, 2)[1].tolist(), [40.0, 50.0])
+        self.assertIsNone(self.series.last(1, 1, 5))
+
+    def test_unknown_series_until_capacity(self):
+        """
+        Una serie sin lecturas se responde vacía mientras queden filas libres
+        """
+        self.series.load([], self.start)
+        self.series.append([(1, 1, 1.0, self.at(1))])
+        self.assertEqual(len(self.series.window(3, 1, self.start)[0]), 0)
+
+        self.series.append([(2, 1, 2.0, self.at(1)), (3, 1, 3.0, self.at(1))])
+        self.assertIsNone(self.series.window(3, 1, self.start))
+        self.assertEqual(self.series.window(2, 1, self.start)[1].tolist(), [2.0])
+
+
+class HourlyProfileCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmp.name, "profile.csv")
+        self.cache_path = os.path.join(self.tmp.name, "profile.json")
+        self.write_csv(10.0)
+        for name, value in (("CSV_PATH", self.csv_path), ("CACHE_PATH", self.cache_path)):
+            patcher = mock.patch.object(cali_profile, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(cali_profile._profile.update, signature=None, data=None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_csv(self, pm25):
+        with open(self.csv_path, "w") as csv_file:
+            csv_file.write(f"datetime,pm2_5\n2024-01-01 05:00:00,{pm25}\n")
+
+    def test_profile_is_cached_by_csv_signature(self):
+        """
+        El perfil se calcula una vez y se lee de la caché en disco mientras el CSV no cambie
+        """
+        self.assertEqual(cali_profile.HOURLY_PROFILE["5"]["PM2.5"], 10.0)
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        cali_profile._profile.update(signature=None, data=None)
+        with mock.patch.object(cali_profile, "calcular_perfil_con_pandas") as compute:
+            self.assertEqual(cali_profile.get_hourly_profile()["5"]["PM2.5"], 10.0)
+        compute.assert_not_called()
+
+        self.write_csv(20.25)
+        self.assertEqual(cali_profile.get_hourly_profile()["5"]["PM2.5"], 20.25)
+
+
+class ReportJobTestCase(SimpleTestCase):
+    def test_filenames_match_sync_endpoints(self):
+        """
+        El worker nombra los PDF igual que los endpoints síncronos
+        """
+        station = "Estacion Norte"
+        today = timezone.now().strftime("%Y%m%d")
+
+        self.assertEqual(
+            report_filename(ReportJob.ReportType.TRENDS, station, "2026-01-01", "2026-01-31"),
+            "2026-01-01_to_2026-01-31-Estacion_Norte-vrisa-trends.pdf",
+        )
+        self.assertEqual(
+            report_filename(ReportJob.ReportType.AIR_QUALITY, None, "2026-01-01", "2026-01-31"),
+            f"{today}_vrisa_general_cali_consolidated_report.pdf",
+        )
+        self.assertEqual(
+            report_filename(ReportJob.ReportType.ALERTS, station, "2026-01-01", "2026-01-31"),
+            f"{today}_vrisa_estacion_norte_alerts_report.pdf",
+        )
+
+    def test_rejects_invalid_requests(self):
+        """
+        Un trabajo requiere un tipo conocido y un rango de fechas en orden
+        """
+        serializer = ReportJobSerializer(data={
+            "report_type": "trends", "start_date": "2026-02-01", "end_date": "2026-01-31",
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("end_date", serializer.errors)
+
+        serializer = ReportJobSerializer(data={
+            "report_type": "weekly", "start_date": "2026-01-01", "end_date": "2026-01-31",
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("report_type", serializer.errors)
+
+
+class ReportCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = ReportCache(self.directory.name, max_bytes=20)
+
+    def test_evicts_least_recently_used(self):
+        """
+        Al superar el tamaño máximo se descarta el reporte usado hace más tiempo
+        """
+        self.cache.put("a", b"%PDF-aaaa", {"station_name": None})
+        self.cache.put("b", b"%PDF-bbbb", {"station_name": "Norte"})
+        os.utime(os.path.join(self.directory.name, "a.pdf"), ns=(1, 1))
+        os.utime(os.path.join(self.directory.name, "b.pdf"), ns=(2, 2))
+
+        report, meta = self.cache.get("a")
+        report.close()
+        self.cache.put("c", b"%PDF-cccc", {"station_name": None})
+
+        self.assertIsNone(self.cache.get("b"))
+        for key in ("a", "c"):
+            report, _ = self.cache.get(key)
+            with report:
+                self.assertEqual(report.read(), f"%PDF-{key * 4}".encode())
+
+    def test_closed_index_is_forgotten(self):
+        """
+        Las lecturas atrasadas descartan el índice de periodos cerrados
+        """
+        digest = params_digest("trends", "3", "2026-01-01", "2026-01-31", "PM2.5")
+        self.assertEqual(digest, params_digest("trends", 3, "2026-01-01", "2026-01-31", "PM2.5"))
+        self.cache.remember_closed(digest, "a")
+        self.assertEqual(self.cache.closed_key(digest), "a")
+
+        self.cache.forget_closed()
+
+        self.assertIsNone(self.cache.closed_key(digest))
+
+    def test_period_closes_after_grace(self):
+        """
+        Un periodo se considera cerrado solo después del margen posterior a su último día
+        """
+        end_of_day = timezone.make_aware(datetime(2026, 2, 1))
+        with self.settings(REPORT_CACHE={"CLOSED_AFTER_HOURS": 24}):
+            self.assertFalse(is_closed("2026-01-31", now=end_of_day + timedelta(hours=23)))
+            self.assertTrue(is_closed("2026-01-31", now=end_of_day + timedelta(hours=24)))
+
+    def test_invalid_params_rejected_before_cache(self):
+        """
+        Un station_id o una fecha mal formados responden 400 sin calcular la llave del reporte
+        """
+        factory = APIRequestFactory()
+        for params in (
+            {"station_id": "abc", "start_date": "2026-01-01", "end_date": "2026-01-31"},
+            {"station_id": "1", "start_date": "2026-01-01", "end_date": "31/01/2026"},
+        ):
+            request = factory.get("/api/measurements/reports/trends/", params)
+            force_authenticate(request, user=mock.Mock(is_authenticated=True))
+            with mock.patch("src.measurements.views.build_report") as build:
+                response = TrendsReportView.as_view()(request)
+
+            self.assertEqual(response.status_code, 400)
+            build.assert_not_called()
+
+
+class WorkerImportTimeTestCase(SimpleTestCase):
+    # Paquetes del generador de PDF que un worker web no debe cargar al iniciar
+    HEAVY_MODULES = ("pandas", "matplotlib", "reportlab")
+
+    # Tiempo acumulado máximo para importar las vistas de mediciones (tras django.setup).
+    # Con holgura para runners de CI cargados; se ajusta con la variable de entorno.
+    IMPORT_BUDGET_SECONDS = float(os.environ.get("VRISA_IMPORT_BUDGET_SECONDS", "2.0"))
+
+    def import_times(self, module):
+        """
+        Importa `module` en un proceso nuevo con -X importtime.
+        Returns:
+            dict: {modulo: tiempo acumulado en microsegundos}.
+        """
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import django; django.setup(); import {module}"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        times = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+        return times
+
+    def test_views_import_without_report_stack(self):
+        """
+        Las vistas (ingesta, AQI, consultas) se importan sin pandas, matplotlib
+        ni reportlab y dentro del presupuesto de tiempo
+        """
+        times = self.import_times("src.measurements.views")
+
+        self.assertIn("src.measurements.views", times)
+        loaded = {name.split(".")[0] for name in times}
+        self.assertFalse(loaded & set(self.HEAVY_MODULES))
+        seconds = times["src.measurements.views"] / 1e6
+        self.assertLess(
+            seconds,
+            self.IMPORT_BUDGET_SECONDS,
+            f"Importar las vistas tomó {seconds:.2f} s (VRISA_IMPORT_BUDGET_SECONDS={self.IMPORT_BUDGET_SECONDS})",
+        )
+
+
+class AQIArrayTestCase(SimpleTestCase):
+    def test_sub_indices_match_scalar_formula(self):
+        """
+        El motor vectorizado aplica los mismos tramos EPA (incluye bordes,
+        valores negativos y extrapolación sobre el máximo)
+        """
+        concentrations = [0.0, 12.0, 12.1, 35.4, 100.0, 250.5, 600.0, -3.0]
+        expected = [0, 50, 51, 100, 173.98, 301, 565.78, 0]
+
+        np.testing.assert_allclose(sub_indices("PM2.5", concentrations), expected)
+        self.assertTrue(np.isnan(sub_indices("O3", [np.nan])[0]))
+        with self.assertRaises(ValueError):
+            sub_indices("TEMP", [20.0])
+
+    def test_category_indices(self):
+        """
+        Cada AQI cae en la misma categoría que get_aqi_category
+        """
+        levels = [CATEGORIES[i]["level"] for i in category_indices([0, 50, 51, 160, 300, 700])]
+        self.assertEqual(
+            levels,
+            ["Good", "Good", "Moderate", "Unhealthy", "Very Unhealthy", "Hazardous"],
+        )
+
+        # Sub-índices con decimales entre dos rangos toman la categoría inferior
+        # en ambas versiones (antes la escalar los marcaba como Hazardous)
+        fractional = [50.4, 100.6, 150.5, 200.99, 300.5, 500.5]
+        expected = [
+            "Good", "Moderate", "Unhealthy for Sensitive Groups", "Unhealthy", "Very Unhealthy", "Hazardous",
+        ]
+        self.assertEqual([CATEGORIES[i]["level"] for i in category_indices(fractional)], expected)
+        self.assertEqual(
+            [AQICalculatorService.get_aqi_category(value)["level"] for value in fractional], expected
+        )
+
+    def test_backfill_grid_includes_end(self):
+        """
+        La grilla del AQI histórico incluye ambos extremos del rango
+        """
+        start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        grid = aqi_grid(start, start + timedelta(days=1), interval_hours=6)
+
+        self.assertEqual(len(grid), 5)
+        self.assertEqual(grid[-1], start + timedelta(days=1))
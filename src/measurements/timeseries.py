@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db.models import (
+    Aggregate,
+    Avg,
+    DateTimeField,
+    ExpressionWrapper,
+    FloatField,
+    Func,
+    Max,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Trunc
+
+# Resoluciones de agregación temporal aceptadas por el endpoint history
+RESOLUTIONS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+# Funciones de agregación por periodo
+AGG_AVG = "avg"
+AGG_MAX = "max"
+AGG_P95 = "p95"
+AGGREGATES = (AGG_AVG, AGG_MAX, AGG_P95)
+
+# Resoluciones que date_trunc resuelve directamente (respetando la zona horaria)
+_TRUNC_KINDS = {"1m": "minute", "1h": "hour", "1d": "day"}
+
+_BIN_ORIGIN = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class DateBin(Func):
+    """
+    date_bin(stride, source, origin) de PostgreSQL 14+: agrupa en intervalos
+    de tamaño arbitrario alineados a `origin`.
+    """
+
+    function = "date_bin"
+    output_field = DateTimeField()
+
+    def __init__(self, stride: timedelta, expression, origin: datetime = _BIN_ORIGIN, **extra):
+        super().__init__(Value(stride), expression, Value(origin), **extra)
+
+
+class Percentile(Aggregate):
+    """
+    percentile_cont(fraction) WITHIN GROUP (ORDER BY expression): percentil
+    continuo calculado por PostgreSQL.
+    """
+
+    function = "percentile_cont"
+    name = "Percentile"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction: float, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def bucket_expression(field: str, resolution: str, tzinfo=None):
+    """
+    Expresión SQL con el inicio del periodo al que pertenece `field`.
+    Los periodos de minuto, hora y día se calculan con date_trunc en la zona
+    horaria indicada (un día local no coincide con un día UTC); el resto con
+    date_bin.
+    """
+    if resolution in _TRUNC_KINDS:
+        return Trunc(field, _TRUNC_KINDS[resolution], output_field=DateTimeField(), tzinfo=tzinfo)
+    return DateBin(RESOLUTIONS[resolution], field)
+
+
+def raw_aggregate(agg: str):
+    """
+    Agregado sobre mediciones crudas.
+    """
+    if agg == AGG_MAX:
+        return Max("value")
+    if agg == AGG_P95:
+        return Percentile("value", 0.95)
+    return Avg("value")
+
+
+def rollup_aggregate(agg: str):
+    """
+    Agregado equivalente sobre agregados horarios, o None si no se puede
+    derivar de ellos (un percentil requiere las mediciones crudas).
+    """
+    if agg == AGG_AVG:
+        return ExpressionWrapper(Sum("sum") / Sum("count"), output_field=FloatField())
+    if agg == AGG_MAX:
+        return Max("max")
+    return None
+
+
+def bucketed_series(
+    queryset, date_field: str, resolution: str, aggregate, tzinfo=None, group_by=()
+):
+    """
+    Agrupa un QuerySet por periodo en la base de datos.
+
+    Args:
+        group_by (tuple): Campos adicionales que separan series (ej: variable, estación).
+    Returns:
+        QuerySet: Diccionarios {*group_by, "bucket", "value"} ordenados por serie y periodo.
+    """
+    return (
+        queryset.annotate(bucket=bucket_expression(date_field, resolution, tzinfo))
+        .values(*group_by, "bucket")
+        .annotate(value=aggregate)
+        .order_by(*group_by, "bucket")
+    )
@@ -6,6 +6,9 @@ from .views import (
     CurrentAQIView,
     LatestMeasurementsView,
     MeasurementViewSet,
+    ReportJobViewSet,
+    StationIngestView,
+    StationsAQIView,
     TrendsReportView,
     VariableCatalogViewSet,
 )
@@ -13,6 +16,7 @@ from .views import (
 router = DefaultRouter()
 router.register(r"variables", VariableCatalogViewSet, basename="variables")
 router.register(r"data", MeasurementViewSet, basename="measurements")
+router.register(r"reports/jobs", ReportJobViewSet, basename="report-jobs")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -21,4 +25,6 @@ urlpatterns = [
     path("reports/alerts/", AlertsReportView.as_view(), name="report-alerts"),
     path("latest/", LatestMeasurementsView.as_view(), name="measurements-latest"),
     path("aqi/current/", CurrentAQIView.as_view(), name="aqi-current"),
+    path("aqi/stations/", StationsAQIView.as_view(), name="aqi-stations"),
+    path("ingest/", StationIngestView.as_view(), name="measurements-ingest"),
 ]
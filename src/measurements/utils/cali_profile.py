@@ -1,20 +1,26 @@
+import json
 import os
-import pandas as pd
+import tempfile
+import threading
 from django.conf import settings
 
 CSV_PATH = os.path.join(settings.BASE_DIR, "data/AQI_Bangladesh.csv")
 
+# Perfil ya calculado, junto al CSV; se invalida si cambia la fecha o el tamaño del CSV
+CACHE_PATH = os.path.join(settings.BASE_DIR, "data/cali_profile.json")
 
-def calcular_perfil_con_pandas():
+# Versión del formato del archivo de caché
+CACHE_FORMAT = 1
+
+_profile = {"signature": None, "data": None}
+_profile_lock = threading.Lock()
+
+
+def _perfil_por_defecto():
     """
-    Lee el dataset horario y CONVIERTE las unidades de µg/m³
-    a las unidades estándar EPA (ppm/ppb) que espera el sistema VriSA.
-    Returns:
-        dict: Un diccionario donde la clave es la hora (str '0'-'23') y el valor
-            es otro diccionario con los promedios de cada variable.
+    Perfil por defecto (valores seguros en EPA Standard), sin CSV.
     """
-    # Perfil por defecto (valores seguros en EPA Standard)
-    perfil_por_defecto = {
+    return {
         str(h): {
             "PM2.5": 12.0,
             "PM10": 40.0,
@@ -26,10 +32,27 @@ def calcular_perfil_con_pandas():
         for h in range(24)
     }
 
+
+def calcular_perfil_con_pandas(strict=False):
+    """
+    Lee el dataset horario y CONVIERTE las unidades de µg/m³
+    a las unidades estándar EPA (ppm/ppb) que espera el sistema VriSA.
+    pandas se importa solo aquí: con el perfil en caché no se carga.
+    Args:
+        strict (bool): Propagar los errores de lectura del CSV en lugar de
+            retornar el perfil por defecto.
+    Returns:
+        dict: Un diccionario donde la clave es la hora (str '0'-'23') y el valor
+            es otro diccionario con los promedios de cada variable.
+    """
+    perfil_por_defecto = _perfil_por_defecto()
+
     if not os.path.exists(CSV_PATH):
         return perfil_por_defecto
 
     try:
+        import pandas as pd
+
         df = pd.read_csv(CSV_PATH)
 
         # Procesar fecha y hora
@@ -82,8 +105,93 @@ def calcular_perfil_con_pandas():
         return hourly_profile
 
     except Exception as e:
+        if strict:
+            raise
         print(f"Error procesando CSV: {e}")
         return perfil_por_defecto
 
 
-HOURLY_PROFILE = calcular_perfil_con_pandas()
+def csv_signature():
+    """
+    Identidad del CSV para la caché: (mtime en nanosegundos, tamaño), o None si no existe.
+    """
+    try:
+        stat = os.stat(CSV_PATH)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_cache(signature):
+    try:
+        with open(CACHE_PATH, encoding="utf-8") as cache:
+            content = json.load(cache)
+    except (OSError, ValueError):
+        return None
+    if content.get("format") != CACHE_FORMAT or content.get("csv") != signature:
+        return None
+    return content.get("profile")
+
+
+def _write_cache(signature, profile) -> bool:
+    # Escritura atómica: otro proceso nunca lee un archivo a medio escribir
+    temp_path = None
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(CACHE_PATH), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as cache:
+            json.dump({"format": CACHE_FORMAT, "csv": signature, "profile": profile}, cache)
+        os.replace(temp_path, CACHE_PATH)
+    except OSError as e:
+        print(f"No se pudo guardar la caché del perfil: {e}")
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    return True
+
+
+def rebuild_profile():
+    """
+    Recalcula el perfil desde el CSV y reescribe la caché en disco.
+    Returns:
+        tuple: (perfil, True si se guardó la caché).
+    Raises:
+        Exception: Si el CSV existe pero no se puede procesar.
+    """
+    signature = csv_signature()
+    profile = calcular_perfil_con_pandas(strict=True)
+    saved = signature is not None and _write_cache(signature, profile)
+    with _profile_lock:
+        _profile.update(signature=signature, data=profile)
+    return profile, saved
+
+
+def get_hourly_profile():
+    """
+    Perfil horario de contaminantes, calculado la primera vez que se pide.
+    Se lee de la caché en disco si corresponde al CSV actual; si no, se
+    calcula con pandas y se guarda. Sin CSV se usa el perfil por defecto.
+    """
+    signature = csv_signature()
+    with _profile_lock:
+        if _profile["data"] is not None and _profile["signature"] == signature:
+            return _profile["data"]
+        profile = _read_cache(signature) if signature is not None else None
+        if profile is None and signature is None:
+            profile = _perfil_por_defecto()
+        elif profile is None:
+            try:
+                profile = calcular_perfil_con_pandas(strict=True)
+                _write_cache(signature, profile)
+            except Exception as e:
+                # El perfil por defecto no se guarda: se reintenta en el próximo arranque
+                print(f"Error procesando CSV: {e}")
+                profile = _perfil_por_defecto()
+        _profile.update(signature=signature, data=profile)
+        return profile
+
+
+def __getattr__(name):
+    # Compatibilidad: HOURLY_PROFILE se calcula al primer acceso, no al importar
+    if name == "HOURLY_PROFILE":
+        return get_hourly_profile()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
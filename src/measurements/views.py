@@ -1,18 +1,104 @@
-import io
+from datetime import date
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
+from django.contrib.gis.geos import Polygon
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.db.models import Avg
-from django.http import FileResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from rest_framework import permissions, status, viewsets
+from rest_framework import mixins, permissions, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from src.sensors.models import Sensor
+from common.validation import OperativeStatus
+from src.stations.authentication import IsAuthenticatedStation, StationTokenAuthentication
 from src.stations.models import MonitoringStation
-from .models import Measurement, VariableCatalog
-from .serializers import MeasurementSerializer, VariableCatalogSerializer
-from .services import AQICalculatorService, MeasurementService, PDFReportGenerator
+from .downsampling import METHOD_LTTB, METHODS as DOWNSAMPLE_METHODS
+from .exports import (
+    FORMAT_CSV,
+    FORMATS as EXPORT_FORMATS,
+    TEXT_FORMATS as TEXT_EXPORT_FORMATS,
+    export_stream,
+)
+from .history import history_series
+from .latest_matrix import variable_catalog
+from .live_state import invalidate_live_state
+from .models import Measurement, ReportJob, VariableCatalog
+from .pagination import MeasurementCursorPagination
+from .report_jobs import build_report
+from .rollups import parse_bound
+from .serializers import (
+    MeasurementBatchItemSerializer,
+    MeasurementSerializer,
+    ReportJobSerializer,
+    VariableCatalogSerializer,
+)
+from .services import AQICalculatorService, MeasurementService
+from .timeseries import AGG_AVG, AGGREGATES, RESOLUTIONS
+from .write_buffer import WriteBufferFullError
+
+
+def batch_ingestion_response(rows, sensors=None):
+    """
+    Procesa un lote de lecturas y construye la respuesta HTTP con el resultado por fila.
+    Cada lectura se valida de forma independiente; las inválidas se reportan
+    sin impedir que el resto del lote se guarde.
+    Args:
+        rows (list): Lecturas recibidas en el cuerpo de la petición.
+        sensors (dict, optional): Sensores permitidos {sensor_id: Sensor} (ingesta por estación).
+    Respuesta:
+        201 si todas se crearon, 207 si el lote fue parcial, 400 si ninguna.
+        {
+            "created": 2, "rejected": 1,
+            "results": [{"index": 0, "status": "created", "measurement_id": 10}, ...]
+        }
+    """
+    max_size = settings.MEASUREMENT_BATCH_MAX_SIZE
+    if not isinstance(rows, list) or not rows or len(rows) > max_size:
+        return Response(
+            {"detail": f"El lote debe ser una lista de entre 1 y {max_size} mediciones."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # Validación de formato por fila (tipos y campos obligatorios)
+    item_serializer = MeasurementBatchItemSerializer()
+    results = [None] * len(rows)
+    valid_rows = []
+    valid_indexes = []
+    for index, row in enumerate(rows):
+        try:
+            valid_rows.append(item_serializer.run_validation(row))
+            valid_indexes.append(index)
+        except serializers.ValidationError as e:
+            results[index] = {"index": index, "status": "rejected", "errors": e.detail}
+
+    try:
+        if valid_rows:
+            batch_results = MeasurementService.create_measurements_bulk(
+                valid_rows, sensors=sensors
+            )
+            for index, result in zip(valid_indexes, batch_results):
+                result["index"] = index
+                results[index] = result
+    except Exception as e:
+        return Response(
+            {"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    created = sum(1 for r in results if r["status"] == "created")
+    rejected = len(results) - created
+
+    if rejected == 0:
+        response_status = status.HTTP_201_CREATED
+    elif created == 0:
+        response_status = status.HTTP_400_BAD_REQUEST
+    else:
+        response_status = status.HTTP_207_MULTI_STATUS
+
+    return Response(
+        {"created": created, "rejected": rejected, "results": results},
+        status=response_status,
+    )
 
 
 class VariableCatalogViewSet(viewsets.ModelViewSet):
@@ -35,22 +121,81 @@ class MeasurementViewSet(viewsets.ModelViewSet):
     Endpoint: /api/measurements/data/
     Gestión de los datos recolectados (Mediciones).
     Permite la ingesta de datos y la consulta histórica.
+    El listado se pagina por cursor (ver MeasurementCursorPagination).
     """
 
     queryset = Measurement.objects.all()
     serializer_class = MeasurementSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MeasurementCursorPagination
+
+    def get_queryset(self):
+        """
+        Une sensor y variable en la misma consulta (el serializador expone
+        sensor_serial, variable_code y variable_unit) y aplica los filtros
+        opcionales del listado.
+        Query Params:
+            sensor: ID del sensor.
+            station_id: ID de la estación.
+            variable: ID de la variable.
+            variable_code: Código(s) de variable (ej: PM2.5 o PM2.5,PM10).
+            start_date / end_date: Rango de measure_date (YYYY-MM-DD o ISO 8601).
+        """
+        queryset = super().get_queryset().select_related("sensor", "variable")
+        params = self.request.query_params
+
+        for param, lookup in (
+            ("sensor", "sensor_id"),
+            ("station_id", "sensor__station_id"),
+            ("variable", "variable_id"),
+        ):
+            value = params.get(param)
+            if value is not None:
+                if not value.isdigit():
+                    raise serializers.ValidationError({param: "Debe ser un entero."})
+                queryset = queryset.filter(**{lookup: int(value)})
+
+        variable_codes = self._list_param(self.request, "variable_code")
+        if variable_codes:
+            queryset = queryset.filter(variable__code__in=variable_codes)
+
+        for param, lookup in (("start_date", "measure_date__gte"), ("end_date", "measure_date__lte")):
+            if params.get(param):
+                bound = parse_bound(params[param])
+                if bound is None:
+                    raise serializers.ValidationError({param: "Formato de fecha inválido."})
+                queryset = queryset.filter(**{lookup: bound})
+
+        return queryset
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        # La medición eliminada pudo ser el último valor en memoria o parte del AQI en vivo
+        invalidate_live_state()
 
     def create(self, request, *args, **kwargs):
         """
         Sobrescribe el método POST para delegar la lógica al Service Layer.
         Maneja la traducción de excepciones de negocio (ValidationError)
         a respuestas HTTP estandarizadas (400 Bad Request).
+        Si el cuerpo es una lista, se procesa como ingesta por lotes.
         """
+        if isinstance(request.data, list):
+            return self._create_batch(request.data)
+
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         try:
+            # Con el buffer de escritura diferida activo la medición se acepta
+            # (202) y se persiste en el siguiente lote.
+            if settings.MEASUREMENT_WRITE_BUFFER["ENABLED"]:
+                measurement = MeasurementService.enqueue_measurement(
+                    serializer.validated_data
+                )
+                output_serializer = self.get_serializer(measurement)
+                return Response(output_serializer.data, status=status.HTTP_202_ACCEPTED)
+
             measurement = MeasurementService.create_measurement(
                 serializer.validated_data
             )
@@ -59,28 +204,59 @@ class MeasurementViewSet(viewsets.ModelViewSet):
 
         except DjangoValidationError as e:
             return Response({"detail": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        except WriteBufferFullError as e:
+            return Response(
+                {"detail": e.message}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         except Exception as e:
             return Response(
                 {"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _create_batch(self, rows):
+        """
+        Ingesta por lotes: POST /api/measurements/data/ con una lista de lecturas.
+        Ver `batch_ingestion_response` para el formato de respuesta.
+        """
+        return batch_ingestion_response(rows)
+
     @action(detail=False, methods=["get"])
     def history(self, request):
         """
         Endpoint optimizado para gráficas.
         Si station_id no se envía, calcula el PROMEDIO de todas las estaciones (Ciudad).
+        Para rangos largos la serie se lee de los agregados por hora o día
+        (promedio por periodo) según settings.MEASUREMENT_ROLLUP_TIERS.
+        Con resolution la serie se agrupa por periodos en la base de datos.
+        Con max_points la serie se reduce en el servidor (LTTB o envolvente
+        mínimo/máximo), acotando el tamaño de la respuesta para cualquier rango.
         Query Params:
-            station_id,
-            variable_code,
+            station_id: Uno o varios (station_id=1,2 o station_id=1&station_id=2).
+            variable_code: Uno o varios (variable_code=PM2.5,PM10).
             start_date,
-            end_date
+            end_date,
+            resolution (opcional): '1m', '5m', '1h' o '1d'.
+            agg (opcional): 'avg' (por defecto), 'max' o 'p95'. Requiere resolution.
+            tz (opcional): Zona horaria de los periodos (ej: America/Bogota).
+            max_points (opcional): Cantidad máxima de puntos por serie.
+            downsample (opcional): 'lttb' (por defecto) o 'minmax'.
+        Respuesta:
+            Con una variable y una estación (o ninguna): lista de puntos
+            [{"measure_date", "value"}].
+            Con varias: {"series": [{"variable_code", "station_id", "data": [...]}]},
+            todas calculadas con una sola consulta agrupada.
         """
-        station_id = request.query_params.get("station_id")
-        variable_code = request.query_params.get("variable_code")
+        station_ids = self._list_param(request, "station_id")
+        variable_codes = self._list_param(request, "variable_code")
         start_date = request.query_params.get("start_date")
         end_date = request.query_params.get("end_date")
+        resolution = request.query_params.get("resolution")
+        agg = request.query_params.get("agg", AGG_AVG)
+        tz_name = request.query_params.get("tz")
+        max_points = request.query_params.get("max_points")
+        method = request.query_params.get("downsample", METHOD_LTTB)
 
-        if not all([variable_code, start_date, end_date]):
+        if not all([variable_codes, start_date, end_date]):
             return Response(
                 {
                     "error": "Faltan parámetros (station_id, variable_code, start_date, end_date)"
@@ -88,30 +264,224 @@ class MeasurementViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Filtro base
-        filters = {
-            "variable__code": variable_code,
-            "measure_date__range": [start_date, end_date],
-        }
+        if not all(station_id.isdigit() for station_id in station_ids):
+            return Response(
+                {"error": "station_id debe ser un entero o una lista de enteros"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if max_points is not None:
+            try:
+                max_points = int(max_points)
+            except ValueError:
+                max_points = 0
+            if max_points < 3:
+                return Response(
+                    {"error": "max_points debe ser un entero mayor o igual a 3"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        if method not in DOWNSAMPLE_METHODS:
+            return Response(
+                {"error": f"downsample debe ser uno de: {', '.join(DOWNSAMPLE_METHODS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if resolution is not None and resolution not in RESOLUTIONS:
+            return Response(
+                {"error": f"resolution debe ser uno de: {', '.join(RESOLUTIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if agg not in AGGREGATES:
+            return Response(
+                {"error": f"agg debe ser uno de: {', '.join(AGGREGATES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            tzinfo = ZoneInfo(tz_name) if tz_name else timezone.get_current_timezone()
+        except (ZoneInfoNotFoundError, ValueError):
+            return Response(
+                {"error": f"Zona horaria no válida: {tz_name}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        if station_id:
-            # Estación específica
-            filters["sensor__station_id"] = station_id
-            queryset = (
-                self.queryset.filter(**filters)
-                .values("measure_date", "value")
-                .order_by("measure_date")
+        series = history_series(
+            variable_codes,
+            start_date,
+            end_date,
+            station_ids=[int(station_id) for station_id in station_ids] or None,
+            resolution=resolution,
+            agg=agg,
+            tzinfo=tzinfo,
+            max_points=max_points,
+            method=method,
+        )
+
+        if len(series) == 1:
+            # Formato original: una sola serie como lista de puntos
+            return Response(next(iter(series.values())), status=status.HTTP_200_OK)
+
+        return Response(
+            {
+                "series": [
+                    {"variable_code": code, "station_id": station_id, "data": data}
+                    for (code, station_id), data in series.items()
+                ]
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Exportación de mediciones crudas para análisis externo.
+        La respuesta se transmite por bloques desde un cursor de servidor, de modo
+        que la memoria usada es constante sin importar la cantidad de filas.
+        Query Params:
+            Los mismos filtros del listado (station_id, sensor, variable_code, start_date, end_date).
+            export_format (opcional): 'csv' (por defecto), 'ndjson', 'arrow' (IPC stream)
+                o 'parquet'. Los formatos columnares se cargan directo en pandas.
+            gzip (opcional): 'true' para comprimir CSV/NDJSON (.gz).
+        """
+        export_format = request.query_params.get("export_format", FORMAT_CSV)
+        compress = request.query_params.get("gzip", "false").lower() == "true"
+
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"export_format debe ser uno de: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        else:
-            # Todas las estaciones -> Promedio de ciudad
-            queryset = (
-                self.queryset.filter(**filters)
-                .values("measure_date")
-                .annotate(value=Avg("value"))
-                .order_by("measure_date")
+
+        # Arrow y Parquet ya son binarios compactos; gzip solo aplica a texto
+        compress = compress and export_format in TEXT_EXPORT_FORMATS
+        queryset = self.get_queryset()
+        filename = f"vrisa-measurements.{export_format}"
+        content_type = EXPORT_FORMATS[export_format]
+        if compress:
+            filename += ".gz"
+            content_type = "application/gzip"
+
+        response = StreamingHttpResponse(
+            export_stream(queryset, export_format, compress), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=["get"])
+    def recent(self, request):
+        """
+        Resumen de las últimas horas de una serie y sus últimas lecturas
+        (indicadores y mini-gráficas). Con RECENT_SERIES habilitado se responde
+        desde memoria, sin consultar la base de datos.
+        Query Params:
+            sensor_id, variable_code,
+            hours (opcional): Largo de la ventana (por defecto 24).
+            last (opcional): Cantidad de lecturas más recientes (por defecto 60, máximo 1000).
+        Respuesta:
+            {"sensor_id", "variable_code", "hours", "count", "mean", "max",
+             "data": [{"measure_date", "value"}]}
+        """
+        sensor_id = request.query_params.get("sensor_id", "")
+        variable_code = request.query_params.get("variable_code")
+        try:
+            hours = float(request.query_params.get("hours", 24))
+            last = int(request.query_params.get("last", 60))
+        except ValueError:
+            hours = last = -1
+
+        if not sensor_id.isdigit() or not variable_code:
+            return Response(
+                {"error": "Faltan parámetros (sensor_id, variable_code)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 0 < hours <= 24 * 31 or not 0 <= last <= 1000:
+            return Response(
+                {"error": "hours debe estar entre 0 y 744 y last entre 0 y 1000"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        return Response(list(queryset), status=status.HTTP_200_OK)
+        variable_id = next(
+            (vid for vid, code, _ in variable_catalog() if code == variable_code), None
+        )
+        if variable_id is None:
+            return Response(
+                {"error": f"Variable {variable_code} no encontrada"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        summary = MeasurementService.recent_series(int(sensor_id), variable_id, hours, last)
+        return Response(
+            {"sensor_id": int(sensor_id), "variable_code": variable_code, "hours": hours, **summary},
+            status=status.HTTP_200_OK,
+        )
+
+    @staticmethod
+    def _list_param(request, name) -> list:
+        """
+        Lee un parámetro que admite varios valores, repetido o separado por comas.
+        """
+        values = []
+        for raw in request.query_params.getlist(name):
+            values.extend(value.strip() for value in raw.split(",") if value.strip())
+        return list(dict.fromkeys(values))
+
+
+class ReportJobViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Reportes PDF asíncronos para rangos largos.
+
+    - POST   /reports/jobs/                 -> Encola el reporte (202).
+    - GET    /reports/jobs/                 -> Trabajos del usuario.
+    - GET    /reports/jobs/{id}/            -> Estado del trabajo.
+    - GET    /reports/jobs/{id}/download/   -> PDF generado (409 si no está listo).
+
+    El comando `process_report_jobs` genera los PDF en MEDIA_ROOT.
+    """
+
+    serializer_class = ReportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ReportJob.objects.filter(requested_by=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(requested_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        # 202: el reporte queda en cola; el cliente consulta el estado del trabajo
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ReportJob.Status.COMPLETED:
+            return Response(
+                {"error": "El reporte aún no está disponible.", "status": job.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(job.file.open("rb"), as_attachment=True, filename=job.filename)
+
+
+def _report_params_error(station_id, start_date, end_date):
+    """
+    Valida los parámetros de un reporte síncrono antes de buscarlo en la
+    caché de reportes (su llave convierte station_id a entero y las fechas a
+    date, y un periodo cerrado se sirve sin consultar la estación).
+    Returns:
+        str | None: Mensaje de error para responder 400, o None si son válidos.
+    """
+    if station_id is not None and not station_id.isdigit():
+        return "station_id debe ser un entero"
+    try:
+        date.fromisoformat(start_date)
+        date.fromisoformat(end_date)
+    except ValueError:
+        return "Formato de fecha inválido (YYYY-MM-DD)"
+    return None
 
 
 class AirQualityReportView(APIView):
@@ -138,27 +508,20 @@ class AirQualityReportView(APIView):
                 {"error": "Se requiere start_date y end_date (o date)"}, status=400
             )
 
-        # Resolver Estación (Objeto o None para Global)
-        station = None
-        if station_id and station_id not in ["", "null", "undefined"]:
-            station = get_object_or_404(MonitoringStation, pk=station_id)
-
-        variable_code = request.query_params.get("variable_code")
+        # Estación específica o None para Global (se resuelve solo si no está en caché)
+        if station_id in ["", "null", "undefined"]:
+            station_id = None
 
-        buffer = io.BytesIO()
-        report = PDFReportGenerator(buffer)
-        report.generate_air_quality_report(station, start_date, end_date, variable_code)
-        buffer.seek(0)
+        error = _report_params_error(station_id, start_date, end_date)
+        if error:
+            return Response({"error": error}, status=400)
 
-        if station:
-            scope_str = station.station_name.replace(" ", "_").lower()
-        else:
-            scope_str = "cali_consolidated"
+        variable_code = request.query_params.get("variable_code")
 
-        today_str = timezone.now().strftime("%Y%m%d")
-        filename = f"{today_str}_vrisa_general_{scope_str}_report.pdf"
+        report_type = ReportJob.ReportType.AIR_QUALITY
+        report, filename = build_report(report_type, station_id, start_date, end_date, variable_code)
 
-        return FileResponse(buffer, as_attachment=True, filename=filename)
+        return FileResponse(report, as_attachment=True, filename=filename)
 
 
 class TrendsReportView(APIView):
@@ -178,25 +541,18 @@ class TrendsReportView(APIView):
             )
 
         # Lógica para determinar si es una estación específica o todas
-        station = None
-        if station_id and station_id not in ["", "null", "undefined"]:
-            station = get_object_or_404(MonitoringStation, pk=station_id)
-
-        buffer = io.BytesIO()
-        report = PDFReportGenerator(buffer)
+        if station_id in ["", "null", "undefined"]:
+            station_id = None
 
-        # Pasamos 'station' (que puede ser None) y el 'variable_code'
-        report.generate_trends_report(station, start_date, end_date, variable_code)
+        error = _report_params_error(station_id, start_date, end_date)
+        if error:
+            return Response({"error": error}, status=400)
 
-        buffer.seek(0)
-
-        # Nombre del archivo dinámico
-        scope_name = (
-            station.station_name.replace(" ", "_") if station else "consolidado_cali"
-        )
-        filename = f"{start_date}_to_{end_date}-{scope_name}-vrisa-trends.pdf"
+        # Pasamos 'station_id' (que puede ser None) y el 'variable_code'
+        report_type = ReportJob.ReportType.TRENDS
+        report, filename = build_report(report_type, station_id, start_date, end_date, variable_code)
 
-        return FileResponse(buffer, as_attachment=True, filename=filename)
+        return FileResponse(report, as_attachment=True, filename=filename)
 
 
 class AlertsReportView(APIView):
@@ -215,26 +571,18 @@ class AlertsReportView(APIView):
         if not start_date or not end_date:
             return Response({"error": "Se requieren start_date y end_date"}, status=400)
 
-        station = None
-        if station_id and station_id not in ["", "null", "undefined"]:
-            station = get_object_or_404(MonitoringStation, pk=station_id)
+        if station_id in ["", "null", "undefined"]:
+            station_id = None
+
+        error = _report_params_error(station_id, start_date, end_date)
+        if error:
+            return Response({"error": error}, status=400)
 
         # Generar contenido del reporte
-        buffer = io.BytesIO()
-        report = PDFReportGenerator(buffer)
-        report.generate_alerts_report(station, start_date, end_date)
-        buffer.seek(0)
-
-        # Formato: YYYYMMDD_vrisa_alerts_report.pdf
-        today_str = timezone.now().strftime("%Y%m%d")
-        scope_str = (
-            station.station_name.replace(" ", "_").lower()
-            if station
-            else "cali_consolidated"
-        )
-        filename = f"{today_str}_vrisa_{scope_str}_alerts_report.pdf"
+        report_type = ReportJob.ReportType.ALERTS
+        report, filename = build_report(report_type, station_id, start_date, end_date)
 
-        return FileResponse(buffer, as_attachment=True, filename=filename)
+        return FileResponse(report, as_attachment=True, filename=filename)
 
 
 class CurrentAQIView(APIView):
@@ -265,7 +613,7 @@ class CurrentAQIView(APIView):
         try:
             s_id = int(station_id) if station_id else None
 
-            aqi_data = AQICalculatorService.calculate_aqi_for_station(station_id=s_id)
+            aqi_data = AQICalculatorService.current_aqi(station_id=s_id)
 
             aqi_data["station_name"] = station_name
 
@@ -282,13 +630,96 @@ class CurrentAQIView(APIView):
             )
 
 
+class StationsAQIView(APIView):
+    """
+    AQI actual de todas las estaciones activas en una sola petición (vista de mapa).
+    Endpoint: GET /api/measurements/aqi/stations/
+    El AQI de cada estación es el mismo de aqi/current: desde el estado
+    incremental en memoria (periodos EPA) cuando está habilitado, o con los
+    promedios de 24 horas de todas las estaciones en una sola consulta
+    agrupada por estación y contaminante.
+
+    Query Params:
+        institution (opcional): ID de la institución dueña de las estaciones.
+        bbox (opcional): min_lon,min_lat,max_lon,max_lat (WGS84).
+
+    Response:
+        {
+            "timestamp": "2025-...",
+            "stations": [
+                { "station_id": 1, "station_name": "...", "latitude": 3.45, "longitude": -76.53,
+                  "aqi": 42.0, "category": "Good", "category_description": "...", "color": "#0CDA0C",
+                  "dominant_pollutant": "PM2.5", "sub_indices": {...} },
+                ...
+            ]
+        }
+        Las estaciones sin datos suficientes se retornan con "aqi": null.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        stations = MonitoringStation.objects.filter(
+            operative_status=OperativeStatus.ACTIVE
+        ).only("station_id", "station_name", "location")
+
+        institution = request.query_params.get("institution")
+        if institution:
+            if not institution.isdigit():
+                return Response(
+                    {"error": "institution debe ser un entero."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            stations = stations.filter(institution_id=institution)
+
+        bbox = request.query_params.get("bbox")
+        if bbox:
+            try:
+                min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+            except ValueError:
+                return Response(
+                    {"error": "bbox debe tener el formato min_lon,min_lat,max_lon,max_lat."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            stations = stations.filter(
+                location__within=Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+            )
+
+        stations = list(stations.order_by("station_id"))
+        timestamp = timezone.now()
+        results = (
+            AQICalculatorService.current_aqi_for_stations(
+                [station.station_id for station in stations], timestamp
+            )
+            if stations
+            else {}
+        )
+
+        data = []
+        for station in stations:
+            aqi_data = results.get(station.station_id) or {"aqi": None}
+            aqi_data.pop("timestamp", None)
+            data.append(
+                {
+                    "station_id": station.station_id,
+                    "station_name": station.station_name,
+                    "latitude": station.location.y,
+                    "longitude": station.location.x,
+                    **aqi_data,
+                }
+            )
+
+        return Response({"timestamp": timestamp, "stations": data}, status=status.HTTP_200_OK)
+
+
 class LatestMeasurementsView(APIView):
     """
     Endpoint: /api/measurements/latest/
     Obtiene la última medición registrada para cada variable del catálogo.
 
     Query Params:
-        station_id (opcional): ID de la estación para filtrar.
+        station_id (opcional): ID de la estación para filtrar. Admite varias
+            estaciones (repetido o separado por comas).
 
     Response:
         {
@@ -296,41 +727,43 @@ class LatestMeasurementsView(APIView):
             "TEMP": { "value": 24.0, "unit": "°C", "date": "2023-..." },
             ...
         }
+        Con varias estaciones, el mismo objeto por estación: { "<station_id>": {...}, ... }
     """
 
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        station_id = request.query_params.get("station_id")
+        station_ids = MeasurementViewSet._list_param(request, "station_id")
+        if not all(station_id.isdigit() for station_id in station_ids):
+            return Response(
+                {"error": "station_id debe ser un entero o una lista de enteros."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        response_data = {}
-        variables = VariableCatalog.objects.all()
+        latest = MeasurementService.latest_by_variable(station_ids or None)
 
-        for var in variables:
-            try:
-                filters = {"variable": var, "sensor__status": Sensor.Status.ACTIVE}
+        if len(station_ids) > 1:
+            response_data = {str(station_id): values for station_id, values in latest.items()}
+        else:
+            response_data = next(iter(latest.values()))
 
-                if station_id:
-                    filters["sensor__station_id"] = station_id
+        return Response(response_data, status=status.HTTP_200_OK)
 
-                latest_measurement = (
-                    Measurement.objects.filter(**filters)
-                    .select_related("variable")
-                    .order_by("-measure_date")
-                    .first()
-                )
 
-                if latest_measurement:
-                    response_data[var.code] = {
-                        "value": latest_measurement.value,
-                        "unit": var.unit,
-                        "last_updated": latest_measurement.measure_date,
-                    }
-                else:
-                    response_data[var.code] = None
+class StationIngestView(APIView):
+    """
+    Endpoint: POST /api/measurements/ingest/
+    Ingesta directa desde el hardware de la estación, autenticada con su token
+    (Authorization: Station <token>) en lugar de JWT.
+    La estación y sus sensores se resuelven desde una caché en memoria, por lo que
+    la petición no consulta la tabla de usuarios ni la de sensores.
+
+    Cuerpo: lista de lecturas {sensor, variable, value, measure_date}.
+    Solo se aceptan sensores asignados a la estación autenticada.
+    """
 
-            except Exception as e:
-                print(f"Error procesando variable {var.code}: {e}")
-                continue
+    authentication_classes = [StationTokenAuthentication]
+    permission_classes = [IsAuthenticatedStation]
 
-        return Response(response_data, status=status.HTTP_200_OK)
+    def post(self, request):
+        return batch_ingestion_response(request.data, sensors=request.auth.sensors)
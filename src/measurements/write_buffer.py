@@ -0,0 +1,287 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, connection
+from common.exceptions import ApplicationError
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBufferFullError(ApplicationError):
+    """
+    Se lanza cuando el buffer de escritura sigue lleno tras esperar el tiempo
+    máximo configurado (backpressure). Corresponde a un HTTP 503.
+    """
+    pass
+
+
+class MeasurementWriteBuffer:
+    """
+    Buffer de escritura diferida (write-behind) para mediciones.
+
+    Las lecturas ya validadas se encolan en una cola acotada y un hilo en segundo
+    plano las persiste en lotes cada `max_rows` filas o cada `flush_interval_ms`
+    milisegundos, lo que ocurra primero. Si la cola está llena, `put` bloquea
+    hasta `put_timeout` segundos y luego lanza WriteBufferFullError. Los lotes
+    fallidos en espera de reintento ocupan la misma capacidad `max_queue_size`:
+    durante una caída de la base de datos `put` rechaza lecturas en lugar de
+    acumularlas en memoria.
+    Al cerrar el proceso se vacía de forma síncrona lo que quede pendiente.
+
+    El cliente ya recibió un 202, así que un lote que falla no se descarta: se
+    reintenta con espera exponencial hasta `max_retries` veces y luego se
+    entrega a `dead_letter` (tabla measurement_dead_letter, ver
+    replay_dead_letters) para no perder las lecturas. Si tampoco se puede
+    guardar ahí (la misma base de datos caída), el lote se escribe en el
+    archivo local `spill_path` en lugar de reintentarse sin fin.
+    """
+
+    def __init__(
+        self,
+        writer,
+        max_rows=500,
+        flush_interval_ms=1000,
+        max_queue_size=10000,
+        put_timeout=2.0,
+        max_retries=5,
+        dead_letter=None,
+        spill_path=None,
+    ):
+        """
+        Args:
+            writer (callable): Función que persiste una lista de instancias Measurement.
+            max_rows (int): Tamaño de lote que dispara una escritura inmediata.
+            flush_interval_ms (int): Tiempo máximo que una lectura espera en la cola.
+            max_queue_size (int): Capacidad de la cola antes de aplicar backpressure.
+            put_timeout (float): Segundos que `put` espera por espacio en la cola.
+            max_retries (int): Intentos de escritura de un lote antes de enviarlo a `dead_letter`.
+            dead_letter (callable): Función (lote, error) que guarda un lote
+                que agotó sus reintentos.
+            spill_path (str): Archivo JSON Lines donde se guarda un lote que
+                tampoco pudo entregarse a `dead_letter`.
+        """
+        self.writer = writer
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.dead_letter = dead_letter
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        # Lotes fallidos pendientes de reintento: (lote, intentos, momento del próximo intento)
+        self._failed = []
+        self._failed_rows = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="measurement-write-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, measurement) -> None:
+        """
+        Encola una medición para su escritura diferida.
+        Raises:
+            WriteBufferFullError: Si la cola no libera espacio a tiempo o los
+                lotes en reintento ya ocupan la capacidad del buffer.
+        """
+        if self._stopped.is_set():
+            raise WriteBufferFullError("El buffer de escritura está cerrado.")
+        if self._failed_rows + self._queue.qsize() >= self.max_queue_size:
+            raise WriteBufferFullError(
+                "El buffer de escritura de mediciones está lleno, intente más tarde."
+            )
+        try:
+            self._queue.put(measurement, timeout=self.put_timeout)
+        except queue.Full:
+            raise WriteBufferFullError(
+                "El buffer de escritura de mediciones está lleno, intente más tarde."
+            )
+        if self._queue.qsize() >= self.max_rows:
+            self._wake.set()
+
+    def flush(self, force_retries=False) -> int:
+        """
+        Escribe de forma síncrona todas las mediciones pendientes y reintenta
+        los lotes fallidos cuya espera ya venció.
+        Args:
+            force_retries (bool): Reintentar los lotes fallidos sin esperar.
+        Returns:
+            int: Cantidad de mediciones escritas.
+        """
+        written = 0
+        with self._flush_lock:
+            failed, self._failed = self._failed, []
+            now = time.monotonic()
+            for batch, attempts, retry_at in failed:
+                if force_retries or retry_at <= now:
+                    written += self._write(batch, attempts)
+                else:
+                    self._failed.append((batch, attempts, retry_at))
+
+            while True:
+                batch = []
+                while len(batch) < self.max_rows:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    break
+                written += self._write(batch, 0)
+
+            self._failed_rows = sum(len(batch) for batch, _, _ in self._failed)
+        return written
+
+    @property
+    def pending_retries(self) -> int:
+        """Mediciones de lotes fallidos que esperan reintento."""
+        return self._failed_rows
+
+    def _write(self, batch, attempts) -> int:
+        # Requiere `_flush_lock`; retorna la cantidad de mediciones escritas
+        try:
+            self.writer(batch)
+            return len(batch)
+        except Exception as e:
+            attempts += 1
+            logger.exception(
+                "Error escribiendo lote de %s mediciones desde el buffer (intento %s de %s)",
+                len(batch), attempts, self.max_retries,
+            )
+            error = e
+
+        if attempts < self.max_retries:
+            delay = min(self.flush_interval * 2 ** attempts, 60)
+            self._failed.append((batch, attempts, time.monotonic() + delay))
+            return 0
+
+        if self.dead_letter is not None:
+            try:
+                self.dead_letter(batch, error)
+                logger.error("Lote de %s mediciones enviado a measurement_dead_letter", len(batch))
+                return 0
+            except Exception:
+                logger.exception("Error guardando lote fallido en measurement_dead_letter")
+
+        if self.spill_path is None:
+            logger.error("Se descartan %s mediciones sin destino de errores", len(batch))
+            return 0
+        try:
+            spill_to_file(self.spill_path, batch, error)
+            logger.error("Lote de %s mediciones guardado en %s", len(batch), self.spill_path)
+        except Exception:
+            logger.exception("Se descartan %s mediciones: no se pudo escribir %s", len(batch), self.spill_path)
+        return 0
+
+    def close(self) -> None:
+        """
+        Detiene el hilo de fondo y vacía la cola de forma síncrona.
+        """
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush(force_retries=True)
+        if self._failed:
+            logger.error(
+                "El buffer se cerró con %s mediciones sin escribir", self.pending_retries
+            )
+
+    def _run(self) -> None:
+        try:
+            while not self._stopped.is_set():
+                self._wake.wait(timeout=self.flush_interval)
+                self._wake.clear()
+                close_old_connections()
+                self.flush()
+        finally:
+            # Cada hilo tiene su propia conexión a la base de datos
+            connection.close()
+
+
+def write_dead_letters(batch, error) -> None:
+    """
+    Guarda en measurement_dead_letter un lote que agotó sus reintentos, con el
+    error que lo rechazó, para reprocesarlo con `replay_dead_letters`.
+    """
+    from .models import MeasurementDeadLetter
+
+    MeasurementDeadLetter.objects.bulk_create([
+        MeasurementDeadLetter(
+            sensor_id=measurement.sensor_id,
+            variable_id=measurement.variable_id,
+            value=measurement.value,
+            measure_date=measurement.measure_date,
+            error=str(error),
+        )
+        for measurement in batch
+    ])
+
+
+def spill_to_file(path, batch, error) -> None:
+    """
+    Agrega un lote al archivo JSON Lines `path`, una medición por línea.
+    `replay_dead_letters` lo importa a measurement_dead_letter cuando la base
+    de datos vuelve a estar disponible.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as spill_file:
+        for measurement in batch:
+            spill_file.write(json.dumps({
+                "sensor_id": measurement.sensor_id,
+                "variable_id": measurement.variable_id,
+                "value": measurement.value,
+                "measure_date": measurement.measure_date.isoformat(),
+                "error": str(error),
+            }) + "\n")
+        spill_file.flush()
+        os.fsync(spill_file.fileno())
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_write_buffer() -> MeasurementWriteBuffer:
+    """
+    Retorna el buffer de escritura del proceso, creándolo en el primer uso
+    con la configuración de settings.MEASUREMENT_WRITE_BUFFER.
+    """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            from .services import MeasurementService
+
+            config = settings.MEASUREMENT_WRITE_BUFFER
+            _buffer = MeasurementWriteBuffer(
+                writer=MeasurementService.bulk_insert,
+                max_rows=config["MAX_ROWS"],
+                flush_interval_ms=config["FLUSH_INTERVAL_MS"],
+                max_queue_size=config["MAX_QUEUE_SIZE"],
+                put_timeout=config["PUT_TIMEOUT_SECONDS"],
+                max_retries=config["MAX_RETRIES"],
+                dead_letter=write_dead_letters,
+                spill_path=config["SPILL_PATH"],
+            )
+            atexit.register(_buffer.close)
+        return _buffer
+
+
+def close_write_buffer() -> None:
+    """
+    Vacía y cierra el buffer del proceso (si fue creado).
+    """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer.close()
+            _buffer = None
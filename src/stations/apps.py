@@ -5,3 +5,7 @@ class StationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'src.stations'
     label = 'stations'
+
+    def ready(self):
+        # Registra la invalidación de la caché de tokens de estación
+        from src.stations import signals  # noqa: F401
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import authentication, exceptions, permissions
+from common.validation import OperativeStatus
+from src.stations.token_cache import StationCredentials, station_token_cache
+
+
+class StationTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Autenticación de hardware IoT mediante el token propio de la estación.
+
+    Header esperado:
+        Authorization: Station <authentication_token>
+
+    No consulta la tabla de usuarios: request.user es AnonymousUser y
+    request.auth contiene las StationCredentials resueltas desde la caché.
+    """
+
+    keyword = "Station"
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed("Header de token de estación inválido.")
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed("Header de token de estación inválido.")
+
+        credentials = station_token_cache.resolve(token)
+        if credentials is None:
+            raise exceptions.AuthenticationFailed("Token de estación inválido.")
+
+        if credentials.operative_status != OperativeStatus.ACTIVE:
+            raise exceptions.AuthenticationFailed(
+                f"La estación {credentials.station_name} no está operativa "
+                f"(Estado: {credentials.operative_status})."
+            )
+
+        return (AnonymousUser(), credentials)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class IsAuthenticatedStation(permissions.BasePermission):
+    """
+    Permite el acceso solo a peticiones autenticadas con StationTokenAuthentication.
+    """
+
+    def has_permission(self, request, view):
+        return isinstance(request.auth, StationCredentials)
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from src.sensors.models import Sensor
+from src.stations.models import MonitoringStation
+from src.stations.token_cache import station_token_cache
+
+
+@receiver(post_save, sender=MonitoringStation)
+@receiver(post_delete, sender=MonitoringStation)
+def invalidate_station_credentials(sender, instance, **kwargs):
+    """
+    Rotación de token o cambio de estado operativo: la entrada en caché deja de ser válida.
+    """
+    station_token_cache.invalidate_station(instance.station_id)
+
+
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def invalidate_sensor_credentials(sender, instance, **kwargs):
+    """
+    Cambio de estado o reasignación de un sensor: se recargan las estaciones que lo contienen.
+    """
+    station_token_cache.invalidate_sensor(instance.sensor_id)
+    if instance.station_id:
+        station_token_cache.invalidate_station(instance.station_id)
@@ -1,5 +1,8 @@
+from django.contrib.gis.geos import Point
 from django.test import TestCase
-from src.stations.services import create_station
+from common.validation import OperativeStatus
+from src.stations.services import create_station, regenerate_station_token
+from src.stations.token_cache import station_token_cache
 from src.institutions.models import EnvironmentalInstitution
 from src.users.models import User
 from src.stations.models import MonitoringStation
@@ -72,4 +75,40 @@ class StationSecurityTestCase(TestCase):
         self.assertIn(response.status_code, [status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND, status.HTTP_401_UNAUTHORIZED])
         
         # Verificar que la estación sigue viva en la base de datos
-        self.assertTrue(MonitoringStation.objects.filter(pk=self.station.pk).exists())
\ No newline at end of file
+        self.assertTrue(MonitoringStation.objects.filter(pk=self.station.pk).exists())
+
+class StationTokenCacheTestCase(TestCase):
+    def setUp(self):
+        self.inst = EnvironmentalInstitution.objects.create(institute_name="Token Inst", physic_address="x")
+        self.station = MonitoringStation.objects.create(
+            station_name="Token Station",
+            institution=self.inst,
+            location=Point(-76.5, 3.4, srid=4326),
+            operative_status=OperativeStatus.ACTIVE
+        )
+        station_token_cache.clear()
+
+    def test_token_rotation_invalidates_cache(self):
+        """
+        Tras rotar el token, el anterior deja de autenticar aunque estuviera en caché
+        """
+        old_token = self.station.authentication_token
+        self.assertEqual(station_token_cache.resolve(old_token).station_id, self.station.station_id)
+
+        new_token = regenerate_station_token(self.station.station_id)
+
+        self.assertIsNone(station_token_cache.resolve(old_token))
+        self.assertEqual(station_token_cache.resolve(new_token).station_id, self.station.station_id)
+
+    def test_ingest_rejects_inactive_station(self):
+        """
+        Una estación que deja de estar operativa no puede enviar datos
+        """
+        self.station.operative_status = OperativeStatus.MAINTENANCE
+        self.station.save()
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Station {self.station.authentication_token}")
+        response = client.post('/api/measurements/ingest/', [], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from src.stations.models import MonitoringStation
+
+
+class StationCredentials:
+    """
+    Vista inmutable de una estación autenticada por token.
+    Contiene lo necesario para aceptar lecturas sin volver a consultar la base
+    de datos: identificador, estado operativo y sensores asignados.
+    """
+
+    __slots__ = ("station_id", "station_name", "operative_status", "sensors", "loaded_at")
+
+    def __init__(self, station: MonitoringStation, sensors: dict):
+        self.station_id = station.station_id
+        self.station_name = station.station_name
+        self.operative_status = station.operative_status
+        # {sensor_id: Sensor} con los campos mínimos para validar lecturas
+        self.sensors = sensors
+        self.loaded_at = time.monotonic()
+
+
+class StationTokenCache:
+    """
+    Caché en memoria del proceso (LRU acotado + TTL) que resuelve
+    token -> estación -> sensores.
+
+    Se invalida explícitamente cuando se rota el token o cambia el estado de la
+    estación o de sus sensores (ver src/stations/signals.py). El TTL acota la
+    desactualización entre procesos distintos, ya que cada worker tiene su copia.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # token -> StationCredentials
+        self._tokens_by_station = {}  # station_id -> token
+        self._lock = threading.Lock()
+        # Se incrementa en cada invalidación para descartar cargas concurrentes obsoletas
+        self._generation = 0
+
+    def resolve(self, token: str):
+        """
+        Retorna las credenciales de la estación dueña del token, o None si
+        el token no corresponde a ninguna estación.
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                if time.monotonic() - entry.loaded_at < self.ttl_seconds:
+                    self._entries.move_to_end(token)
+                    return entry
+                self._discard(token)
+            generation = self._generation
+
+        entry = self._load(token)
+        if entry is None:
+            return None
+
+        with self._lock:
+            if generation != self._generation:
+                return entry
+            self._entries[token] = entry
+            self._tokens_by_station[entry.station_id] = token
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+        return entry
+
+    def invalidate_station(self, station_id: int) -> None:
+        """Elimina la entrada de una estación (rotación de token o cambio de estado)."""
+        with self._lock:
+            self._generation += 1
+            token = self._tokens_by_station.get(station_id)
+            if token is not None:
+                self._discard(token)
+
+    def invalidate_sensor(self, sensor_id: int) -> None:
+        """
+        Elimina las entradas que contienen al sensor. Se recorre la caché completa
+        porque un sensor puede haber sido reasignado desde otra estación.
+        """
+        with self._lock:
+            self._generation += 1
+            stale = [t for t, e in self._entries.items() if sensor_id in e.sensors]
+            for token in stale:
+                self._discard(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tokens_by_station.clear()
+
+    def _load(self, token: str):
+        try:
+            station = MonitoringStation.objects.only(
+                "station_id", "station_name", "operative_status"
+            ).get(authentication_token=token)
+        except MonitoringStation.DoesNotExist:
+            return None
+
+        sensors = {
+            sensor.sensor_id: sensor
+            for sensor in station.sensors.only(
+                "sensor_id", "serial_number", "status", "station_id"
+            )
+        }
+        return StationCredentials(station, sensors)
+
+    def _discard(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is not None and self._tokens_by_station.get(entry.station_id) == token:
+            del self._tokens_by_station[entry.station_id]
+
+
+station_token_cache = StationTokenCache(
+    max_entries=settings.STATION_TOKEN_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.STATION_TOKEN_CACHE_TTL_SECONDS,
+)